@@ -0,0 +1,153 @@
+import operator
+import os
+import tomllib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Standard-Konfiguration liegt neben dem Dashboard
+STANDARD_REGELN_PFAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "anomalie_regeln.toml")
+
+OPERATOREN = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+@dataclass
+class AnomalieErgebnis:
+    """
+    Ergebnis einer Anomalieprüfung.
+
+    Attributes:
+        maske (pd.Series): True für jede Zeile, die mindestens eine Regel verletzt.
+        treffer (pd.DataFrame): Anzahl Treffer je Regel (Spalten "Regel", "Anzahl").
+        zeilen (dict): Regelname -> Index der betroffenen Zeilen.
+    """
+    maske: pd.Series
+    treffer: pd.DataFrame
+    zeilen: dict
+
+
+def lade_regeln(pfad=STANDARD_REGELN_PFAD):
+    """
+    Liest die Plausibilitätsregeln aus einer TOML-Datei und prüft sie auf Vollständigkeit.
+
+    Args:
+        pfad (str): Pfad zur Regel-Konfiguration.
+
+    Returns:
+        list: Liste der aktiven Regeln als Dictionaries.
+    """
+    with open(pfad, "rb") as datei:
+        konfiguration = tomllib.load(datei)
+
+    regeln = []
+    for regel in konfiguration.get("regel", []):
+        if not regel.get("aktiv", True):
+            continue
+        if regel.get("operator") not in OPERATOREN:
+            raise ValueError(f"Regel '{regel.get('name')}': unbekannter Operator {regel.get('operator')!r}")
+        if ("wert" in regel) == ("vergleichsspalte" in regel):
+            raise ValueError(f"Regel '{regel.get('name')}': genau eines von 'wert' oder 'vergleichsspalte' angeben")
+        regeln.append(regel)
+    return regeln
+
+
+def _datumsspalten(regeln):
+    # Nur Spalten, die mit "heute" oder mit einer anderen Spalte verglichen werden, sind Datumsspalten;
+    # Textspalten (z. B. "Land" == "XX") bleiben unverändert
+    spalten = set()
+    for regel in regeln:
+        if "vergleichsspalte" in regel:
+            spalten |= {regel["spalte"], regel["vergleichsspalte"]}
+        elif regel["wert"] == "heute":
+            spalten.add(regel["spalte"])
+    return spalten
+
+
+def _spalte_vorbereiten(serie, datum):
+    # Datumsspalten kommen je nach Quelle als Text oder datetime an - einheitlich umwandeln
+    if not datum or pd.api.types.is_numeric_dtype(serie) or pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    return pd.to_datetime(serie, errors="coerce")
+
+
+def kompiliere_regeln(regeln, heute=None):
+    """
+    Übersetzt Regeln in Funktionen, die aus den vorbereiteten Spalten eine boolesche Maske erzeugen.
+
+    Args:
+        regeln (list): Regeln aus lade_regeln().
+        heute (pd.Timestamp): Referenzdatum für den Wert "heute" (Standard: aktuelles Datum).
+
+    Returns:
+        list: Liste von (Regelname, Funktion) Tupeln.
+    """
+    heute = pd.Timestamp.today().normalize() if heute is None else pd.Timestamp(heute)
+    kompiliert = []
+
+    for regel in regeln:
+        vergleich = OPERATOREN[regel["operator"]]
+        spalte = regel["spalte"]
+
+        if "vergleichsspalte" in regel:
+            versatz = pd.Timedelta(days=regel.get("tage", 0))
+
+            def maske(spalten, spalte=spalte, rechts=regel["vergleichsspalte"], vergleich=vergleich, versatz=versatz):
+                rechte_seite = spalten[rechts] + versatz if versatz else spalten[rechts]
+                return vergleich(spalten[spalte], rechte_seite)
+        else:
+            wert = heute if regel["wert"] == "heute" else regel["wert"]
+
+            def maske(spalten, spalte=spalte, wert=wert, vergleich=vergleich):
+                return vergleich(spalten[spalte], wert)
+
+        kompiliert.append((regel["name"], maske))
+    return kompiliert
+
+
+def pruefe_anomalien(df, regeln=None, heute=None):
+    """
+    Wertet alle Plausibilitätsregeln in einem Durchlauf vektorisiert aus.
+
+    Jede referenzierte Spalte wird nur einmal umgewandelt; die Regelmasken werden
+    in einer Matrix (Zeilen x Regeln) gesammelt, aus der Gesamtmaske, Trefferzahlen
+    und betroffene Zeilen abgeleitet werden.
+
+    Args:
+        df (pd.DataFrame): Zu prüfende Lieferdaten.
+        regeln (list): Regeln aus lade_regeln() (Standard: anomalie_regeln.toml).
+        heute (pd.Timestamp): Referenzdatum für Regeln mit dem Wert "heute".
+
+    Returns:
+        AnomalieErgebnis: Gesamtmaske, Treffer je Regel und betroffene Zeilen.
+    """
+    if regeln is None:
+        regeln = lade_regeln()
+
+    benoetigte_spalten = {regel["spalte"] for regel in regeln}
+    benoetigte_spalten |= {regel["vergleichsspalte"] for regel in regeln if "vergleichsspalte" in regel}
+    datumsspalten = _datumsspalten(regeln)
+    spalten = {name: _spalte_vorbereiten(df[name], name in datumsspalten) for name in benoetigte_spalten}
+
+    kompiliert = kompiliere_regeln(regeln, heute=heute)
+    matrix = np.zeros((len(df), len(kompiliert)), dtype=bool)
+    for i, (_, maske) in enumerate(kompiliert):
+        # Vergleiche mit fehlenden Werten (NaN/NaT/NA) gelten nicht als Treffer
+        matrix[:, i] = maske(spalten).fillna(False).to_numpy(dtype=bool)
+
+    namen = [name for name, _ in kompiliert]
+    treffer = pd.DataFrame({"Regel": namen, "Anzahl": matrix.sum(axis=0)})
+    zeilen = {name: df.index[matrix[:, i]] for i, name in enumerate(namen)}
+
+    return AnomalieErgebnis(
+        maske=pd.Series(matrix.any(axis=1), index=df.index),
+        treffer=treffer,
+        zeilen=zeilen,
+    )
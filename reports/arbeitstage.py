@@ -0,0 +1,129 @@
+import os
+import tomllib
+
+import numpy as np
+import pandas as pd
+
+# Standard-Konfiguration liegt neben dem Dashboard
+STANDARD_KALENDER_PFAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arbeitskalender.toml")
+STANDARD_WOCHENMASKE = "1111100"
+
+
+def lade_kalender(pfad=STANDARD_KALENDER_PFAD):
+    """
+    Liest die Arbeitskalender je Land aus einer TOML-Datei und prüft sie.
+
+    Args:
+        pfad (str): Pfad zur Kalender-Konfiguration.
+
+    Returns:
+        dict: Konfiguration mit den Abschnitten "standard" und "land".
+
+    Raises:
+        ValueError: Bei ungültiger Wochenmaske oder ungültigem Feiertag.
+    """
+    with open(pfad, "rb") as datei:
+        konfiguration = tomllib.load(datei)
+
+    eintraege = {"standard": konfiguration.get("standard", {}), **konfiguration.get("land", {})}
+    for name, eintrag in eintraege.items():
+        maske = eintrag.get("wochenmaske", STANDARD_WOCHENMASKE)
+        if len(maske) != 7 or set(maske) - {"0", "1"}:
+            raise ValueError(f"Kalender '{name}': ungültige Wochenmaske {maske!r}")
+        for tag in eintrag.get("feiertage", []):
+            try:
+                np.datetime64(f"2000-{tag}")
+            except ValueError as fehler:
+                raise ValueError(f"Kalender '{name}': ungültiger Feiertag {tag!r}") from fehler
+    return konfiguration
+
+
+def ostersonntag(jahr):
+    """Datum des Ostersonntags (gregorianisch, Gaußsche Osterformel)."""
+    a, b, c = jahr % 19, jahr // 100, jahr % 100
+    d, e = b // 4, b % 4
+    g = (b - (b + 8) // 25 + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    monat, tag = divmod(h + l - 7 * m + 114, 31)
+    return np.datetime64(f"{jahr:04d}-{monat:02d}-{tag + 1:02d}")
+
+
+def feiertage(eintrag, jahre):
+    """Feste und bewegliche Feiertage eines Kalendereintrags für die angegebenen Jahre."""
+    tage = [np.datetime64(f"{jahr:04d}-{tag}") for jahr in jahre for tag in eintrag.get("feiertage", [])]
+    tage += [ostersonntag(jahr) + np.timedelta64(abstand, "D") for jahr in jahre for abstand in eintrag.get("ostern", [])]
+    return np.unique(np.array(tage, dtype="datetime64[D]"))
+
+
+def erstelle_kalender(konfiguration, jahre):
+    """
+    Erstellt die NumPy-Arbeitstagskalender je Land.
+
+    Args:
+        konfiguration (dict): Ergebnis von lade_kalender().
+        jahre (iterable): Jahre, für die Feiertage benötigt werden.
+
+    Returns:
+        dict: Land -> np.busdaycalendar; der Schlüssel None enthält den Standardkalender.
+    """
+    jahre = list(jahre)
+    standard = konfiguration.get("standard", {})
+    kalender = {
+        None: np.busdaycalendar(
+            weekmask=standard.get("wochenmaske", STANDARD_WOCHENMASKE), holidays=feiertage(standard, jahre)
+        )
+    }
+    for land, eintrag in konfiguration.get("land", {}).items():
+        kalender[land] = np.busdaycalendar(
+            weekmask=eintrag.get("wochenmaske", standard.get("wochenmaske", STANDARD_WOCHENMASKE)),
+            holidays=feiertage(eintrag, jahre),
+        )
+    return kalender
+
+
+def verspaetung_arbeitstage(soll, ist, land, konfiguration=None):
+    """
+    Berechnet die Verspätung in Arbeitstagen des Lieferlandes (vektorisiert je Land).
+
+    Ein Soll-Termin an einem arbeitsfreien Tag gilt als am nächsten Arbeitstag fällig. Gezählt
+    werden die Arbeitstage nach dem Soll-Termin bis einschließlich Wareneingang, negative Werte
+    bedeuten eine zu frühe Lieferung (Freitag fällig, Montag geliefert = 1 Arbeitstag).
+
+    Args:
+        soll (pd.Series): Lieferdatum (Soll).
+        ist (pd.Series): Wareneingangsdatum (WE).
+        land (pd.Series): Land je Lieferung.
+        konfiguration (dict): Arbeitskalender (Standard: arbeitskalender.toml).
+
+    Returns:
+        pd.Series: Verspätung in Arbeitstagen (int64; float mit NaN, falls Daten fehlen), Index wie soll.
+    """
+    konfiguration = lade_kalender() if konfiguration is None else konfiguration
+    soll_tage = pd.to_datetime(soll).to_numpy().astype("datetime64[D]")
+    ist_tage = pd.to_datetime(ist).to_numpy().astype("datetime64[D]")
+    gueltig = ~(np.isnat(soll_tage) | np.isnat(ist_tage))
+
+    ergebnis = np.full(len(soll_tage), np.nan)
+    if gueltig.any():
+        jahre = pd.DatetimeIndex(np.concatenate([soll_tage[gueltig], ist_tage[gueltig]])).year
+        kalender = erstelle_kalender(konfiguration, range(jahre.min(), jahre.max() + 2))
+
+        # Je Land ein Aufruf über alle Lieferungen dieses Landes
+        codes, laender = pd.factorize(pd.Series(land).astype(object))
+        for code in np.unique(codes[gueltig]):
+            auswahl = gueltig & (codes == code)
+            arbeitstage = kalender.get(laender[code] if code >= 0 else None, kalender[None])
+            faellig = np.busday_offset(soll_tage[auswahl], 0, roll="forward", busdaycal=arbeitstage)
+            eingang = ist_tage[auswahl]
+            # Arbeitstage in (fällig, Eingang] bzw. negativ in (Eingang, fällig]
+            ergebnis[auswahl] = np.where(
+                eingang >= faellig,
+                np.busday_count(faellig + 1, eingang + 1, busdaycal=arbeitstage),
+                np.busday_count(faellig, eingang, busdaycal=arbeitstage),
+            )
+
+    verspaetung = pd.Series(ergebnis, index=soll.index, name="Verspätung (Arbeitstage)")
+    return verspaetung.astype("int64") if gueltig.all() else verspaetung
@@ -0,0 +1,87 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# Anzahl zwischengespeicherter PNG-Grafiken (je Datenhash)
+MAX_GRAFIKEN = 8
+
+
+class Berichtsgrafik:
+    """
+    Statische Grafiken für den PDF-Report mit matplotlib (Agg), nur bei Bedarf gezeichnet.
+
+    Eine einzige Figure wird für alle Aufrufe wiederverwendet (nach jedem Zeichnen geleert),
+    der Speicherbedarf wächst also nicht mit der Anzahl der Aufrufe. Die PNG-Daten werden je
+    Hash von Daten und Titel zwischengespeichert; ein erneuter Export mit unveränderten Daten
+    zeichnet nicht neu.
+    """
+
+    def __init__(self, figsize=(16, 8), dpi=300, max_grafiken=MAX_GRAFIKEN):
+        self.figur = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figur)
+        self.dpi = dpi
+        self.max_grafiken = max_grafiken
+        self._grafiken = OrderedDict()
+        self._sperre = threading.Lock()
+
+    def lieferperformance(self, daten, titel, pfad=None):
+        """
+        Liniendiagramm der Zuverlässigkeit je Lieferant und Monat als PNG.
+
+        Args:
+            daten (pd.DataFrame): Spalten "Monat", "Lieferant" und "Zuverlässigkeit" (in %).
+            titel (str): Diagrammtitel.
+            pfad (str): Optional Zieldatei, in die das PNG geschrieben wird.
+
+        Returns:
+            bytes: PNG-Daten.
+        """
+        kennung = hashlib.sha1(
+            pd.util.hash_pandas_object(daten, index=False).to_numpy().tobytes() + titel.encode("utf-8")
+        ).hexdigest()
+        with self._sperre:
+            png = self._grafiken.get(kennung)
+            if png is None:
+                png = self._zeichne_lieferperformance(daten, titel)
+                self._grafiken[kennung] = png
+                if len(self._grafiken) > self.max_grafiken:
+                    self._grafiken.popitem(last=False)
+            self._grafiken.move_to_end(kennung)
+        if pfad is not None:
+            # Erst temporär schreiben, dann ersetzen - Leser sehen nie eine halbe Datei
+            with open(f"{pfad}.tmp", "wb") as datei:
+                datei.write(png)
+            os.replace(f"{pfad}.tmp", pfad)
+        return png
+
+    def _zeichne_lieferperformance(self, daten, titel):
+        # Plot-Farben
+        farben = sns.color_palette("tab10", n_colors=daten["Lieferant"].nunique())
+        achse = self.figur.add_subplot()
+        try:
+            for i, (lieferant, gruppe) in enumerate(daten.groupby("Lieferant", observed=True)):
+                achse.plot(
+                    gruppe["Monat"], gruppe["Zuverlässigkeit"], label=lieferant, color=farben[i], marker="o", linewidth=2
+                )
+
+            # Achsen und Titel anpassen
+            achse.set_title(titel, fontsize=16)
+            achse.set_xlabel("Monat", fontsize=12)
+            achse.set_ylabel("Zuverlässigkeit (%)", fontsize=12)
+            achse.set_ylim(0, 100)
+            achse.grid(True, which="major", linestyle="--", alpha=0.5)
+            achse.legend(title="Lieferant", fontsize=10, title_fontsize=12, loc="best")
+
+            self.figur.tight_layout()
+            puffer = io.BytesIO()
+            self.figur.savefig(puffer, format="png", dpi=self.dpi, bbox_inches="tight")
+            return puffer.getvalue()
+        finally:
+            self.figur.clear()
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import plotly.io as pio
+
+# Threads für Bildexporte; kaleido verarbeitet die Aufträge ohnehin nacheinander in einem Prozess
+MAX_THREADS = 2
+
+
+class Bildexport:
+    """
+    Schreibt Plotly-Diagramme im Hintergrund als PNG, ohne den Seitenaufbau zu blockieren.
+
+    Ein Diagramm wird nur neu geschrieben, wenn sich sein Inhalt (Hash der JSON-Spezifikation)
+    oder die Exportoptionen gegenüber dem letzten Export an denselben Pfad geändert haben.
+    Dateien werden erst temporär geschrieben und dann ersetzt, Leser sehen nie eine halbe Datei.
+    """
+
+    def __init__(self, max_threads=MAX_THREADS):
+        self._pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="bildexport")
+        self._sperre = threading.Lock()
+        self._kennungen = {}
+        self._auftraege = {}
+
+    def exportiere(self, abbildung, pfad, **optionen):
+        """
+        Stellt den Export eines Diagramms in die Warteschlange (entfällt bei unverändertem Inhalt).
+
+        Args:
+            abbildung (go.Figure): Plotly-Diagramm.
+            pfad (str): Zieldatei (PNG).
+            **optionen: Weitere Argumente für pio.write_image (z. B. width, height, scale).
+
+        Returns:
+            concurrent.futures.Future: Laufender oder letzter Export dieses Pfads.
+        """
+        spezifikation = abbildung.to_json() + json.dumps(optionen, sort_keys=True)
+        kennung = hashlib.sha1(spezifikation.encode("utf-8")).hexdigest()
+        with self._sperre:
+            if self._kennungen.get(pfad) != kennung or not os.path.exists(pfad):
+                self._kennungen[pfad] = kennung
+                self._auftraege[pfad] = self._pool.submit(self._schreibe, abbildung, pfad, kennung, optionen)
+            return self._auftraege[pfad]
+
+    def warte(self, pfade=None):
+        """Wartet, bis die Exporte der Pfade (None = alle) geschrieben sind, z. B. vor dem PDF-Export."""
+        with self._sperre:
+            auftraege = [auftrag for pfad, auftrag in self._auftraege.items() if pfade is None or pfad in pfade]
+        wait(auftraege)
+
+    def _schreibe(self, abbildung, pfad, kennung, optionen):
+        temp_pfad = f"{pfad}.tmp"
+        try:
+            pio.write_image(abbildung, temp_pfad, format="png", **optionen)
+            os.replace(temp_pfad, pfad)
+        except Exception:
+            # Beim nächsten Aufruf erneut versuchen
+            with self._sperre:
+                if self._kennungen.get(pfad) == kennung:
+                    del self._kennungen[pfad]
+            raise
@@ -1,5 +1,5 @@
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
 import plotly.express as px
 import streamlit as st
 from fpdf import FPDF
@@ -8,10 +8,27 @@ import plotly.io as pio
 import os
 import io
 import warnings
-import seaborn as sns
 import tempfile
 from html2image import Html2Image
 from plotly.tools import mpl_to_plotly
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from arbeitstage import lade_kalender, verspaetung_arbeitstage
+from berichtsgrafik import Berichtsgrafik
+from bildexport import Bildexport
+from dateiwaechter import Dateiwaechter
+from datenprofil import profil_tabelle
+from datensatz import lese_datensatz, verfuegbare_jahre, verfuegbare_quellen
+from filterzustand import Filterzustand, aus_query_params
+from hyperloglog import erstelle_skizzen
+from quantilskizzen import erstelle_quantilskizzen
+from rangliste import Rangliste
+from rollierende_kennzahlen import erstelle_monatszaehler
+from rollup import HIERARCHIE, erstelle_rollup
+from schema import formatiere_bytes, speicherbedarf, wende_schema_an
+from sternschema import erstelle_sternschema
+from toleranz import MAX_PROZENT, MAX_TAGE, Toleranz, erstelle_histogramm, ist_puenktlich
+from vorwaermen import haeufigste_zustaende, waerme_vor, zaehle_nutzung
+from zeitreihe import verdichte, zaehle_je_tag
 
 warnings.filterwarnings("ignore", message="missing ScriptRunContext!")
 
@@ -29,135 +46,356 @@ os.makedirs(images_dir, exist_ok=True)
 st.set_page_config(layout="wide")
 
 # Einlesen der Excel-Daten
-#file_path = "../data/raw/liefertreue_daten_2024_final_liefertreue.xlsx"
-file_path = "../data/raw/liefertreue_dataset_2024.xlsx"
+# Neue oder geänderte Dateien unter data/raw und data/raw/archiv werden im Append-Modus in den
+# nach Jahr/Monat partitionierten Datensatz (data/interim/liefertreue) übernommen.
+# Ein Hintergrund-Thread je Prozess überwacht die Quellordner, importiert Änderungen und wärmt die
+# Caches vor; erst dann wird der neue Datenstand ausgetauscht. Bis dahin arbeiten alle Sitzungen
+# mit dem bisherigen Stand (die Partitionen späterer Importe werden über bis_import ausgeblendet).
+@st.cache_resource(show_spinner="Neue Lieferdaten werden importiert ...", on_release=lambda waechter: waechter.beende())
+def datenwaechter():
+    return Dateiwaechter()
+
+waechter = datenwaechter()
+datenstand, vorwaermbericht = waechter.aktuell
+
+# PNG-Exporte der Diagramme (für Notebooks und PDF) laufen im Hintergrund und nur bei geändertem Inhalt
+@st.cache_resource(show_spinner=False)
+def bildexport():
+    return Bildexport()
+
+# Statische matplotlib-Grafiken für den PDF-Report (eine wiederverwendete Agg-Figure je Prozess)
+@st.cache_resource(show_spinner=False)
+def berichtsgrafik():
+    return Berichtsgrafik()
+
+# Threads, in denen die Diagramme einer Seite gleichzeitig berechnet werden
+@st.cache_resource(show_spinner=False)
+def diagramm_pool():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="diagramme")
+
+def zeige_diagramme(auftraege):
+    # Diagramme parallel berechnen und jedes anzeigen, sobald es fertig ist (ohne Sitzungszugriffe
+    # in den Threads); Rückgabe in der Reihenfolge der Aufträge
+    zukuenfte = {diagramm_pool().submit(berechnung): (nummer, ziel) for nummer, (ziel, berechnung) in enumerate(auftraege)}
+    abbildungen = [None] * len(auftraege)
+    for zukunft in as_completed(zukuenfte):
+        nummer, ziel = zukuenfte[zukunft]
+        abbildungen[nummer] = zukunft.result()
+        ziel.plotly_chart(abbildungen[nummer], use_container_width=True)
+    return abbildungen
+
+# Datenqualität analysieren (aus dem fortgeschriebenen Spaltenprofil)
+datenprofil = datenstand.profil
+anzahl_rohzeilen = next(iter(datenprofil.values())).anzahl if datenprofil else 0
+missing_values_count = pd.Series({spalte: profil.fehlend for spalte, profil in datenprofil.items()}, dtype="int64")
+missing_percentages = (missing_values_count / max(anzahl_rohzeilen, 1) * 100).round(2)
 
-df = pd.read_excel(file_path)
-
-# Datenquelle Informationen
-data_source = {
-    "Dateiname": os.path.basename(file_path),
-    "Letzte Bearbeitung": pd.to_datetime(os.path.getmtime(file_path), unit='s').strftime("%Y-%m-%d %H:%M:%S")
-}
+# Sidebar-Filter
+st.sidebar.header("Filteroptionen")
 
-# Datenqualität analysieren
-duplicates_count = df.duplicated().sum()
-missing_values_count = df.isnull().sum()
-missing_percentages = (missing_values_count / len(df) * 100).round(2)
+# Auswahl aus der URL (geteilte Ansicht) einmal je Sitzung als Vorgaben der Filter übernehmen;
+# ungültige Werte fallen auf die Standardvorgaben zurück
+if "url_filter" not in st.session_state:
+    st.session_state["url_filter"] = aus_query_params({name: st.query_params.get_all(name) for name in st.query_params})
+url_filter = st.session_state["url_filter"]
+
+def vorgabe_liste(name, optionen, standard):
+    werte = [wert for wert in url_filter.get(name, []) if wert in optionen]
+    return werte or list(standard)
+
+def vorgabe_zahl(name, minimum, maximum, standard):
+    wert = url_filter.get(name, standard)
+    return wert if minimum <= wert <= maximum else standard
+
+# Reihenfolge der Filter in Sidebar: Datenquellen, Jahr, Verspätung, Toleranzen, Land, Monat, Liefertreue, Mengenabweichung, Lieferant
+# Datenquellen-Auswahl (Archivdateien standardmäßig abgewählt)
+quellen = verfuegbare_quellen(bis_import=datenstand.importe)
+selected_sources = st.sidebar.multiselect(
+    "Selektion Datenquellen:", options=quellen,
+    default=vorgabe_liste("quellen", quellen, [q for q in quellen if not q.startswith("archiv.")]),
+)
 
-# Duplikate speichern
-df_duplicate_data = df[df.duplicated()]  # Enthält nur die Duplikate
+# Jahr-Auswahl (nur Jahre, für die Partitionen der gewählten Quellen vorliegen)
+jahre = verfuegbare_jahre(selected_sources, bis_import=datenstand.importe)
+if not jahre:
+    st.warning("Für die gewählten Datenquellen liegen keine Lieferdaten vor.")
+    st.stop()
+selected_year = st.sidebar.selectbox(
+    "Selektion Jahr:", options=jahre,
+    index=jahre.index(url_filter["jahr"]) if url_filter.get("jahr") in jahre else len(jahre) - 1,
+)
 
-# Datenbereinigung
-df_cleaned = df.drop_duplicates()  # Duplikate entfernen
-df_cleaned.fillna({"WE-Menge": 0, "Soll-Menge": 0}, inplace=True)  # Fehlende Werte füllen
+# Bereinigte Daten inkl. Verspätung, Liefertreue, Mengenabweichung und Datenqualität
+# Es werden nur die Partitionen des gewählten Jahres und der gewählten Quellen gelesen, in das
+# kompakte Schema (Kategorien, boolesche Liefertreue, kleine Ganzzahlen) umgewandelt und in
+# Faktentabelle (Lieferant-ID, Material-ID) und Stammdaten zerlegt.
+# Die Verspätung in Arbeitstagen (Kalender je Land aus arbeitskalender.toml) wird hier einmal
+# mitberechnet, die Umschaltung in der Sidebar tauscht danach nur Spalten.
+@st.cache_data(show_spinner=False)
+def lade_jahr(jahr, quellen, kennung, importe, kalender):
+    df = lese_datensatz(jahre=[jahr], quellen=list(quellen), bis_import=importe)
+    stern = erstelle_sternschema(wende_schema_an(df))
+    stern.fakten["Verspätung (Arbeitstage)"] = pd.to_numeric(
+        verspaetung_arbeitstage(df["Lieferdatum (Soll)"], df["Wareneingangsdatum (WE)"], df["Land"], kalender),
+        downcast="integer",
+    )
+    return stern, speicherbedarf(df)
+
+# Histogramme (Lieferant, Monat, Verspätung, Mengenabweichung) je Verspätungsart: OTD/OTIF für
+# beliebige Toleranzen werden daraus ohne Durchlauf über alle Lieferungen berechnet
+@st.cache_data(show_spinner=False)
+def lade_toleranzhistogramme(jahr, quellen, kennung, importe, kalender):
+    stern, _ = lade_jahr(jahr, quellen, kennung, importe, kalender)
+    return {
+        "Kalendertage": erstelle_histogramm(stern.fakten, "Verspätung (Tage)"),
+        "Arbeitstage": erstelle_histogramm(stern.fakten, "Verspätung (Arbeitstage)"),
+    }
 
-anomalies = df_cleaned[
-    (df_cleaned["Soll-Menge"] < 0) |
-    (df_cleaned["WE-Menge"] < 0) |
-    (pd.to_datetime(df_cleaned["Wareneingangsdatum (WE)"], errors="coerce") <
-     pd.to_datetime(df_cleaned["Bestelldatum"], errors="coerce"))
-]
+# HyperLogLog-Skizzen je Lieferant und Monat für geschätzte eindeutige Anzahlen (nur bei Bedarf erstellt)
+@st.cache_data(show_spinner=False)
+def lade_skizzen(jahr, quellen, kennung, importe, kalender):
+    stern, _ = lade_jahr(jahr, quellen, kennung, importe, kalender)
+    fakten = stern.fakten.assign(
+        Materialnummer=stern.materialien["Materialnummer"].take(stern.fakten["Material-ID"]).to_numpy()
+    )
+    return erstelle_skizzen(fakten, ["Lieferscheinnummer", "Materialnummer"])
+
+# Quantilskizzen je Lieferant und Monat für Verteilungen (Perzentile, Boxplots) beliebiger Filter
+VERTEILUNG_SPALTEN = ["Verspätung (Tage)", "Verspätung (Arbeitstage)", "Mengenabweichung"]
+
+@st.cache_data(show_spinner=False)
+def lade_quantilskizzen(jahr, quellen, kennung, importe, kalender):
+    stern, _ = lade_jahr(jahr, quellen, kennung, importe, kalender)
+    return erstelle_quantilskizzen(stern.fakten, VERTEILUNG_SPALTEN)
+
+kalender = lade_kalender()
+
+# Vorwärmen: Für den ersten und jeden neuen Datenstand werden Jahresdaten, Histogramme und Skizzen
+# der Standardansicht (Standardquellen, letztes Jahr) und der häufigsten Filterauswahlen im
+# Hintergrund-Thread des Dateiwächters in die gemeinsamen Caches geladen
+def berechne_ansicht(stand, parameter):
+    vorgaben = aus_query_params(parameter)
+    quellen_alle = verfuegbare_quellen(bis_import=stand.importe)
+    quellen = tuple(
+        [q for q in vorgaben.get("quellen", []) if q in quellen_alle]
+        or [q for q in quellen_alle if not q.startswith("archiv.")]
+    )
+    jahre = verfuegbare_jahre(list(quellen), bis_import=stand.importe)
+    if not jahre:
+        return
+    jahr = vorgaben["jahr"] if vorgaben.get("jahr") in jahre else jahre[-1]
+    lade_jahr(jahr, quellen, stand.kennung, stand.importe, kalender)
+    lade_toleranzhistogramme(jahr, quellen, stand.kennung, stand.importe, kalender)
+    lade_quantilskizzen(jahr, quellen, stand.kennung, stand.importe, kalender)
+    if vorgaben.get("schaetzung"):
+        lade_skizzen(jahr, quellen, stand.kennung, stand.importe, kalender)
+
+def vorwaermen(stand):
+    ansichten = [("Standardansicht", {})] + [
+        (f"Häufige Auswahl {nummer}", parameter) for nummer, parameter in enumerate(haeufigste_zustaende(), 1)
+    ]
+    return waerme_vor(stand.kennung, ansichten, lambda parameter: berechne_ansicht(stand, parameter))
 
-df_cleaned = df_cleaned.drop(anomalies.index)
+waechter.starte(vorwaermen)
 
-var_anzahl_anomalie = len(anomalies)
+stern, speicher_ohne_schema = lade_jahr(selected_year, tuple(selected_sources), datenstand.kennung, datenstand.importe, kalender)
+toleranzhistogramme = lade_toleranzhistogramme(selected_year, tuple(selected_sources), datenstand.kennung, datenstand.importe, kalender)
+df_cleaned = stern.fakten
 
-# Berechnung der Liefertreue und Mengenabweichung
-df_cleaned["Verspätung (Tage)"] = (
-    pd.to_datetime(df_cleaned["Wareneingangsdatum (WE)"]) - pd.to_datetime(df_cleaned["Lieferdatum (Soll)"])
-).dt.days
-df_cleaned["Liefertreue (Ja/Nein)"] = df_cleaned["Verspätung (Tage)"].apply(lambda x: "Ja" if x <= 0 else "Nein")
-df_cleaned["Mengenabweichung"] = df_cleaned["WE-Menge"] - df_cleaned["Soll-Menge"]
+# Duplikate (beim Import entfernt) der gewählten Datenquellen
+df_duplicate_data = datenstand.duplikate[datenstand.duplikate["Quelle"].isin(selected_sources)]
+duplicates_count = len(df_duplicate_data)
 
-# Spalte Datenqualität
-df_cleaned["Datenqualität"] = df_cleaned.apply(
-    lambda row: "Fehlende Werte" if row.isnull().any() else "OK", axis=1
+# Anomalien (beim Import anhand der Plausibilitätsregeln aus anomalie_regeln.toml aussortiert)
+anomalies = datenstand.anomalien[datenstand.anomalien["Quelle"].isin(selected_sources)]
+anomalie_treffer = (
+    datenstand.anomalie_treffer[datenstand.anomalie_treffer["Quelle"].isin(selected_sources)]
+    .groupby("Regel", sort=False)["Anzahl"].sum().reindex([regel["name"] for regel in datenstand.regeln], fill_value=0)
+    .rename_axis("Regel").reset_index()
 )
+var_anzahl_anomalie = len(anomalies)
 
 # Tabs erstellen
 tabs = st.tabs(["Dashboard Übersicht", "Analyse Lieferant", "Analyse Material", "PDF-Report", "Datenqualität", "Datenquelle", "Kontakt"])
 df = df_cleaned.copy()
 
-# Sidebar-Filter
-st.sidebar.header("Filteroptionen")
-
-# Reihenfolge der Filter in Sidebar: Land, Jahr, Monat, Liefertreue, Mengenabweichung, Lieferant
-# Länderauswahl
-selected_country = st.sidebar.multiselect(
-    "Selektion Länder:", options=df["Land"].unique(), default=df["Land"].unique()
+# Verspätung in Kalender- oder Arbeitstagen; OTD/OTIF, Liefertreue und Verspätungsdiagramme folgen der Auswahl
+verspaetung_modus = st.sidebar.radio(
+    "Verspätung in:", options=["Kalendertage", "Arbeitstage"], horizontal=True,
+    index=1 if url_filter.get("verspaetung") == "Arbeitstage" else 0,
+    help="Arbeitstage: ohne Wochenenden und Feiertage des Lieferlandes",
+)
+# Toleranzfenster für OTD/OTIF; Standard (beliebig früh, 0 Tage spät, 0 % Menge) entspricht der Liefertreue der Rohdaten
+toleranz_frueh = st.sidebar.select_slider(
+    "Toleranz verfrüht (Tage):", options=[*range(MAX_TAGE + 1), "unbegrenzt"],
+    value=vorgabe_zahl("toleranz_frueh", 0, MAX_TAGE, "unbegrenzt") if "toleranz_frueh" in url_filter else "unbegrenzt",
+)
+toleranz_spaet = st.sidebar.slider(
+    "Toleranz verspätet (Tage):", min_value=0, max_value=MAX_TAGE, value=vorgabe_zahl("toleranz_spaet", 0, MAX_TAGE, 0)
+)
+toleranz_menge = st.sidebar.slider(
+    "Toleranz Mengenabweichung (%):", min_value=0, max_value=MAX_PROZENT,
+    value=vorgabe_zahl("toleranz_menge", 0, MAX_PROZENT, 0),
+)
+toleranz = Toleranz(
+    frueh=None if toleranz_frueh == "unbegrenzt" else toleranz_frueh, spaet=toleranz_spaet, menge_prozent=toleranz_menge
 )
 
-# Jahr-Auswahl
-min_date = pd.to_datetime(df["Lieferdatum (Soll)"].min()).date()
-max_date = pd.to_datetime(df["Lieferdatum (Soll)"].max()).date()
-selected_year = st.sidebar.selectbox(
-    "Selektion Jahr:", options=range(min_date.year, max_date.year + 1), index=max_date.year - min_date.year
+if verspaetung_modus == "Arbeitstage":
+    df["Verspätung (Tage)"] = df["Verspätung (Arbeitstage)"]
+if verspaetung_modus == "Arbeitstage" or toleranz != Toleranz():
+    df["Liefertreu"] = ist_puenktlich(df["Verspätung (Tage)"], toleranz)
+    df["Liefertreue (Ja/Nein)"] = pd.Categorical.from_codes(
+        (~df["Liefertreu"]).astype("int8"), categories=df["Liefertreue (Ja/Nein)"].cat.categories
+    )
+
+# Länderauswahl (Länder in der Reihenfolge ihres ersten Auftretens)
+laender = list(stern.lieferanten["Land"].take(df["Lieferant-ID"].unique()).unique())
+selected_country = st.sidebar.multiselect(
+    "Selektion Länder:", options=laender, default=vorgabe_liste("laender", laender, laender)
 )
 
 # Monat-Auswahl
 month_names = ["Januar", "Februar", "März", "April", "Mai", "Juni",
                "Juli", "August", "September", "Oktober", "November", "Dezember"]
 selected_months = st.sidebar.multiselect(
-    "Selektion Monate:", options=range(1, 13), format_func=lambda x: month_names[x - 1], default=range(1, 13)
+    "Selektion Monate:", options=range(1, 13), format_func=lambda x: month_names[x - 1],
+    default=vorgabe_liste("monate", range(1, 13), range(1, 13)),
 )
 
 # Liefertreue-Filter
 liefertreue_options = ["Alle", "Ja", "Nein"]
 selected_liefertreue = st.sidebar.multiselect(
-    "Selektion Liefertreue:", options=liefertreue_options, default=["Alle"]
+    "Selektion Liefertreue:", options=liefertreue_options,
+    default=vorgabe_liste("liefertreue", liefertreue_options, ["Alle"]),
 )
 
 # Mengenabweichungsfilter (min und max)
+abweichung_bereich = (int(df["Mengenabweichung"].min()), int(df["Mengenabweichung"].max()))
+abweichung_vorgabe = url_filter.get("abweichung", [])
 min_abweichung, max_abweichung = st.sidebar.slider(
     "Filter nach Mengenabweichung (Ist - Soll):",
-    min_value=int(df["Mengenabweichung"].min()),
-    max_value=int(df["Mengenabweichung"].max()),
-    value=(int(df["Mengenabweichung"].min()), int(df["Mengenabweichung"].max())),
+    min_value=abweichung_bereich[0],
+    max_value=abweichung_bereich[1],
+    value=(
+        (max(abweichung_vorgabe[0], abweichung_bereich[0]), min(abweichung_vorgabe[1], abweichung_bereich[1]))
+        if len(abweichung_vorgabe) == 2 and abweichung_vorgabe[0] <= abweichung_vorgabe[1] else abweichung_bereich
+    ),
     step=1
 )
 
 # Lieferantenauswahl
-sorted_suppliers = sorted(df["Lieferantenbezeichnung"].unique())
+sorted_suppliers = sorted(stern.lieferanten["Lieferantenbezeichnung"].unique())
 supplier_options = ["Alle"] + sorted_suppliers
 selected_suppliers = st.sidebar.multiselect(
-    "Selektion Lieferanten:", options=supplier_options, default=["Alle"]
+    "Selektion Lieferanten:", options=supplier_options,
+    default=vorgabe_liste("lieferanten", supplier_options, ["Alle"]),
 )
 
+# Länge der Top-Listen (Lieferanten und Materialien)
+top_n = st.sidebar.number_input(
+    "Anzahl Einträge in Top-Listen:", min_value=1, max_value=100, value=vorgabe_zahl("top_n", 1, 100, 10), step=1
+)
+
+# Eindeutige Anzahlen (Lieferscheine, Materialien) optional aus HyperLogLog-Skizzen schätzen
+schaetzung_aktiv = st.sidebar.checkbox(
+    "Eindeutige Anzahlen schätzen (HyperLogLog)", value=url_filter.get("schaetzung", False),
+    help="Schneller bei großen Datenmengen; Lieferanten und Länder bleiben exakt",
+)
+
+# Top-N-Ranglisten bleiben je Sitzung erhalten; bei geänderten Daten oder Filtern werden
+# nur die Schlüssel mit geänderter Kennzahl neu einsortiert
+def rangliste(name, werte):
+    ranglisten = st.session_state.setdefault("ranglisten", {})
+    liste = ranglisten.setdefault(name, Rangliste())
+    liste.setze(werte)
+    return liste.top(top_n)
+
+# Kanonische Filterauswahl: Schlüssel für sitzungsübergreifend geteilte Ergebnisse und
+# URL-Parameter der Ansicht (Link kann geteilt werden)
+filterzustand = Filterzustand(
+    quellen=tuple(selected_sources), jahr=selected_year, verspaetung=verspaetung_modus,
+    toleranz_frueh=toleranz.frueh, toleranz_spaet=toleranz_spaet, toleranz_menge=toleranz_menge,
+    laender=tuple(selected_country), monate=tuple(selected_months), liefertreue=tuple(selected_liefertreue),
+    abweichung=(min_abweichung, max_abweichung), lieferanten=tuple(selected_suppliers),
+    top_n=int(top_n), schaetzung=schaetzung_aktiv,
+)
+if {name: st.query_params.get_all(name) for name in st.query_params} != filterzustand.als_query_params():
+    st.query_params.from_dict(filterzustand.als_query_params())
+
+# Jede neue Filterauswahl einer Sitzung zählen; die häufigsten werden beim Vorwärmen vorberechnet
+if st.session_state.get("gezaehlte_auswahl") != filterzustand.kennung:
+    st.session_state["gezaehlte_auswahl"] = filterzustand.kennung
+    zaehle_nutzung(filterzustand)
+
+# Ergebnisse je Filterauswahl, Datenstand und Arbeitskalender für alle Sitzungen zwischenspeichern;
+# ein neuer Datenstand (andere Kennung) oder ein geänderter Kalender macht alle Einträge ungültig
+@st.cache_data(show_spinner=False, max_entries=256)
+def gemerkt(name, filterkennung, datenkennung, kalender, _berechnung):
+    return _berechnung()
+
+def merke(name, berechnung):
+    return gemerkt(name, filterzustand.kennung, datenstand.kennung, kalender, berechnung)
+
 # Filterdaten anwenden
-filtered_df = df.copy()
+def gefilterte_positionen():
+    auswahl = np.ones(len(df), dtype=bool)
 
-if selected_country:
-    filtered_df = filtered_df[filtered_df["Land"].isin(selected_country)]
+    # Länder und Lieferanten werden über die Lieferant-ID gefiltert
+    if selected_country:
+        auswahl &= df["Lieferant-ID"].isin(stern.ids("lieferanten", "Land", selected_country)).to_numpy()
 
-filtered_df = filtered_df[
-    (pd.to_datetime(filtered_df["Lieferdatum (Soll)"]).dt.year == selected_year) &
-    (pd.to_datetime(filtered_df["Lieferdatum (Soll)"]).dt.month.isin(selected_months))
-]
+    soll_datum = pd.to_datetime(df["Lieferdatum (Soll)"])
+    auswahl &= ((soll_datum.dt.year == selected_year) & soll_datum.dt.month.isin(selected_months)).to_numpy()
 
-if "Alle" not in selected_liefertreue:
-    filtered_df = filtered_df[filtered_df["Liefertreue (Ja/Nein)"].isin(selected_liefertreue)]
+    if "Alle" not in selected_liefertreue:
+        auswahl &= df["Liefertreue (Ja/Nein)"].isin(selected_liefertreue).to_numpy()
 
-filtered_df = filtered_df[
-    (filtered_df["Mengenabweichung"] >= min_abweichung) &
-    (filtered_df["Mengenabweichung"] <= max_abweichung)
-]
+    auswahl &= ((df["Mengenabweichung"] >= min_abweichung) & (df["Mengenabweichung"] <= max_abweichung)).to_numpy()
 
-if "Alle" not in selected_suppliers:
-    filtered_df = filtered_df[filtered_df["Lieferantenbezeichnung"].isin(selected_suppliers)]
+    if "Alle" not in selected_suppliers:
+        auswahl &= df["Lieferant-ID"].isin(
+            stern.ids("lieferanten", "Lieferantenbezeichnung", selected_suppliers)
+        ).to_numpy()
+    return np.flatnonzero(auswahl)
+
+filtered_df = df.iloc[merke("positionen", gefilterte_positionen)]
 
 # Anzeigen der gefilterten Daten
 st.sidebar.markdown(f"### Gefilterte Daten: {len(filtered_df)} Einträge")
 
-# Berechnungen für Kennzahlen
-total_orders = len(df)
-on_time_deliveries = df[df["Liefertreue (Ja/Nein)"] == "Ja"]
-otd_rate = (len(on_time_deliveries) / total_orders) * 100
+# Berechnungen für Kennzahlen über die aktive Filterauswahl
+# Länder, Lieferanten und Monate werden als Auswahl über die Histogrammschlüssel (Lieferant, Monat)
+# abgebildet; Liefertreue- und Mengenfilter wirken je Lieferung, dann wird das Histogramm aus
+# den gefilterten Lieferungen gebildet.
+zeilenfilter_aktiv = "Alle" not in selected_liefertreue or (min_abweichung, max_abweichung) != (
+    int(df["Mengenabweichung"].min()), int(df["Mengenabweichung"].max())
+)
+
+def schluessel_auswahl(schluessel):
+    # Auswahlmaske über Schlüssel (Lieferant-ID, Monat) entsprechend der Länder-, Monats- und Lieferantenfilter
+    auswahl = schluessel["Monat"].isin(selected_months).to_numpy()
+    if selected_country:
+        auswahl &= schluessel["Lieferant-ID"].isin(stern.ids("lieferanten", "Land", selected_country)).to_numpy()
+    if "Alle" not in selected_suppliers:
+        auswahl &= schluessel["Lieferant-ID"].isin(
+            stern.ids("lieferanten", "Lieferantenbezeichnung", selected_suppliers)
+        ).to_numpy()
+    return auswahl
+
+def liefertreue_raten():
+    if zeilenfilter_aktiv:
+        histogramm, auswahl = erstelle_histogramm(filtered_df, "Verspätung (Tage)"), None
+    else:
+        histogramm = toleranzhistogramme[verspaetung_modus]
+        auswahl = schluessel_auswahl(histogramm.schluessel)
+    return (*histogramm.raten(toleranz, auswahl), *histogramm.raten(toleranz, auswahl, gewichtet=True))
+
+otd_rate, otif_rate, otd_rate_menge, otif_rate_menge = merke("raten", liefertreue_raten)
 
-full_and_on_time_deliveries = df[
-    (df["Liefertreue (Ja/Nein)"] == "Ja") & (df["Mengenabweichung"] == 0)
-]
-otif_rate = (len(full_and_on_time_deliveries) / total_orders) * 100
+# Kennzahlen je Land, Lieferant und Material in einem Durchlauf über die gefilterten Lieferungen;
+# Auswertungen und Drill-down auf den verschiedenen Ebenen lesen daraus statt erneut zu gruppieren
+rollup = merke("rollup", lambda: erstelle_rollup(stern, filtered_df))
 
 # Tab 0: Dashboard Übersicht
 with tabs[0]:
@@ -165,21 +403,40 @@ with tabs[0]:
     
     # Kennzahlen
     total_deliveries = len(filtered_df)
-    on_time = len(filtered_df[filtered_df["Liefertreue (Ja/Nein)"] == "Ja"])
-    delayed = len(filtered_df[filtered_df["Liefertreue (Ja/Nein)"] == "Nein"])
+    on_time = int(filtered_df["Liefertreu"].sum())
+    delayed = total_deliveries - on_time
     
     # Berechnung des Anteils Liefertreue = Nein
     total_rows = len(filtered_df)
-    no_delivery_reliability = filtered_df[filtered_df["Liefertreue (Ja/Nein)"] == "Nein"]
+    no_delivery_reliability = filtered_df[~filtered_df["Liefertreu"]]
     no_delivery_reliability_count = len(no_delivery_reliability)
     reliability_no_percentage = round((no_delivery_reliability_count / total_rows * 100), 2)
 
     
     # Zusätzliche Kennzahlen
-    unique_suppliers = filtered_df["Lieferantenbezeichnung"].nunique()
-    unique_materials = filtered_df["Materialnummer"].nunique()
-    unique_invoices = filtered_df["Lieferscheinnummer"].nunique()
-    unique_countries = filtered_df["Land"].nunique()
+    # Geschätzt: Vereinigung der Skizzen der ausgewählten Lieferanten und Monate; Lieferanten und
+    # Länder ergeben sich exakt aus den Schlüsseln. Liefertreue- und Mengenfilter wirken je
+    # Lieferung, dann wird exakt gezählt.
+    geschaetzt = schaetzung_aktiv and not zeilenfilter_aktiv
+    if geschaetzt:
+        skizzen = lade_skizzen(selected_year, tuple(selected_sources), datenstand.kennung, datenstand.importe, kalender)
+
+    def eindeutige_anzahlen():
+        if geschaetzt:
+            skizzen_auswahl = schluessel_auswahl(skizzen.schluessel)
+            lieferanten = stern.lieferanten.take(skizzen.schluessel["Lieferant-ID"][skizzen_auswahl].unique())
+            materialien = round(skizzen.anzahl("Materialnummer", skizzen_auswahl))
+            lieferscheine = round(skizzen.anzahl("Lieferscheinnummer", skizzen_auswahl))
+        else:
+            lieferanten = stern.lieferanten.take(filtered_df["Lieferant-ID"].unique())
+            materialien = stern.materialien.take(filtered_df["Material-ID"].unique())["Materialnummer"].nunique()
+            lieferscheine = filtered_df["Lieferscheinnummer"].nunique()
+        return (
+            materialien, lieferscheine,
+            lieferanten["Lieferantenbezeichnung"].nunique(), lieferanten["Land"].nunique(),
+        )
+
+    unique_materials, unique_invoices, unique_suppliers, unique_countries = merke("anzahlen", eindeutige_anzahlen)
 
     # Einheitliches Design für die Kennzahlen
     def styled_metric(label, value, background_color="#1976D2", text_color="white"):
@@ -250,6 +507,12 @@ with tabs[0]:
     col1, col2 = st.columns(2)
     col1.markdown(styled_metric("OTD-Rate (On-Time Delivery)", f"{otd_rate:.2f}%"), unsafe_allow_html=True)
     col2.markdown(styled_metric("OTIF-Rate (On-Time in Full)", f"{otif_rate:.2f}%"), unsafe_allow_html=True)
+
+    # Mengengewichtet (nach Soll-Menge): große Lieferungen zählen entsprechend mehr
+    st.markdown("<br>", unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
+    col1.markdown(styled_metric("OTD-Rate (mengengewichtet)", f"{otd_rate_menge:.2f}%"), unsafe_allow_html=True)
+    col2.markdown(styled_metric("OTIF-Rate (mengengewichtet)", f"{otif_rate_menge:.2f}%"), unsafe_allow_html=True)
   
     # Erste Reihe von Kennzahlen
     st.markdown("### Weitere - Kennzahlen")
@@ -267,106 +530,166 @@ with tabs[0]:
     col7, col8, col9, col10 = st.columns(4)
 
     col7.markdown(styled_metric("Anzahl Lieferanten", unique_suppliers), unsafe_allow_html=True)
-    col8.markdown(styled_metric("Anzahl Materialien", unique_materials), unsafe_allow_html=True)
-    col9.markdown(styled_metric("Anzahl Lieferscheine", unique_invoices), unsafe_allow_html=True)
+    praefix = "≈ " if geschaetzt else ""
+    col8.markdown(styled_metric("Anzahl Materialien", f"{praefix}{unique_materials}"), unsafe_allow_html=True)
+    col9.markdown(styled_metric("Anzahl Lieferscheine", f"{praefix}{unique_invoices}"), unsafe_allow_html=True)
     col10.markdown(styled_metric("Anzahl Länder", unique_countries), unsafe_allow_html=True)
+    if geschaetzt:
+        st.caption(
+            f"≈ geschätzt mit HyperLogLog: Standardfehler ±{skizzen.standardfehler * 100:.1f}%, "
+            f"in 95% der Fälle innerhalb ±{2 * skizzen.standardfehler * 100:.1f}%"
+        )
 
     # Leerzeichen zwischen den Reihen
     st.markdown("<br>", unsafe_allow_html=True)
-    
+
+    # Verteilungen aus den Quantilskizzen (Liefertreue- und Mengenfilter: Skizzen der gefilterten Lieferungen)
+    if zeilenfilter_aktiv:
+        verspaetung_spalte = "Verspätung (Tage)"
+    else:
+        verspaetung_spalte = "Verspätung (Arbeitstage)" if verspaetung_modus == "Arbeitstage" else "Verspätung (Tage)"
+    einheit = "Arbeitstage" if verspaetung_modus == "Arbeitstage" else "Tage"
+
+    def verteilungen():
+        if zeilenfilter_aktiv:
+            quantilskizzen = erstelle_quantilskizzen(filtered_df, ["Verspätung (Tage)", "Mengenabweichung"])
+            verteilung_auswahl = np.ones(len(quantilskizzen.schluessel), dtype=bool)
+        else:
+            quantilskizzen = lade_quantilskizzen(selected_year, tuple(selected_sources), datenstand.kennung, datenstand.importe, kalender)
+            verteilung_auswahl = schluessel_auswahl(quantilskizzen.schluessel)
+        quantile = quantilskizzen.quantile(verspaetung_spalte, [0.5, 0.9, 0.99], verteilung_auswahl)
+
+        # Boxplots je Land aus vereinigten Skizzen der Lieferanten des Landes
+        lieferant_land = stern.lieferanten["Land"].take(quantilskizzen.schluessel["Lieferant-ID"]).to_numpy()
+        boxplot_laender = [land for land in laender if (verteilung_auswahl & (lieferant_land == land)).any()]
+
+        def boxplot_nach_land(spalte, titel, achse):
+            abbildung = go.Figure()
+            for land in boxplot_laender:
+                kennwerte = quantilskizzen.boxplot(spalte, verteilung_auswahl & (lieferant_land == land))
+                abbildung.add_trace(go.Box(
+                    name=land, x=[land], q1=[kennwerte["q1"]], median=[kennwerte["median"]], q3=[kennwerte["q3"]],
+                    lowerfence=[kennwerte["lowerfence"]], upperfence=[kennwerte["upperfence"]],
+                    marker_color="#1976D2", showlegend=False,
+                ))
+            abbildung.update_layout(title=titel, yaxis_title=achse, xaxis_title="Land", plot_bgcolor="rgba(0,0,0,0)")
+            return abbildung
+
+        return (
+            quantile,
+            boxplot_nach_land(verspaetung_spalte, "Verspätung nach Land", f"Verspätung ({einheit})"),
+            boxplot_nach_land("Mengenabweichung", "Mengenabweichung nach Land", "Mengenabweichung (Ist - Soll)"),
+        )
+
+    (p50, p90, p99), boxplot_verspaetung, boxplot_abweichung = merke("verteilungen", verteilungen)
+
+    st.markdown("### Verteilung Verspätung")
+    col11, col12, col13 = st.columns(3)
+    col11.markdown(styled_metric("Verspätung P50", f"{p50:.0f} {einheit}"), unsafe_allow_html=True)
+    col12.markdown(styled_metric("Verspätung P90", f"{p90:.0f} {einheit}"), unsafe_allow_html=True)
+    col13.markdown(styled_metric("Verspätung P99", f"{p99:.0f} {einheit}"), unsafe_allow_html=True)
+
+    col14, col15 = st.columns(2)
+    col14.plotly_chart(boxplot_verspaetung, use_container_width=True)
+    col15.plotly_chart(boxplot_abweichung, use_container_width=True)
+
     # Diagramme
+    # Die drei Diagramme werden gleichzeitig berechnet und erscheinen, sobald sie fertig sind
     st.markdown("### Auswertungen")
     col1, col2, col3 = st.columns(3)
 
-    # Daten vorbereiten: Liefertreue zählen
-    liefertreue_counts = (
-        filtered_df["Liefertreue (Ja/Nein)"]
-        .value_counts()  # Anteil berechnen
-        .reset_index()
-        #.rename(columns={"index": "Liefertreue", "Liefertreue (Ja/Nein)": "Anzahl"})
-    )
-
-    # Überprüfen, ob die Daten korrekt sind
-    #st.write("Liefertreue-Daten (für Debugging):", liefertreue_counts)
-
-    # Horizontales Balkendiagramm erstellen
-    anteil_liefertreue_bar = px.bar(
-        liefertreue_counts,
-        x="count", 
-        y="Liefertreue (Ja/Nein)",
-        orientation='h',  # Horizontal
-        title="Liefertreue Anteil",
-        labels={"Anzahl": "Anzahl der Lieferungen", "Liefertreue": "Liefertreue (Ja/Nein)"},
-        color="Liefertreue (Ja/Nein)",
-        color_discrete_sequence=["#1976D2", "#63B2EE"],
-        text="count"
-    )
+    def liefertreue_anteil():
+        # Daten vorbereiten: Liefertreue zählen
+        liefertreue_counts = (
+            filtered_df["Liefertreue (Ja/Nein)"]
+            .value_counts()  # Anteil berechnen
+            .reset_index()
+            #.rename(columns={"index": "Liefertreue", "Liefertreue (Ja/Nein)": "Anzahl"})
+        )
 
-    anteil_liefertreue_bar.update_layout(
-        xaxis_title="Anzahl der Lieferungen",
-        yaxis_title="Liefertreue (Ja/Nein)",
-        showlegend=False,  # Keine Legende
-        plot_bgcolor="rgba(0,0,0,0)"  # Transparenter Hintergrund
-    )
+        # Überprüfen, ob die Daten korrekt sind
+        #st.write("Liefertreue-Daten (für Debugging):", liefertreue_counts)
+
+        # Horizontales Balkendiagramm erstellen
+        anteil_liefertreue_bar = px.bar(
+            liefertreue_counts,
+            x="count", 
+            y="Liefertreue (Ja/Nein)",
+            orientation='h',  # Horizontal
+            title="Liefertreue Anteil",
+            labels={"Anzahl": "Anzahl der Lieferungen", "Liefertreue": "Liefertreue (Ja/Nein)"},
+            color="Liefertreue (Ja/Nein)",
+            color_discrete_sequence=["#1976D2", "#63B2EE"],
+            text="count"
+        )
 
-    # Anzeige im Streamlit-Dashboard
-    col1.plotly_chart(anteil_liefertreue_bar, use_container_width=True)
-    pio.write_image(anteil_liefertreue_bar, "../reports/images/liefertreue_anteil.png", width=794, height=400,scale=3)
+        anteil_liefertreue_bar.update_layout(
+            xaxis_title="Anzahl der Lieferungen",
+            yaxis_title="Liefertreue (Ja/Nein)",
+            showlegend=False,  # Keine Legende
+            plot_bgcolor="rgba(0,0,0,0)"  # Transparenter Hintergrund
+        )
+        return anteil_liefertreue_bar
 
     # Zeitverlauf: Liefertreue
-    liefertreue_zeit = (
-        filtered_df.groupby(pd.to_datetime(filtered_df["Lieferdatum (Soll)"]).dt.date)["Liefertreue (Ja/Nein)"]
-        .value_counts()
-        .unstack(fill_value=0)
-    )
-    liefertreue_zeit["Monat/Jahr"] = liefertreue_zeit.index
-    
-    liefertreue_zeit_line = px.area(
-        liefertreue_zeit, x="Monat/Jahr", y=["Ja", "Nein"],
-        title="Liefertreue über die Zeit",
-        labels={"value": "Anzahl", "variable": "Status"}
-    )
-    
+    # Tageszählung in einem Durchlauf; je nach Zeitspanne als Tage, Wochen oder Monate dargestellt
+    # (höchstens MAX_PUNKTE Zeitpunkte, darüber mit LTTB ausgedünnt)
+    def liefertreue_zeitverlauf():
+        liefertreue_zeit, zeit_aufloesung = verdichte(
+            zaehle_je_tag(filtered_df["Lieferdatum (Soll)"], filtered_df["Liefertreue (Ja/Nein)"])
+        )
+        liefertreue_zeit = liefertreue_zeit.copy()
+        liefertreue_zeit["Monat/Jahr"] = liefertreue_zeit.index.date
+
+        return px.area(
+            liefertreue_zeit, x="Monat/Jahr", y=["Ja", "Nein"],
+            title="Liefertreue über die Zeit" + ("" if zeit_aufloesung == "Tag" else f" (je {zeit_aufloesung})"),
+            labels={"value": "Anzahl", "variable": "Status"}
+        )
+
     #liefertreue_zeit_line.update_traces(marker=dict(colorscale="Viridis"))
-    col2.plotly_chart(liefertreue_zeit_line, use_container_width=True)
-    pio.write_image(liefertreue_zeit_line, "../reports/images/liefertreue_zeit_linie.png", width=794, height=400, scale=2)
-
-    # Abweichungen pro Land berechnen
-    abweichung_nach_land = filtered_df.groupby("Land").agg({
-        "Soll-Menge": "sum",
-        "WE-Menge": "sum"
-    }).reset_index()
-
-    # Abweichung berechnen: Ist - Soll
-    abweichung_nach_land["Abweichung"] = abweichung_nach_land["WE-Menge"] - abweichung_nach_land["Soll-Menge"]
-
-    # Separate Spalten für Über- und Unterlieferung
-    abweichung_nach_land["Überlieferung"] = abweichung_nach_land["Abweichung"].apply(lambda x: x if x > 0 else 0)
-    abweichung_nach_land["Unterlieferung"] = abweichung_nach_land["Abweichung"].apply(lambda x: x if x < 0 else 0)
-
-    # Bar-Chart erstellen
-    ueber_unterlieferung_bar = px.bar(
-        abweichung_nach_land,
-        x="Land",
-        y=["Überlieferung", "Unterlieferung"],  # Zwei separate Balken: Über- und Unterlieferung
-        title="Über- und Unterlieferungen nach Land",
-        labels={"value": "Abweichung (Ist - Soll)", "variable": "Typ", "Land": "Land"},
-        text_auto=True,  # Automatische Anzeige der Werte
-        color_discrete_map={"Überlieferung": "#1976D2", "Unterlieferung": "#63B2EE"}# Farben für die beiden Kategorien
-    )
 
-    # Layout anpassen
-    ueber_unterlieferung_bar.update_layout(
-        barmode="relative",  # Balken gestapelt (relativ)
-        xaxis_title="Land",
-        yaxis_title="Abweichung (Ist - Soll)",
-        plot_bgcolor="rgba(0,0,0,0)",  # Hintergrund transparent
-        showlegend=True  # Legende für Über- und Unterlieferung anzeigen
-    )
+    def ueber_unterlieferung():
+        # Abweichungen pro Land berechnen
+        abweichung_nach_land = rollup.summe(["Land"])[["Land", "Soll-Menge", "WE-Menge"]].copy()
+
+        # Abweichung berechnen: Ist - Soll
+        abweichung_nach_land["Abweichung"] = abweichung_nach_land["WE-Menge"] - abweichung_nach_land["Soll-Menge"]
+
+        # Separate Spalten für Über- und Unterlieferung
+        abweichung_nach_land["Überlieferung"] = abweichung_nach_land["Abweichung"].apply(lambda x: x if x > 0 else 0)
+        abweichung_nach_land["Unterlieferung"] = abweichung_nach_land["Abweichung"].apply(lambda x: x if x < 0 else 0)
+
+        # Bar-Chart erstellen
+        ueber_unterlieferung_bar = px.bar(
+            abweichung_nach_land,
+            x="Land",
+            y=["Überlieferung", "Unterlieferung"],  # Zwei separate Balken: Über- und Unterlieferung
+            title="Über- und Unterlieferungen nach Land",
+            labels={"value": "Abweichung (Ist - Soll)", "variable": "Typ", "Land": "Land"},
+            text_auto=True,  # Automatische Anzeige der Werte
+            color_discrete_map={"Überlieferung": "#1976D2", "Unterlieferung": "#63B2EE"}# Farben für die beiden Kategorien
+        )
+
+        # Layout anpassen
+        ueber_unterlieferung_bar.update_layout(
+            barmode="relative",  # Balken gestapelt (relativ)
+            xaxis_title="Land",
+            yaxis_title="Abweichung (Ist - Soll)",
+            plot_bgcolor="rgba(0,0,0,0)",  # Hintergrund transparent
+            showlegend=True  # Legende für Über- und Unterlieferung anzeigen
+        )
+        return ueber_unterlieferung_bar
 
     # Anzeige im Streamlit-Dashboard
-    col3.plotly_chart(ueber_unterlieferung_bar, use_container_width=True)
-    pio.write_image(ueber_unterlieferung_bar, "../reports/images/ueber_unterlieferung_land_bar.png", width=794, height=400,scale=3)
+    anteil_liefertreue_bar, liefertreue_zeit_line, ueber_unterlieferung_bar = zeige_diagramme([
+        (col1, liefertreue_anteil),
+        (col2, lambda: merke("zeitverlauf", liefertreue_zeitverlauf)),
+        (col3, ueber_unterlieferung),
+    ])
+    bildexport().exportiere(anteil_liefertreue_bar, "../reports/images/liefertreue_anteil.png", width=794, height=400, scale=3)
+    bildexport().exportiere(liefertreue_zeit_line, "../reports/images/liefertreue_zeit_linie.png", width=794, height=400, scale=2)
+    bildexport().exportiere(ueber_unterlieferung_bar, "../reports/images/ueber_unterlieferung_land_bar.png", width=794, height=400, scale=3)
 
     # CSS für breitere Scrollbar hinzufügen
     st.markdown(
@@ -416,146 +739,108 @@ with tabs[1]:
         "Verspätung (Tage)"
     ]
 
-    supplier_table = filtered_supplier_data[table_columns]
-
     # --- Diagramme und Analysen ---
     st.markdown("### Visualisierung")
-    col1 = st.container()
-    
-    # Lieferperformance der letzten 6 Monate
-    filtered_supplier_data["Lieferdatum (Soll)"] = pd.to_datetime(
-        filtered_supplier_data["Lieferdatum (Soll)"], format="%d.%m.%Y", dayfirst=True
-    )
-    max_date = filtered_supplier_data["Lieferdatum (Soll)"].max()
-    
-    last_six_months = pd.date_range(end=max_date, periods=6, freq="M").to_period("M")
-
-    # Berechnung der Top-Lieferanten basierend auf "Liefertreue = Nein" in den letzten 6 Monaten
-    lieferanten_risiko = (
-        filtered_supplier_data[
-            pd.to_datetime(filtered_supplier_data["Lieferdatum (Soll)"]).dt.to_period("M").isin(last_six_months)
-        ]
-        .groupby("Lieferantenbezeichnung")["Liefertreue (Ja/Nein)"]
-        .apply(lambda x: round((x == "Nein").mean() * 100, 2))  # Anteil von "Nein" in %
-        .reset_index()
-        .rename(columns={"Liefertreue (Ja/Nein)": "Anteil Nein (%)"})
-        .sort_values(by="Anteil Nein (%)", ascending=False)  # Sortieren nach höchstem Risiko
-    )
-
-    # Auswahl der Top 5 Lieferanten mit höchstem Anteil "Nein"
-    top_lieferanten = lieferanten_risiko.head(10)["Lieferantenbezeichnung"].tolist()
-
-    # Filterung der Hauptdaten für die Top-Lieferanten
-    lieferperformance = (
-        filtered_supplier_data[
-            pd.to_datetime(filtered_supplier_data["Lieferdatum (Soll)"]).dt.to_period("M").isin(last_six_months)
-        ]
-        .groupby([
-            pd.to_datetime(filtered_supplier_data["Lieferdatum (Soll)"]).dt.to_period("M"),
-            "Lieferantenbezeichnung"
-        ])
-        .agg({
-            "Lieferscheinnummer": "count",
-            "Liefertreue (Ja/Nein)": lambda x: round((x == "Ja").mean() * 100, 2)  # Anteil "Ja" in %
-        })
-        .reset_index()
-        .rename(columns={"Lieferdatum (Soll)": "Monat", "Liefertreue (Ja/Nein)": "Zuverlässigkeit"})
-    )
 
-    # Filtere nur die Top-Lieferanten
-    filtered_lieferperformance = lieferperformance[lieferperformance["Lieferantenbezeichnung"].isin(top_lieferanten)]
-
-    # Pivotieren und Umstrukturieren der gefilterten Daten
-    lieferperformance_pivot = filtered_lieferperformance.pivot(
-        index="Monat", columns="Lieferantenbezeichnung", values="Zuverlässigkeit"
-    ).fillna(0)
-    lieferperformance_pivot.index = lieferperformance_pivot.index.astype(str)
-    df_lieferperformance = lieferperformance_pivot.reset_index().melt(
-        id_vars=["Monat"], var_name="Lieferant", value_name="Zuverlässigkeit"
-    )
-
-    # Linien-Diagramm erstellen
-    lieferperformance_linie = px.line(
-        df_lieferperformance,
-        x="Monat",
-        y="Zuverlässigkeit",
-        color="Lieferant",
-        title="Lieferperformance Top 10 - Kritische Lieferanten in den letzten 6 Monaten",
-        labels={"Monat": "Monat", "Zuverlässigkeit": "Zuverlässigkeit (%)", "Lieferant": "Lieferant"}
-    )
+    # Eigenes Fragment: Zeitraum und Fenster berechnen nur dieses Diagramm neu, nicht die ganze Seite
+    @st.fragment
+    def lieferperformance():
+        col1 = st.container()
+    
+        # Lieferperformance der letzten Monate
+        # Lieferungen je Lieferant und Monat werden einmal gezählt und kumuliert; Rangfolge und
+        # rollierende Zuverlässigkeit für beliebige Zeiträume sind danach Differenzen der Präfixsummen
+        zeitraum = st.select_slider(
+            "Zeitraum Lieferperformance (Monate):", options=[1, 3, 6, 12], value=6, key="zeitraum_lieferperformance"
+        )
+        rollierend = st.select_slider(
+            "Zuverlässigkeit rollierend über (Monate):", options=[1, 3, 6, 12], value=1, key="fenster_lieferperformance"
+        )
+        monatszaehler = merke("monatszaehler", lambda: erstelle_monatszaehler(
+            filtered_df.assign(
+                Lieferantenbezeichnung=stern.lieferanten["Lieferantenbezeichnung"].take(filtered_df["Lieferant-ID"]).to_numpy()
+            ),
+            schluessel="Lieferantenbezeichnung",
+        ))
+
+        # Berechnung der Top-Lieferanten basierend auf "Liefertreue = Nein" im gewählten Zeitraum
+        lieferanten_risiko = monatszaehler.fenster_bis(zeitraum)
+        lieferanten_risiko = (
+            (lieferanten_risiko["Lieferungen"] - lieferanten_risiko["Pünktlich"])
+            / lieferanten_risiko["Lieferungen"] * 100  # Anteil von "Nein" in %
+        ).round(2)
+
+        # Auswahl der Top-N Lieferanten mit höchstem Anteil "Nein"
+        top_lieferanten = rangliste("risiko_zeitraum", lieferanten_risiko).index.tolist()
+
+        # Rollierende Zuverlässigkeit (Anteil "Ja" in %) der Top-Lieferanten in den Monaten des Zeitraums
+        lieferperformance_pivot = (
+            monatszaehler.zuverlaessigkeit(rollierend).loc[top_lieferanten].iloc[:, -zeitraum:].T.round(2)
+        )
+        lieferperformance_pivot.index = lieferperformance_pivot.index.astype(str).rename("Monat")
+        df_lieferperformance = lieferperformance_pivot.reset_index().melt(
+            id_vars=["Monat"], var_name="Lieferant", value_name="Zuverlässigkeit"
+        ).dropna(subset=["Zuverlässigkeit"])
+
+        # Linien-Diagramm erstellen
+        lieferperformance_linie = px.line(
+            df_lieferperformance,
+            x="Monat",
+            y="Zuverlässigkeit",
+            color="Lieferant",
+            title=f"Lieferperformance Top {top_n} - Kritische Lieferanten in den letzten {zeitraum} Monaten",
+            labels={"Monat": "Monat", "Zuverlässigkeit": "Zuverlässigkeit (%)", "Lieferant": "Lieferant"}
+        )
 
-    # Layout und Traces anpassen
-    lieferperformance_linie.update_layout(
-        yaxis=dict(ticksuffix="%", range=[0, 100]),  # Y-Achse mit Prozentwerten
-        xaxis=dict(showgrid=True),  # X-Achse mit Grid
-        plot_bgcolor="rgba(0,0,0,0)",  # Hintergrundfarbe weiß
-        hovermode="x unified",  # Hovermodus einheitlich
-        colorway=px.colors.qualitative.Plotly  # Standard-Farbschema
-    ).update_traces(
-        mode="lines+markers"  # Linien und Marker
-    )
+        # Layout und Traces anpassen
+        lieferperformance_linie.update_layout(
+            yaxis=dict(ticksuffix="%", range=[0, 100]),  # Y-Achse mit Prozentwerten
+            xaxis=dict(showgrid=True),  # X-Achse mit Grid
+            plot_bgcolor="rgba(0,0,0,0)",  # Hintergrundfarbe weiß
+            hovermode="x unified",  # Hovermodus einheitlich
+            colorway=px.colors.qualitative.Plotly  # Standard-Farbschema
+        ).update_traces(
+            mode="lines+markers"  # Linien und Marker
+        )
 
-    col1.plotly_chart(lieferperformance_linie, use_container_width=True)
+        col1.plotly_chart(lieferperformance_linie, use_container_width=True)
     
-    # Error: Bild kommt in Schwarz/Weiß statt in Farbe, daher Workaroung mit plt.savefig
-    #pio.write_image(lieferperformance_linie, "lieferperformance_linie.png", width=1200, height=550,scale=3)
-        
-    # Plot-Farben
-    farben = sns.color_palette("tab10", n_colors=df_lieferperformance["Lieferant"].nunique())
-
-    # Matplotlib-Plot erstellen
-    plt.figure(figsize=(16, 8))
-    for i, (lieferant, group) in enumerate(df_lieferperformance.groupby("Lieferant")):
-        plt.plot(
-            group["Monat"],
-            group["Zuverlässigkeit"],
-            label=lieferant,
-            color=farben[i],
-            marker="o",
-            linewidth=2
+        # Error: Bild kommt in Schwarz/Weiß statt in Farbe, daher Workaroung mit matplotlib (berichtsgrafik.py);
+        # die Grafik wird erst beim PDF-Export gezeichnet, hier werden nur Daten und Titel gemerkt
+        #pio.write_image(lieferperformance_linie, "lieferperformance_linie.png", width=1200, height=550,scale=3)
+        st.session_state["lieferperformance_bericht"] = (
+            df_lieferperformance,
+            f"Lieferperformance Top {top_n} - Kritische Lieferanten in den letzten {zeitraum} Monaten",
         )
 
-    # Achsen und Titel anpassen
-    plt.title("Lieferperformance Top 10 - Kritische Lieferanten in den letzten 6 Monaten", fontsize=16)
-    plt.xlabel("Monat", fontsize=12)
-    plt.ylabel("Zuverlässigkeit (%)", fontsize=12)
-    plt.ylim(0, 100)
-    plt.grid(True, which="major", linestyle="--", alpha=0.5)
-    plt.legend(title="Lieferant", fontsize=10, title_fontsize=12, loc="best")
-
-    # Plot als PNG speichern
-    plt.tight_layout()
-    plt.savefig("../reports/images/top10_lieferperformance_linie.png", dpi=300, bbox_inches="tight")
+    lieferperformance()
 
     col2, col3 = st.columns(2)
     
     # Liefertreue Verteilung (Gestapeltes Balkendiagramm)
+    # Anzahl Ja/Nein und Gesamtzahl je Lieferant aus dem Rollup (Lieferanten ohne Land zusammengefasst)
+    nach_lieferant = rollup.summe(["Lieferantenbezeichnung"])
     liefertreue_summary = (
-        filtered_supplier_data.groupby(["Lieferantenbezeichnung", "Liefertreue (Ja/Nein)"])["Lieferscheinnummer"]
-        .count()
-        .reset_index()
+        nach_lieferant.rename(columns={"Pünktlich": "Ja", "Verspätungen": "Nein", "Lieferungen": "Total"})
+        .melt(
+            id_vars=["Lieferantenbezeichnung", "Total"], value_vars=["Ja", "Nein"],
+            var_name="Liefertreue (Ja/Nein)", value_name="Lieferscheinnummer",
+        )
+        .query("Lieferscheinnummer > 0")
+        .sort_values(["Lieferantenbezeichnung", "Liefertreue (Ja/Nein)"], kind="stable")
+        .reset_index(drop=True)
     )
-
-    # Berechnung des Anteils von "Nein" für jeden Lieferanten
-    total_counts = (
-        liefertreue_summary.groupby("Lieferantenbezeichnung")["Lieferscheinnummer"]
-        .sum()
-        .reset_index()
-        .rename(columns={"Lieferscheinnummer": "Total"})
+    ist_nein = (liefertreue_summary["Liefertreue (Ja/Nein)"] == "Nein").to_numpy()
+    liefertreue_summary["Anteil Nein"] = np.where(
+        ist_nein, liefertreue_summary["Lieferscheinnummer"] / liefertreue_summary["Total"] * 100, 0
     )
 
-    liefertreue_summary = liefertreue_summary.merge(total_counts, on="Lieferantenbezeichnung")
-    liefertreue_summary["Anteil Nein"] = liefertreue_summary.apply(
-        lambda row: (row["Lieferscheinnummer"] / row["Total"] * 100) if row["Liefertreue (Ja/Nein)"] == "Nein" else 0,
-        axis=1
-    )
-
-    # Sortierung basierend auf dem Anteil "Nein"
-    top_10_lieferanten = (
-        liefertreue_summary[liefertreue_summary["Liefertreue (Ja/Nein)"] == "Nein"]
-        .sort_values(by="Anteil Nein", ascending=False)
-        .head(10)["Lieferantenbezeichnung"]
-    )
+    # Rangfolge basierend auf dem Anteil "Nein" (nur Lieferanten mit verspäteten Lieferungen)
+    top_10_lieferanten = rangliste(
+        "anteil_nein",
+        liefertreue_summary[ist_nein & (liefertreue_summary["Lieferscheinnummer"] > 0)]
+        .set_index("Lieferantenbezeichnung")["Anteil Nein"],
+    ).index
 
     # Filterung und Berechnung der Prozentwerte
     filtered_top_data = liefertreue_summary[
@@ -563,7 +848,7 @@ with tabs[1]:
     ]
 
     filtered_top_data["Prozent"] = (
-        filtered_top_data.groupby("Lieferantenbezeichnung")["Lieferscheinnummer"]
+        filtered_top_data.groupby("Lieferantenbezeichnung", observed=True)["Lieferscheinnummer"]
         .transform(lambda x: round(100 * x / x.sum(), 2))  # Prozent mit 2 Nachkommastellen
     )
 
@@ -577,7 +862,7 @@ with tabs[1]:
         y="Lieferscheinnummer",
         color="Liefertreue (Ja/Nein)",
         text=filtered_top_data["Prozent"].astype(str) + "%",  # Prozent als Text-Label
-        title="Top 10 Lieferanten mit den höchsten Anteilen verspäteter Lieferungen",
+        title=f"Top {top_n} Lieferanten mit den höchsten Anteilen verspäteter Lieferungen",
         labels={
             "Lieferscheinnummer": "Anzahl Lieferungen",
             "Lieferantenbezeichnung": "Lieferant",
@@ -589,47 +874,64 @@ with tabs[1]:
     liefertreue_barchart.update_layout(barmode="stack", plot_bgcolor="rgba(0,0,0,0)")
     liefertreue_barchart.update_traces(textposition="inside")
     col2.plotly_chart(liefertreue_barchart, use_container_width=True)
-    pio.write_image(liefertreue_barchart, "../reports/images/top10_liefertreuen_bar.png", width=794, height=400, scale=3)
+    bildexport().exportiere(liefertreue_barchart, "../reports/images/top10_liefertreuen_bar.png", width=794, height=400, scale=3)
     
     # Mengenabweichung nach Lieferant
-    top_10_mengeabweichung = (
-        filtered_supplier_data.groupby("Lieferantenbezeichnung")["Mengenabweichung"]
-        .sum()
-        .abs()
-        .nlargest(10)
-        .reset_index()
-        .sort_values("Mengenabweichung", ascending=False)
-    )
+    top_10_mengeabweichung = rangliste(
+        "mengenabweichung_lieferant",
+        nach_lieferant.set_index("Lieferantenbezeichnung")["Mengenabweichung"]
+        .abs(),
+    ).reset_index()
 
     mengeabweichung_bar = px.bar(
         top_10_mengeabweichung,
         x="Lieferantenbezeichnung",
         y="Mengenabweichung",
-        title="Top 10 Lieferanten basierend auf Mengenabweichungen (Ist vs. Soll)",
+        title=f"Top {top_n} Lieferanten basierend auf Mengenabweichungen (Ist vs. Soll)",
         text="Mengenabweichung",
         color_discrete_sequence=["#1976D2"],
         labels={"Mengenabweichung": "Mengenabweichung", "Lieferantenbezeichnung": "Lieferant"}
     )
     col3.plotly_chart(mengeabweichung_bar, use_container_width=True)
-    pio.write_image(mengeabweichung_bar, "../reports/images/top10_mengeabweichung_bar.png", width=794, height=400,scale=3)
+    bildexport().exportiere(mengeabweichung_bar, "../reports/images/top10_mengeabweichung_bar.png", width=794, height=400, scale=3)
+
+    # Drill-down Land -> Lieferant -> Material; jede Stufe liest die vorberechnete Ebene des Rollups
+    # (eigenes Fragment: die Auswahl lädt nur die Tabelle neu)
+    @st.fragment
+    def drill_down():
+        st.markdown("### Drill-down Land → Lieferant → Material")
+        drill_pfad = []
+        col_land, col_lieferant = st.columns(2)
+        drill_land = col_land.selectbox("Land:", options=["Alle"] + rollup.drill([])["Land"].tolist(), key="drill_land")
+        if drill_land != "Alle":
+            drill_pfad.append(drill_land)
+            drill_lieferant = col_lieferant.selectbox(
+                "Lieferant:", options=["Alle"] + rollup.drill(drill_pfad)["Lieferantenbezeichnung"].tolist(),
+                key="drill_lieferant",
+            )
+            if drill_lieferant != "Alle":
+                drill_pfad.append(drill_lieferant)
+
+        drill_tabelle = rollup.drill(drill_pfad)
+        drill_tabelle["OTD-Rate (%)"] = (drill_tabelle["Pünktlich"] / drill_tabelle["Lieferungen"] * 100).round(2)
+        st.dataframe(
+            drill_tabelle[[
+                HIERARCHIE[len(drill_pfad)], "Lieferungen", "OTD-Rate (%)", "Verspätungen", "Mengenabweichungen",
+                "Soll-Menge", "WE-Menge", "Mengenabweichung",
+            ]],
+            height=300, use_container_width=True, hide_index=True,
+        )
+
+    drill_down()
 
     # Lieferantentabelle erstellen
-    supplier_table = filtered_supplier_data[[
-        "Lieferantennummer",
-        "Lieferantenbezeichnung",
-        "Land",
-        "Lieferscheinnummer",
-        "Materialnummer",
-        "Bestelldatum",
-        "Lieferdatum (Soll)",
-        "Wareneingangsdatum (WE)",
-        "Soll-Menge",
-        "WE-Menge",
-        "Verspätung (Tage)"
-    ]]
+    # Stammdaten nur für die angezeigte Tabelle anfügen
+    supplier_table = stern.mit_namen(filtered_supplier_data)[table_columns]
 
     # Lieferdatum (Soll) als nur Datum formatieren
-    supplier_table["Lieferdatum (Soll)"] = pd.to_datetime(supplier_table["Lieferdatum (Soll)"]).dt.date
+    supplier_table["Lieferdatum (Soll)"] = pd.to_datetime(
+        supplier_table["Lieferdatum (Soll)"], format="%d.%m.%Y"
+    ).dt.date
     
     # CSV-Download für Lieferantentabelle
     def convert_df_to_csv(df):
@@ -652,33 +954,31 @@ with tabs[1]:
 with tabs[2]:
     st.title("Analyse Material")
 
-    # Materialtabelle erstellen
-    material_risks = (
-        filtered_supplier_data.groupby(["Materialnummer", "Materialbezeichnung", "Lieferantenbezeichnung", "Land"])
-        .agg({
-            "Mengenabweichung": lambda x: (x != 0).sum(),
-            "Liefertreue (Ja/Nein)": lambda x: (x == "Nein").sum()
-        })
-        .rename(columns={
-            "Mengenabweichung": "Anzahl Mengenabweichungen",
-            "Liefertreue (Ja/Nein)": "Anzahl Verspätungen"
-        })
-        .reset_index()
-    )
+    # Materialtabelle aus der feinsten Ebene des Rollups (je Material und Lieferant)
+    material_spalten = ["Materialnummer", "Materialbezeichnung", "Lieferantenbezeichnung", "Land"]
+    kennzahl_spalten = ["Anzahl Mengenabweichungen", "Anzahl Verspätungen"]
+    material_zaehler = rollup.basis.set_index(["Material-ID", "Lieferant-ID"]).rename(columns={
+        "Mengenabweichungen": "Anzahl Mengenabweichungen", "Verspätungen": "Anzahl Verspätungen"
+    })[material_spalten + kennzahl_spalten]
+    material_risks = material_zaehler.sort_values(material_spalten).reset_index(drop=True)
     
    # Diagramme zur Visualisierung
     st.markdown("### Visualisierung")
     col1, col2 = st.columns(2)
 
-    top_10_verspätungen = material_risks.sort_values("Anzahl Verspätungen", ascending=False).head(10)
-    top_10_mengeabweichung_mat = material_risks.sort_values("Anzahl Mengenabweichungen", ascending=False).head(10)
+    top_10_verspätungen = material_zaehler.loc[
+        rangliste("verspaetungen_material", material_zaehler["Anzahl Verspätungen"]).index
+    ].reset_index(drop=True)
+    top_10_mengeabweichung_mat = material_zaehler.loc[
+        rangliste("mengenabweichungen_material", material_zaehler["Anzahl Mengenabweichungen"]).index
+    ].reset_index(drop=True)
     # Diagramm: Anzahl Verspätungen nach Materialnummer
     top_10_verspätungen_bar = px.bar(
         top_10_verspätungen,
         x="Materialnummer",
         y="Anzahl Verspätungen",
         text="Anzahl Verspätungen",
-        title="Top 10 Materialien mit den meisten verspäteten Lieferungen",
+        title=f"Top {top_n} Materialien mit den meisten verspäteten Lieferungen",
         color_discrete_sequence=["#1976D2"],
         labels={"Materialnummer": "Materialnummer", "Anzahl Verspätungen": "Anzahl Verspätungen"}
     )
@@ -686,7 +986,7 @@ with tabs[2]:
     top_10_verspätungen_bar.update_layout(plot_bgcolor="rgba(0,0,0,0)")
     
     col1.plotly_chart(top_10_verspätungen_bar, use_container_width=True)
-    pio.write_image(top_10_verspätungen_bar, "../reports/images/top_10_verspätungen_bar.png", width=794, height=400,scale=3)
+    bildexport().exportiere(top_10_verspätungen_bar, "../reports/images/top_10_verspätungen_bar.png", width=794, height=400, scale=3)
 
     # Diagramm: Anzahl Mengenabweichungen nach Materialnummer
     top10_mengeabweichungen_mat_bar = px.bar(
@@ -694,14 +994,14 @@ with tabs[2]:
         x="Materialnummer",
         y="Anzahl Mengenabweichungen",
         text="Anzahl Mengenabweichungen",
-        title="Top 10 Risiko-Materialien basierend auf Mengenabweichungen",
+        title=f"Top {top_n} Risiko-Materialien basierend auf Mengenabweichungen",
         labels={"Materialnummer": "Materialnummer", "Anzahl Mengenabweichungen": "Anzahl Mengenabweichungen"}
     )
     top10_mengeabweichungen_mat_bar.update_traces(marker_color="#1976D2", textposition="inside")
     top10_mengeabweichungen_mat_bar.update_layout(plot_bgcolor="rgba(0,0,0,0)")
 
     col2.plotly_chart(top10_mengeabweichungen_mat_bar, use_container_width=True)
-    pio.write_image(top10_mengeabweichungen_mat_bar, "../reports/images/top10_mengenabweichung_mat_bar.png", width=794, height=400,scale=3)
+    bildexport().exportiere(top10_mengeabweichungen_mat_bar, "../reports/images/top10_mengenabweichung_mat_bar.png", width=794, height=400, scale=3)
     
     # CSV-Download für Materialtabelle
     material_csv = convert_df_to_csv(material_risks)
@@ -721,58 +1021,65 @@ with tabs[2]:
 with tabs[3]:
     st.title("PDF-Report generieren")
     
-    # Spaltenauswahl für den Export
-    st.markdown("### Hier können die gewünschte Spalten für den PDF-Export ausgewählt werden:")
-    selected_columns = st.multiselect(
-        "Spalten auswählen:", options=list(df_cleaned.columns), default=list(df_cleaned.columns)
-    )
+    # Tabellen-Report als eigenes Fragment: Spaltenauswahl und Sortierung laden nicht die ganze Seite neu
+    @st.fragment
+    def tabellen_report():
+        # Spaltenauswahl für den Export
+        st.markdown("### Hier können die gewünschte Spalten für den PDF-Export ausgewählt werden:")
+        # Die boolesche Hilfsspalte "Liefertreu" ist bereits als "Liefertreue (Ja/Nein)" enthalten
+        pdf_columns = [spalte for spalte in stern.spalten if spalte != "Liefertreu"]
+        selected_columns = st.multiselect(
+            "Spalten auswählen:", options=pdf_columns, default=pdf_columns
+        )
 
-    # Spaltenauswahl für Sortierung
-    st.markdown("**Auswahl der Spalte für die Sortierung:**")
-    sort_column = st.selectbox("Sortieren nach:", options=selected_columns)
+        # Spaltenauswahl für Sortierung
+        st.markdown("**Auswahl der Spalte für die Sortierung:**")
+        sort_column = st.selectbox("Sortieren nach:", options=selected_columns)
 
-    # Sortierreihenfolge festlegen
-    sort_ascending = st.checkbox("Aufsteigend sortieren", value=True)
+        # Sortierreihenfolge festlegen
+        sort_ascending = st.checkbox("Aufsteigend sortieren", value=True)
 
-    # PDF-Generierung
-    def generate_pdf(dataframe, columns, sort_column, ascending):
-        # Daten sortieren
-        sorted_dataframe = dataframe.sort_values(by=sort_column, ascending=ascending)
+        # PDF-Generierung
+        def generate_pdf(dataframe, columns, sort_column, ascending):
+            # Daten sortieren
+            sorted_dataframe = dataframe.sort_values(by=sort_column, ascending=ascending)
 
-        # PDF erstellen
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=14)
-        pdf.set_text_color(25, 118, 210)
-        pdf.cell(200, 10, txt="Report", ln=True, align="L")
-
-        # Hinzufügen der Tabelle
-        pdf.set_font("Arial", size=10)
-        for col in columns:
-            pdf.cell(40, 10, txt=col, border=1)
-        pdf.ln()
-        for _, row in sorted_dataframe[columns].iterrows():
+            # PDF erstellen
+            pdf = FPDF()
+            pdf.add_page()
+            pdf.set_font("Arial", size=14)
+            pdf.set_text_color(25, 118, 210)
+            pdf.cell(200, 10, txt="Report", ln=True, align="L")
+
+            # Hinzufügen der Tabelle
+            pdf.set_font("Arial", size=10)
             for col in columns:
-                pdf.cell(40, 10, txt=str(row[col]), border=1)
+                pdf.cell(40, 10, txt=col, border=1)
             pdf.ln()
-
-        return pdf
-
-    # PDF generieren und herunterladen
-    if st.button("PDF-Report generieren"):
-        if selected_columns:
-            pdf = generate_pdf(filtered_df, selected_columns, sort_column, sort_ascending)
-            pdf_output_path = "report.pdf"
-            pdf.output(pdf_output_path)
-            with open(pdf_output_path, "rb") as pdf_file:
-                st.download_button(
-                    label="PDF herunterladen",
-                    data=pdf_file,
-                    file_name="report.pdf",
-                    mime="application/pdf"
-                )
-        else:
-            st.warning("Bitte wähle mindestens eine Spalte aus.")
+            for _, row in sorted_dataframe[columns].iterrows():
+                for col in columns:
+                    pdf.cell(40, 10, txt=str(row[col]), border=1)
+                pdf.ln()
+
+            return pdf
+
+        # PDF generieren und herunterladen
+        if st.button("PDF-Report generieren"):
+            if selected_columns:
+                pdf = generate_pdf(stern.mit_namen(filtered_df), selected_columns, sort_column, sort_ascending)
+                pdf_output_path = "report.pdf"
+                pdf.output(pdf_output_path)
+                with open(pdf_output_path, "rb") as pdf_file:
+                    st.download_button(
+                        label="PDF herunterladen",
+                        data=pdf_file,
+                        file_name="report.pdf",
+                        mime="application/pdf"
+                    )
+            else:
+                st.warning("Bitte wähle mindestens eine Spalte aus.")
+
+    tabellen_report()
    
     ##content1 = st.text_area("Inhalt von Tab 1", "Dies ist der Inhalt von Tab 1.")
     ##hidden_content = {"Tab 2": "Inhalt von Tab 2. Dies ist der Inhalt von Tab 2."}
@@ -1017,6 +1324,9 @@ with tabs[3]:
         diagramme_list_2 = [liefertreue_barchart, mengeabweichung_bar]
         diagramme_list_3 = [top_10_verspätungen_bar, top10_mengeabweichungen_mat_bar]
         diagramme_pfad_1 = "../reports/images/top10_lieferperformance_linie.png"
+        if export_mode == "Vollständig":
+            # Nur hier gezeichnet; bei unveränderten Daten aus dem Zwischenspeicher
+            berichtsgrafik().lieferperformance(*st.session_state["lieferperformance_bericht"], pfad=diagramme_pfad_1)
         
         content1 = ""
         
@@ -1029,7 +1339,7 @@ with tabs[3]:
             add_plotly_chart_to_pdf(mengeabweichung_bar, pdf, "Diagramm aus Tab 3")
         elif export_mode == "Vollständig":
             add_xxmtext_and_charts_to_pdf(content1, diagramme_list_1, pdf, "Liefertreue - Übersicht",orientation="P")
-            add_png_text_and_charts_to_pdf(content1, [diagramme_pfad_1], pdf, "Betrachtung - Top 10 Risiko Lieferanten", orientation="L")
+            add_png_text_and_charts_to_pdf(content1, [diagramme_pfad_1], pdf, f"Betrachtung - Top {top_n} Risiko Lieferanten", orientation="L")
             add_xxmtext_and_charts_to_pdf(content1, diagramme_list_2, pdf, "Lieferantenperformance",orientation="P")
             add_xxmtext_and_charts_to_pdf(content1, diagramme_list_3, pdf, "Betrachtung - Material",orientation="P")
             
@@ -1065,6 +1375,16 @@ with tabs[4]:
     else:
         st.info("Es gibt keine fehlenden Werte in den Daten.")
     
+    # Spaltenprofil (eindeutige Werte, Min/Max, Quantile, Top-Werte)
+    st.markdown("### Spaltenprofil")
+    st.dataframe(profil_tabelle(datenprofil).astype(str), height=300, use_container_width=True)
+
+    # Anomalien je Plausibilitätsregel
+    st.markdown("### Anomalien je Plausibilitätsregel")
+    col1, col2 = st.columns(2)
+    col1.metric(label="Anzahl Anomalien", value=var_anzahl_anomalie)
+    col2.table(anomalie_treffer)
+
     # Duplikate extrahieren
     df_duplicate_head = df_duplicate_data.head()  # Erste 5 Zeilen der Duplikate
 
@@ -1101,10 +1421,14 @@ with tabs[5]:
     Diese Tabellen enthalten Informationen zu Bestellungen, Lieferungen, Material- und Lieferantenstammdaten, die essenziell für die Untersuchung der Liefertermintreue sind.
     """
 
-    data_source_metadata = {
-        "Dateiname": os.path.basename(file_path),
-        "Letzte Bearbeitung": pd.to_datetime(os.path.getmtime(file_path), unit='s').strftime("%Y-%m-%d %H:%M:%S")
-    }
+    data_source_metadata = pd.DataFrame([
+        {
+            "Dateiname": datei,
+            "Größe (KB)": round(stempel["groesse"] / 1024, 1),
+            "Letzte Bearbeitung": pd.to_datetime(stempel["geaendert"], unit='s').strftime("%Y-%m-%d %H:%M:%S")
+        }
+        for datei, stempel in datenstand.dateien.items()
+    ])
     
     st.title("Datenquelle")
     
@@ -1114,8 +1438,34 @@ with tabs[5]:
 
     # Technische Daten zur Quelle
     st.markdown("### Technische Informationen")
-    st.write("**Dateiname:**", data_source_metadata["Dateiname"])
-    st.write("**Letzte Bearbeitung:**", data_source_metadata["Letzte Bearbeitung"])
+    st.write("**Datenstand:**", datenstand.kennung)
+    st.write("**Importierte Dateien:**")
+    st.table(data_source_metadata)
+
+    # Speicherbedarf der gecachten Daten und der Arbeitskopien dieser Sitzung
+    st.write("**Speicherbedarf:**")
+    speicher = pd.DataFrame([
+        {"Objekt": "Cache-Eintrag Jahresdaten (ohne Schema)", "Speicher": speicher_ohne_schema},
+        {"Objekt": "Cache-Eintrag Jahresdaten (typisiert, Sternschema)", "Speicher": speicherbedarf(stern)},
+        {"Objekt": "Cache-Eintrag Datenstand (Anomalien, Duplikate, Profil)", "Speicher": speicherbedarf(datenstand)},
+        {"Objekt": "Sitzung (Arbeitskopien und Filter)", "Speicher": speicherbedarf([df, filtered_df, filtered_supplier_data])},
+    ])
+    speicher["Speicher"] = speicher["Speicher"].map(formatiere_bytes)
+    st.table(speicher)
+
+    # Überwachung der Quellordner und Vorwärmen der Caches für diesen Datenstand (im Hintergrund)
+    st.write(
+        "**Letzte Prüfung der Quellordner:**",
+        pd.to_datetime(waechter.letzte_pruefung, unit="s").strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    if waechter.fehler:
+        st.warning(f"Aktualisierung fehlgeschlagen, es wird weiter der bisherige Datenstand verwendet: {waechter.fehler}")
+    st.write("**Vorwärmen:**", "läuft ..." if vorwaermbericht is None else f"{vorwaermbericht.dauer:.1f} s")
+    if vorwaermbericht is not None:
+        if vorwaermbericht.schritte:
+            st.table(pd.DataFrame(vorwaermbericht.schritte, columns=["Ansicht", "Dauer (s)"]).round(2))
+        for ansicht, fehler in vorwaermbericht.fehler:
+            st.warning(f"Vorwärmen fehlgeschlagen ({ansicht}): {fehler}")
 
     # Beispielhafte Tabellen aus dem SAP-System
     st.markdown("### Beispielhafte Tabellen aus dem SAP-System")
@@ -0,0 +1,109 @@
+import threading
+import time
+
+from datenimport import QUELL_DIRS, importiere_neue_dateien, quellstand
+
+# Sekunden zwischen zwei Prüfungen der Quellordner
+INTERVALL = 10
+
+
+class Dateiwaechter:
+    """
+    Überwacht die Quellordner in einem Hintergrund-Thread und baut bei Änderungen einen neuen Datenstand auf.
+
+    Anfragen lesen immer `aktuell`. Import, Snapshot und Vorbereitung (z. B. Vorwärmen der Caches)
+    laufen im Thread; der neue Datenstand ersetzt den alten erst danach durch eine einzige Zuweisung,
+    bis dahin wird der alte Stand ausgeliefert. Eine Änderung wird erst übernommen, wenn der
+    Quellstand bei zwei aufeinanderfolgenden Prüfungen gleich ist, damit keine Dateien gelesen
+    werden, die noch kopiert oder gespeichert werden.
+
+    Attributes:
+        aktuell (tuple): (Datenstand, Ergebnis der Vorbereitung oder None, solange sie läuft).
+        stand (tuple): Quellstand (siehe quellstand()) des aktuellen Datenstands.
+        fehler (str): Letzter Fehler beim Aktualisieren (None = kein Fehler).
+        letzte_pruefung (float): Zeitpunkt der letzten Prüfung (time.time()).
+    """
+
+    def __init__(self, intervall=INTERVALL, quell_dirs=QUELL_DIRS):
+        """
+        Importiert den aktuellen Stand der Quellordner (blockierend, nur beim Erzeugen).
+
+        Args:
+            intervall (float): Sekunden zwischen zwei Prüfungen.
+            quell_dirs (list): Ordner mit den Excel- bzw. Parquet-Dateien.
+        """
+        self.vorbereiten = lambda datenstand: None
+        self.intervall = intervall
+        self.quell_dirs = quell_dirs
+        self.stand = quellstand(quell_dirs)
+        self.aktuell = (importiere_neue_dateien(quell_dirs), None)
+        self.fehler = None
+        self.letzte_pruefung = time.time()
+        self._beendet = threading.Event()
+        self._sperre = threading.Lock()
+        self._thread = threading.Thread(target=self._laufe, name="dateiwaechter", daemon=True)
+
+    @property
+    def datenstand(self):
+        return self.aktuell[0]
+
+    def starte(self, vorbereiten=None):
+        """
+        Startet den Hintergrund-Thread (nur beim ersten Aufruf); der erste Datenstand wird dort vorbereitet.
+
+        Args:
+            vorbereiten (callable): Wird mit jedem neuen Datenstand aufgerufen, bevor er ausgetauscht wird;
+                das Ergebnis wird mit dem Datenstand ausgeliefert.
+        """
+        with self._sperre:
+            if self._thread.ident is None:
+                if vorbereiten is not None:
+                    self.vorbereiten = vorbereiten
+                self._thread.start()
+        return self
+
+    def beende(self):
+        """Beendet den Hintergrund-Thread nach der laufenden Prüfung."""
+        self._beendet.set()
+
+    def _laufe(self):
+        datenstand = self.datenstand
+        self.aktuell = (datenstand, self._bereite_vor(datenstand))
+        kandidat = None
+        while not self._beendet.wait(self.intervall):
+            stand = quellstand(self.quell_dirs)
+            self.letzte_pruefung = time.time()
+            if stand == self.stand:
+                kandidat = None
+            elif stand != kandidat:
+                # Geändert, aber evtl. noch nicht vollständig geschrieben - bei der nächsten Prüfung übernehmen
+                kandidat = stand
+            else:
+                self.aktualisiere(stand)
+                kandidat = None
+
+    def _bereite_vor(self, datenstand):
+        try:
+            return self.vorbereiten(datenstand)
+        except Exception as fehler:
+            self.fehler = str(fehler)
+            return None
+
+    def aktualisiere(self, stand):
+        """
+        Importiert neue Dateien, bereitet den neuen Datenstand vor und tauscht ihn aus.
+
+        Schlägt der Import fehl, bleibt der bisherige Datenstand aktiv und der Import wird bei
+        der nächsten stabilen Änderung erneut versucht.
+
+        Args:
+            stand (tuple): Quellstand, auf dem der neue Datenstand beruht.
+        """
+        try:
+            datenstand = importiere_neue_dateien(self.quell_dirs)
+        except Exception as fehler:
+            self.fehler = str(fehler)
+            return
+        self.fehler = None
+        vorbereitung = self._bereite_vor(datenstand)
+        self.aktuell, self.stand = (datenstand, vorbereitung), stand
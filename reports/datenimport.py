@@ -0,0 +1,408 @@
+import glob
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from anomalie_regeln import lade_regeln, pruefe_anomalien
+from datenprofil import erstelle_profil, fuehre_profile_zusammen, lade_profil, speichere_profil, ziehe_profil_ab
+from datensatz import lese_lieferscheine, loesche_datensatz, schreibe_ersetzungen, schreibe_partitionen
+from parquet_konvertierung import lade_tabelle
+
+# Pfade relativ zum Projektverzeichnis, damit Dashboard und Notebooks denselben Snapshot nutzen
+PROJEKT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROHDATEN_DIR = os.path.join(PROJEKT_DIR, "data", "raw")
+ARCHIV_DIR = os.path.join(ROHDATEN_DIR, "archiv")
+# Aktuelle Dateien vor dem Archiv importieren, damit identische Zeilen der aktuellen Quelle zugeordnet werden
+QUELL_DIRS = [ROHDATEN_DIR, ARCHIV_DIR]
+QUELL_MUSTER = ["*.xlsx", "*.parquet"]
+INTERIM_DIR = os.path.join(PROJEKT_DIR, "data", "interim")
+SNAPSHOT_PFAD = os.path.join(INTERIM_DIR, "liefertreue_snapshot.pkl")
+PROFIL_PFAD = os.path.join(INTERIM_DIR, "liefertreue_snapshot_profil.pkl")
+MANIFEST_PFAD = os.path.join(INTERIM_DIR, "import_manifest.json")
+
+ROH_SPALTEN = [
+    "Lieferscheinnummer",
+    "Lieferantennummer",
+    "Lieferantenbezeichnung",
+    "Materialnummer",
+    "Materialbezeichnung",
+    "Land",
+    "Bestelldatum",
+    "Lieferdatum (Soll)",
+    "Wareneingangsdatum (WE)",
+    "Soll-Menge",
+    "WE-Menge",
+]
+# Beim Bereinigen gefüllte Mengen (fehlender Wert -> Füllwert)
+FUELLWERTE = {"WE-Menge": 0, "Soll-Menge": 0}
+
+
+@dataclass
+class Datenstand:
+    """
+    Gespeicherter Importstand inkl. laufend fortgeschriebener Aggregate.
+
+    Die bereinigten Lieferungen selbst liegen partitioniert unter data/interim/liefertreue
+    (siehe datensatz.py).
+
+    Attributes:
+        anomalien (pd.DataFrame): Durch Plausibilitätsregeln aussortierte Zeilen (mit Spalte "Quelle").
+        duplikate (pd.DataFrame): Doppelte Zeilen innerhalb der importierten Dateien (mit Spalte "Quelle").
+        anomalie_treffer (pd.DataFrame): Treffer je Quelle und Plausibilitätsregel (Spalten "Quelle", "Regel", "Anzahl").
+        regeln (list): Regeln, mit denen der Snapshot aufgebaut wurde.
+        lieferscheine (pd.DataFrame): Je Hash einer bekannten Lieferscheinnummer deren Wert, der Inhalt (Hash
+            über die Fingerprints ihrer Zeilen), der Rang des Quellordners, Quelle und Import der gültigen
+            Zeilen sowie je Spalte aus FUELLWERTE die Anzahl gefüllter Werte.
+        dateien (dict): Importierte Dateien -> Größe und Änderungszeitpunkt.
+        profil (dict): Spaltenprofil der Rohdaten (wird separat gespeichert).
+        importe (int): Anzahl bisher importierter Dateien (laufende Nummer der Partitionsdateien).
+    """
+    anomalien: pd.DataFrame
+    duplikate: pd.DataFrame
+    anomalie_treffer: pd.DataFrame
+    regeln: list
+    lieferscheine: pd.DataFrame = field(default_factory=lambda: _leerer_lieferscheinindex())
+    dateien: dict = field(default_factory=dict)
+    profil: dict = field(default_factory=dict)
+    importe: int = 0
+
+    @property
+    def kennung(self):
+        """Eindeutige Kennung des Datenstands, abgeleitet aus den importierten Dateien."""
+        inhalt = json.dumps(self.dateien, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(inhalt).hexdigest()[:12]
+
+
+def berechne_kennzahlen(df):
+    """
+    Berechnet Verspätung, Liefertreue, Mengenabweichung und Datenqualität (vektorisiert).
+
+    Args:
+        df (pd.DataFrame): Bereinigte Lieferdaten.
+
+    Returns:
+        pd.DataFrame: Kopie mit den zusätzlichen Kennzahlen.
+    """
+    df = df.copy()
+    df["Verspätung (Tage)"] = (
+        pd.to_datetime(df["Wareneingangsdatum (WE)"]) - pd.to_datetime(df["Lieferdatum (Soll)"])
+    ).dt.days
+    df["Liefertreue (Ja/Nein)"] = np.where(df["Verspätung (Tage)"] <= 0, "Ja", "Nein")
+    df["Mengenabweichung"] = df["WE-Menge"] - df["Soll-Menge"]
+    df["Datenqualität"] = np.where(df.isnull().any(axis=1), "Fehlende Werte", "OK")
+    return df
+
+
+def bereinige_daten(df, regeln=None):
+    """
+    Füllt fehlende Mengen, sortiert Anomalien aus und berechnet die Kennzahlen.
+
+    Args:
+        df (pd.DataFrame): Rohzeilen ohne Duplikate.
+        regeln (list): Plausibilitätsregeln (Standard: anomalie_regeln.toml).
+
+    Returns:
+        tuple: (bereinigte Daten, Anomalien, AnomalieErgebnis)
+    """
+    df = df.fillna(FUELLWERTE)
+    anomalie_ergebnis = pruefe_anomalien(df, regeln)
+    anomalien = df[anomalie_ergebnis.maske]
+    bereinigt = berechne_kennzahlen(df[~anomalie_ergebnis.maske])
+    return bereinigt, anomalien, anomalie_ergebnis
+
+
+def zeilen_fingerprint(df):
+    """Hash je Rohzeile über alle Rohspalten (unabhängig vom Index)."""
+    return pd.util.hash_pandas_object(df[ROH_SPALTEN], index=False).to_numpy()
+
+
+def _lieferschein_hashes(df):
+    return pd.util.hash_pandas_object(df["Lieferscheinnummer"], index=False).to_numpy()
+
+
+def _leerer_lieferscheinindex():
+    return pd.DataFrame(
+        {
+            "Lieferscheinnummer": pd.Series(dtype="object"),
+            "Inhalt": pd.Series(dtype="uint64"),
+            "Rang": pd.Series(dtype="int64"),
+            "Quelle": pd.Series(dtype="object"),
+            "Import": pd.Series(dtype="int64"),
+            **{f"Gefüllt {spalte}": pd.Series(dtype="int64") for spalte in FUELLWERTE},
+        },
+        index=pd.Index([], dtype="uint64"),
+    )
+
+
+def _inhalt_je_lieferschein(lieferscheine, fingerprints):
+    # Reihenfolgeunabhängiger Hash je Lieferscheinnummer: XOR der (eindeutigen) Zeilen-Fingerprints
+    ordnung = np.lexsort((fingerprints, lieferscheine))
+    schluessel = lieferscheine[ordnung]
+    if len(schluessel) == 0:
+        return schluessel, fingerprints[ordnung]
+    anfang = np.flatnonzero(np.r_[True, schluessel[1:] != schluessel[:-1]])
+    return schluessel[anfang], np.bitwise_xor.reduceat(fingerprints[ordnung], anfang)
+
+
+def _bekannt(index, schluessel):
+    # Inhalt und Rang der bekannten Lieferscheinnummern (Position -1 = unbekannt)
+    position = index.index.get_indexer(schluessel)
+    bekannt = position >= 0
+    inhalt = np.zeros(len(schluessel), dtype="uint64")
+    rang = np.zeros(len(schluessel), dtype="int64")
+    inhalt[bekannt] = index["Inhalt"].to_numpy()[position[bekannt]]
+    rang[bekannt] = index["Rang"].to_numpy()[position[bekannt]]
+    return bekannt, inhalt, rang
+
+
+def _profil_ersetzter_zeilen(datenstand, ersetzt):
+    # Rohzeilen der ersetzten Lieferscheine wie beim Import profiliert: Partitionen ihres Imports,
+    # Anomalien und Duplikate; beim Bereinigen gefüllte Mengen werden wieder als fehlend gezählt
+    eintraege = datenstand.lieferscheine.loc[ersetzt]
+    werte = eintraege["Lieferscheinnummer"]
+    anomalien = datenstand.anomalien["Lieferscheinnummer"].isin(werte)
+    zeilen = pd.concat([
+        lese_lieferscheine(werte, eintraege["Import"].unique(), ROH_SPALTEN),
+        datenstand.anomalien.loc[anomalien, ROH_SPALTEN],
+    ], ignore_index=True)
+    schluessel = _lieferschein_hashes(zeilen)
+    for spalte, wert in FUELLWERTE.items():
+        # Je Lieferschein so viele Füllwerte zurücksetzen, wie gefüllt wurden (für das Profil gleichwertig)
+        gefuellt = eintraege[f"Gefüllt {spalte}"].reindex(schluessel).to_numpy()
+        kandidat = (zeilen[spalte] == wert).to_numpy()
+        nummer = pd.Series(kandidat).groupby(schluessel).cumsum().to_numpy()
+        zeilen[spalte] = zeilen[spalte].mask(kandidat & (nummer <= gefuellt))
+    duplikate = datenstand.duplikate.loc[datenstand.duplikate["Lieferscheinnummer"].isin(werte), ROH_SPALTEN]
+    return erstelle_profil(pd.concat([zeilen, duplikate], ignore_index=True))
+
+
+def _ziehe_zurueck(datenstand, lieferscheine):
+    # Anomalien und Duplikate ersetzter Lieferscheine entfernen; ihre Treffer je Regel werden durch
+    # negative Treffer ausgeglichen
+    ersetzt = datenstand.anomalien["Lieferscheinnummer"].isin(lieferscheine)
+    for quelle, teil in datenstand.anomalien[ersetzt].groupby("Quelle"):
+        treffer = pruefe_anomalien(teil, datenstand.regeln).treffer
+        datenstand.anomalie_treffer = _anhaengen(
+            datenstand.anomalie_treffer, treffer.assign(Quelle=quelle, Anzahl=-treffer["Anzahl"])[["Quelle", "Regel", "Anzahl"]]
+        )
+    datenstand.anomalien = datenstand.anomalien[~ersetzt].reset_index(drop=True)
+    ersetzt = datenstand.duplikate["Lieferscheinnummer"].isin(lieferscheine)
+    datenstand.duplikate = datenstand.duplikate[~ersetzt].reset_index(drop=True)
+
+
+def _anhaengen(bestand, neu):
+    # Leeren Startbestand nicht mitverketten, sonst gehen die Datentypen der neuen Zeilen verloren
+    return neu.reset_index(drop=True) if bestand.empty else pd.concat([bestand, neu], ignore_index=True)
+
+
+def dateistempel(pfad):
+    """Größe und Änderungszeitpunkt einer Datei (zur Erkennung neuer oder geänderter Dateien)."""
+    status = os.stat(pfad)
+    return {"groesse": status.st_size, "geaendert": status.st_mtime}
+
+
+def quell_kennung(pfad):
+    """Kennung einer Quelldatei im Datensatz, z. B. "archiv.liefertreue_daten_2024_final_liefertreue"."""
+    relativ = os.path.splitext(os.path.relpath(pfad, ROHDATEN_DIR))[0]
+    return relativ.replace(os.sep, ".")
+
+
+def _quelldateien(quell_dirs):
+    # Excel-Dateien und Parquet-Dateien (z. B. aus sap_extrakt.py)
+    for rang, quell_dir in enumerate(quell_dirs):
+        for muster in QUELL_MUSTER:
+            for pfad in glob.glob(os.path.join(quell_dir, muster)):
+                if not os.path.basename(pfad).startswith("~$"):  # Sperrdateien von Excel
+                    yield rang, pfad
+
+
+def quellstand(quell_dirs=QUELL_DIRS):
+    """
+    Günstige Kennung der Quellordner (nur Dateisystem-Metadaten, kein Einlesen).
+
+    Args:
+        quell_dirs (list): Ordner mit den Excel- bzw. Parquet-Dateien.
+
+    Returns:
+        tuple: (Datei, Größe, Änderungszeitpunkt) je Quelldatei.
+    """
+    return tuple(sorted(
+        (os.path.relpath(pfad, PROJEKT_DIR), *dateistempel(pfad).values())
+        for _, pfad in _quelldateien(quell_dirs)
+    ))
+
+
+def neue_dateien(dateien, quell_dirs=QUELL_DIRS):
+    """
+    Ermittelt neue oder geänderte Quelldateien in den Quellordnern.
+
+    Args:
+        dateien (dict): Bereits importierte Dateien (aus dem Manifest).
+        quell_dirs (list): Ordner, in denen neue Dateien abgelegt werden.
+
+    Returns:
+        list: Pfade der zu importierenden Dateien, je Ordner nach Änderungszeitpunkt sortiert.
+    """
+    kandidaten = [
+        (rang, os.path.getmtime(pfad), pfad)
+        for rang, pfad in _quelldateien(quell_dirs)
+        if dateien.get(os.path.relpath(pfad, PROJEKT_DIR)) != dateistempel(pfad)
+    ]
+    return [pfad for _, _, pfad in sorted(kandidaten)]
+
+
+def _leerer_datenstand(regeln):
+    leer = pd.DataFrame(columns=ROH_SPALTEN + ["Quelle"])
+    return Datenstand(
+        anomalien=leer,
+        duplikate=leer,
+        anomalie_treffer=pd.DataFrame(columns=["Quelle", "Regel", "Anzahl"]),
+        regeln=regeln,
+    )
+
+
+def _speichere_atomar(objekt, pfad):
+    # Erst in eine temporäre Datei schreiben, dann ersetzen - Leser sehen nie eine halbe Datei
+    temp_pfad = f"{pfad}.tmp"
+    joblib.dump(objekt, temp_pfad)
+    os.replace(temp_pfad, pfad)
+
+
+def lade_datenstand(regeln=None):
+    """
+    Lädt den gespeicherten Snapshot samt Profil.
+
+    Passen die gespeicherten Plausibilitätsregeln nicht mehr zur Konfiguration oder fehlt das
+    passende Profil (z. B. Abbruch zwischen Snapshot und Profil), wird ein leerer Datenstand
+    geliefert und beim nächsten Import vollständig neu aufgebaut.
+
+    Args:
+        regeln (list): Aktuelle Plausibilitätsregeln (Standard: anomalie_regeln.toml).
+
+    Returns:
+        Datenstand: Gespeicherter oder leerer Datenstand.
+    """
+    regeln = lade_regeln() if regeln is None else regeln
+    if not os.path.exists(SNAPSHOT_PFAD):
+        return _leerer_datenstand(regeln)
+
+    try:
+        datenstand = joblib.load(SNAPSHOT_PFAD)
+    except Exception:
+        # z. B. nach einem pandas-Update nicht mehr lesbar - Snapshot wird neu aufgebaut
+        return _leerer_datenstand(regeln)
+    index = getattr(datenstand, "lieferscheine", None)
+    if datenstand.regeln != regeln or not isinstance(index, pd.DataFrame) or (
+        list(index.columns) != list(_leerer_lieferscheinindex().columns)
+    ):
+        # Geänderte Regeln oder Snapshot eines älteren Formats
+        return _leerer_datenstand(regeln)
+    profil = lade_profil(PROFIL_PFAD, datenstand.kennung)
+    if profil is None:
+        # Profil lässt sich nicht fortschreiben, ohne die Historie zu verlieren
+        return _leerer_datenstand(regeln)
+    datenstand.profil = profil
+    return datenstand
+
+
+def importiere_neue_dateien(quell_dirs=QUELL_DIRS, regeln=None):
+    """
+    Importiert neue Dateien im Append-Modus in den partitionierten Datensatz.
+
+    Die Lieferscheinnummer ist der Schlüssel: Die Zeilen einer Datei zu einer Lieferscheinnummer
+    bilden zusammen deren aktuellen Stand. Ist die Lieferscheinnummer mit identischem Inhalt
+    (gleiche Zeilen-Fingerprints) bereits bekannt, werden die Zeilen verworfen; mit geändertem
+    Inhalt ersetzen sie die bisherigen Zeilen (Ersetzungsmarke, siehe datensatz.schreibe_ersetzungen()).
+    Dateien eines nachrangigen Ordners (Archiv) ersetzen keine Zeilen aus einem vorrangigen Ordner.
+    Enthält eine geänderte, bereits importierte Datei eine Lieferscheinnummer ihrer Quelle nicht mehr,
+    werden deren Zeilen ebenfalls ersetzt (entfernt). So kann z. B. der Lieferdatensatz aus
+    sap_delta.py bei jedem Lauf neu geschrieben werden, übernommen werden nur die Änderungen.
+
+    Nur die übernommenen Zeilen werden bereinigt und berechnet und als neue Dateien in die
+    betroffenen Jahr/Monat-Partitionen geschrieben; Profil, Anomalie- und Duplikatzahlen werden
+    fortgeschrieben und um die ersetzten Zeilen verringert.
+
+    Args:
+        quell_dirs (list): Ordner mit den Excel- bzw. Parquet-Dateien.
+        regeln (list): Plausibilitätsregeln (Standard: anomalie_regeln.toml).
+
+    Returns:
+        Datenstand: Aktualisierter Datenstand.
+    """
+    datenstand = lade_datenstand(regeln)
+    dateien = neue_dateien(datenstand.dateien, quell_dirs)
+    if not dateien:
+        return datenstand
+    if not datenstand.dateien:
+        # Neuaufbau: Partitionen eines verworfenen Snapshots entfernen
+        loesche_datensatz()
+
+    raenge = {pfad: rang for rang, pfad in _quelldateien(quell_dirs)}
+    for pfad in dateien:
+        quelle = quell_kennung(pfad)
+        # Parquet-Kopie aus parquet_konvertierung.py verwenden, sofern aktuell
+        neue = lade_tabelle(pfad, ROH_SPALTEN)
+        fingerprints = zeilen_fingerprint(neue)
+        lieferscheine = _lieferschein_hashes(neue)
+        doppelt = pd.Series(fingerprints).duplicated().to_numpy()
+
+        # Nur der Inhalt je Lieferscheinnummer wird mit dem Bestand verglichen - geschrieben wird nur das Delta
+        index = datenstand.lieferscheine
+        schluessel, inhalt = _inhalt_je_lieferschein(lieferscheine[~doppelt], fingerprints[~doppelt])
+        bekannt, bisher_inhalt, bisher_rang = _bekannt(index, schluessel)
+        geaendert = bekannt & (bisher_inhalt != inhalt)
+        uebernehmen = ~bekannt | (geaendert & (bisher_rang >= raenge[pfad]))
+        ersetzt = schluessel[geaendert & uebernehmen]
+        if os.path.relpath(pfad, PROJEKT_DIR) in datenstand.dateien:
+            # Geänderte Datei: Lieferscheine ihrer Quelle, die sie nicht mehr enthält, entfallen
+            eigene = index.index[index["Quelle"].to_numpy() == quelle]
+            ersetzt = np.concatenate([ersetzt, eigene[~eigene.isin(schluessel)].to_numpy()])
+        ersetzte_lieferscheine = index.loc[ersetzt, "Lieferscheinnummer"].to_numpy()
+        if len(ersetzt):
+            datenstand.profil = ziehe_profil_ab(datenstand.profil, _profil_ersetzter_zeilen(datenstand, ersetzt))
+
+        uebernommen = np.isin(lieferscheine, schluessel[uebernehmen])
+        neue, doppelt = neue[uebernommen], doppelt[uebernommen]
+        bereinigt, anomalien, anomalie_ergebnis = bereinige_daten(neue[~doppelt], datenstand.regeln)
+
+        schreibe_ersetzungen(datenstand.importe, ersetzte_lieferscheine)
+        schreibe_partitionen(bereinigt, quelle, datenstand.importe)
+        datenstand.importe += 1
+        _ziehe_zurueck(datenstand, ersetzte_lieferscheine)
+        datenstand.anomalien = _anhaengen(datenstand.anomalien, anomalien.assign(Quelle=quelle))
+        datenstand.duplikate = _anhaengen(datenstand.duplikate, neue[doppelt].assign(Quelle=quelle))
+        datenstand.anomalie_treffer = _anhaengen(
+            datenstand.anomalie_treffer, anomalie_ergebnis.treffer.assign(Quelle=quelle)[["Quelle", "Regel", "Anzahl"]]
+        )
+        gruppe = lieferscheine[uebernommen]
+        aktuell = pd.DataFrame(
+            {
+                "Lieferscheinnummer": neue["Lieferscheinnummer"].groupby(gruppe).first(),
+                "Inhalt": pd.Series(inhalt[uebernehmen], index=schluessel[uebernehmen]),
+                "Rang": raenge[pfad],
+                "Quelle": quelle,
+                "Import": datenstand.importe - 1,
+                **{
+                    f"Gefüllt {spalte}": neue[spalte][~doppelt].isnull().groupby(gruppe[~doppelt]).sum()
+                    for spalte in FUELLWERTE
+                },
+            },
+            index=pd.Index(schluessel[uebernehmen], dtype="uint64"),
+        )
+        datenstand.lieferscheine = pd.concat([index.drop(ersetzt).drop(aktuell.index, errors="ignore"), aktuell])
+        datenstand.profil = fuehre_profile_zusammen(datenstand.profil, erstelle_profil(neue))
+        datenstand.dateien[os.path.relpath(pfad, PROJEKT_DIR)] = dateistempel(pfad)
+
+    os.makedirs(INTERIM_DIR, exist_ok=True)
+    profil, datenstand.profil = datenstand.profil, {}
+    _speichere_atomar(datenstand, SNAPSHOT_PFAD)
+    datenstand.profil = profil
+    speichere_profil(profil, PROFIL_PFAD, datenstand.kennung)
+    with open(MANIFEST_PFAD, "w", encoding="utf-8") as manifest:
+        json.dump(datenstand.dateien, manifest, indent=2, ensure_ascii=False)
+    return datenstand
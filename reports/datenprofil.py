@@ -0,0 +1,225 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ANZAHL_TOP_WERTE = 5
+QUANTILE = (0.25, 0.5, 0.75)
+
+
+@dataclass
+class Spaltenprofil:
+    """
+    Zusammenführbare Statistik einer Spalte.
+
+    Alle Kennzahlen (eindeutige Werte, Min/Max, Quantile, Top-Werte) werden aus den
+    Häufigkeiten abgeleitet, daher lassen sich zwei Profile exakt addieren.
+
+    Attributes:
+        datentyp (str): Datentyp der Spalte.
+        anzahl (int): Anzahl Zeilen.
+        fehlend (int): Anzahl fehlender Werte.
+        haeufigkeiten (pd.Series): Wert -> Anzahl (ohne fehlende Werte).
+    """
+    datentyp: str
+    anzahl: int
+    fehlend: int
+    haeufigkeiten: pd.Series
+
+    @property
+    def eindeutig(self):
+        return len(self.haeufigkeiten)
+
+    @property
+    def nicht_leer(self):
+        return self.anzahl - self.fehlend
+
+    @property
+    def sortierbar(self):
+        index = self.haeufigkeiten.index
+        return pd.api.types.is_numeric_dtype(index) or pd.api.types.is_datetime64_any_dtype(index)
+
+
+def _profiliere_spalte(serie):
+    haeufigkeiten = serie.value_counts(dropna=True, sort=False)
+    if pd.api.types.is_numeric_dtype(haeufigkeiten.index) or pd.api.types.is_datetime64_any_dtype(haeufigkeiten.index):
+        haeufigkeiten = haeufigkeiten.sort_index()
+    return Spaltenprofil(
+        datentyp=str(serie.dtype),
+        anzahl=len(serie),
+        fehlend=int(serie.isnull().sum()),
+        haeufigkeiten=haeufigkeiten,
+    )
+
+
+def erstelle_profil(df, max_workers=None):
+    """
+    Berechnet das Profil aller Spalten, je Spalte ein Durchlauf, parallel in einem Thread-Pool.
+
+    Args:
+        df (pd.DataFrame): Zu profilierende Daten.
+        max_workers (int): Anzahl Threads (Standard: wie ThreadPoolExecutor).
+
+    Returns:
+        dict: Spaltenname -> Spaltenprofil.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        profile = pool.map(_profiliere_spalte, (df[spalte] for spalte in df.columns))
+        return dict(zip(df.columns, profile))
+
+
+def fuehre_profile_zusammen(profil_alt, profil_neu):
+    """
+    Führt das Profil eines neuen Datenpakets mit dem bestehenden Profil zusammen.
+
+    Args:
+        profil_alt (dict): Bestehendes Profil.
+        profil_neu (dict): Profil der neuen Zeilen.
+
+    Returns:
+        dict: Zusammengeführtes Profil.
+    """
+    ergebnis = dict(profil_alt)
+    for spalte, neu in profil_neu.items():
+        alt = profil_alt.get(spalte)
+        if alt is None:
+            ergebnis[spalte] = neu
+            continue
+        haeufigkeiten = alt.haeufigkeiten.add(neu.haeufigkeiten, fill_value=0).astype("int64")
+        ergebnis[spalte] = Spaltenprofil(
+            datentyp=alt.datentyp,
+            anzahl=alt.anzahl + neu.anzahl,
+            fehlend=alt.fehlend + neu.fehlend,
+            haeufigkeiten=haeufigkeiten.sort_index() if alt.sortierbar else haeufigkeiten,
+        )
+    return ergebnis
+
+
+def ziehe_profil_ab(profil, profil_entfernt):
+    """
+    Entfernt die Zeilen eines Teilprofils wieder aus dem Profil (Umkehrung von fuehre_profile_zusammen()).
+
+    Args:
+        profil (dict): Bestehendes Profil.
+        profil_entfernt (dict): Profil der entfernten Zeilen (im Profil enthalten).
+
+    Returns:
+        dict: Profil ohne die entfernten Zeilen.
+    """
+    ergebnis = dict(profil)
+    for spalte, entfernt in profil_entfernt.items():
+        alt = profil.get(spalte)
+        if alt is None:
+            continue
+        haeufigkeiten = alt.haeufigkeiten.sub(entfernt.haeufigkeiten, fill_value=0).astype("int64")
+        haeufigkeiten = haeufigkeiten[haeufigkeiten > 0]
+        ergebnis[spalte] = Spaltenprofil(
+            datentyp=alt.datentyp,
+            anzahl=alt.anzahl - entfernt.anzahl,
+            fehlend=alt.fehlend - entfernt.fehlend,
+            haeufigkeiten=haeufigkeiten.sort_index() if alt.sortierbar else haeufigkeiten,
+        )
+    return ergebnis
+
+
+def berechne_quantile(spaltenprofil, quantile=QUANTILE):
+    """
+    Berechnet Quantile aus den Häufigkeiten (lineare Interpolation wie pandas.quantile).
+
+    Args:
+        spaltenprofil (Spaltenprofil): Profil einer numerischen oder Datumsspalte.
+        quantile (tuple): Gewünschte Quantile zwischen 0 und 1.
+
+    Returns:
+        dict: Quantil -> Wert (leer bei nicht sortierbaren Spalten).
+    """
+    haeufigkeiten = spaltenprofil.haeufigkeiten
+    if not spaltenprofil.sortierbar or haeufigkeiten.empty:
+        return {}
+
+    ist_datum = pd.api.types.is_datetime64_any_dtype(haeufigkeiten.index)
+    werte = haeufigkeiten.index.as_unit("ns").asi8 if ist_datum else haeufigkeiten.index.to_numpy(dtype="float64")
+    kumuliert = np.cumsum(haeufigkeiten.to_numpy())
+
+    ergebnis = {}
+    for q in quantile:
+        position = q * (kumuliert[-1] - 1)
+        unten = werte[np.searchsorted(kumuliert, np.floor(position), side="right")]
+        oben = werte[np.searchsorted(kumuliert, np.ceil(position), side="right")]
+        wert = unten + (oben - unten) * (position - np.floor(position))
+        ergebnis[q] = pd.Timestamp(int(wert)) if ist_datum else wert
+    return ergebnis
+
+
+def profil_tabelle(profil):
+    """
+    Stellt das Profil als Tabelle dar (Ersatz für nunique, isnull, notnull und describe).
+
+    Args:
+        profil (dict): Spaltenname -> Spaltenprofil.
+
+    Returns:
+        pd.DataFrame: Eine Zeile je Spalte.
+    """
+    zeilen = []
+    for spalte, spaltenprofil in profil.items():
+        haeufigkeiten = spaltenprofil.haeufigkeiten
+        quantile = berechne_quantile(spaltenprofil)
+        top_werte = haeufigkeiten.nlargest(ANZAHL_TOP_WERTE)
+        zeilen.append({
+            "Spalte": spalte,
+            "Datentyp": spaltenprofil.datentyp,
+            "Eindeutige Werte": spaltenprofil.eindeutig,
+            "Fehlende Werte": spaltenprofil.fehlend,
+            "Nicht-Leere Werte": spaltenprofil.nicht_leer,
+            "Fehlende Werte (%)": round(spaltenprofil.fehlend / spaltenprofil.anzahl * 100, 2) if spaltenprofil.anzahl else 0.0,
+            "Minimum": haeufigkeiten.index[0] if spaltenprofil.sortierbar and not haeufigkeiten.empty else None,
+            "Maximum": haeufigkeiten.index[-1] if spaltenprofil.sortierbar and not haeufigkeiten.empty else None,
+            "25%": quantile.get(0.25),
+            "Median": quantile.get(0.5),
+            "75%": quantile.get(0.75),
+            "Top-Werte": ", ".join(f"{wert} ({anzahl})" for wert, anzahl in top_werte.items()),
+        })
+    return pd.DataFrame(zeilen)
+
+
+def speichere_profil(profil, pfad, fingerprint=None):
+    """
+    Speichert das Profil (z. B. neben dem Daten-Snapshot) mit joblib.
+
+    Erst in eine temporäre Datei schreiben, dann ersetzen - Leser sehen nie eine halbe Datei.
+
+    Args:
+        profil (dict): Spaltenname -> Spaltenprofil.
+        pfad (str): Zieldatei (.pkl).
+        fingerprint: Kennung des Datenstands, zu dem das Profil gehört.
+    """
+    os.makedirs(os.path.dirname(pfad) or ".", exist_ok=True)
+    joblib.dump({"fingerprint": fingerprint, "spalten": profil}, f"{pfad}.tmp")
+    os.replace(f"{pfad}.tmp", pfad)
+
+
+def lade_profil(pfad, fingerprint=None):
+    """
+    Lädt ein gespeichertes Profil, sofern es zum angegebenen Datenstand passt.
+
+    Args:
+        pfad (str): Gespeicherte Profildatei.
+        fingerprint: Erwartete Kennung des Datenstands (None = nicht prüfen).
+
+    Returns:
+        dict: Spaltenname -> Spaltenprofil oder None, wenn kein passendes (lesbares) Profil vorliegt.
+    """
+    if not os.path.exists(pfad):
+        return None
+    try:
+        gespeichert = joblib.load(pfad)
+    except Exception:
+        # z. B. abgeschnittene Datei oder nach einem pandas-Update nicht mehr lesbar
+        return None
+    if fingerprint is not None and gespeichert.get("fingerprint") != fingerprint:
+        return None
+    return gespeichert["spalten"]
@@ -0,0 +1,226 @@
+import os
+import shutil
+
+import pandas as pd
+
+# Partitionierter Datensatz: data/interim/liefertreue/jahr=2024/monat=01/<quelle>@<import>.parquet
+# Ersetzte Zeilen: data/interim/liefertreue/ersetzt/ersetzt@<import>.parquet
+PROJEKT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATENSATZ_DIR = os.path.join(PROJEKT_DIR, "data", "interim", "liefertreue")
+ERSETZT_NAME = "ersetzt"
+PARTITIONS_SPALTE = "Lieferdatum (Soll)"
+SCHLUESSEL_SPALTE = "Lieferscheinnummer"
+UNBEKANNT = "unbekannt"
+
+
+def schreibe_partitionen(df, quelle, import_nr, basis_dir=DATENSATZ_DIR):
+    """
+    Hängt Zeilen nach Jahr und Monat des Soll-Lieferdatums als neue Dateien an den Datensatz an.
+
+    Bestehende Dateien werden nicht neu geschrieben, der Aufwand hängt nur von den neuen Zeilen ab.
+
+    Args:
+        df (pd.DataFrame): Bereinigte Lieferungen.
+        quelle (str): Kennung der Quelldatei (z. B. "archiv.liefertreue_daten_2024").
+        import_nr (int): Laufende Nummer des Imports, macht Dateinamen eindeutig.
+        basis_dir (str): Wurzelverzeichnis des Datensatzes.
+
+    Returns:
+        list: Geschriebene Partitionen als (Jahr, Monat) Tupel.
+    """
+    datum = pd.to_datetime(df[PARTITIONS_SPALTE], errors="coerce")
+    geschrieben = []
+    for (jahr, monat), teil in df.groupby([datum.dt.year, datum.dt.month], dropna=False):
+        jahr_name = UNBEKANNT if pd.isna(jahr) else str(int(jahr))
+        monat_name = UNBEKANNT if pd.isna(monat) else f"{int(monat):02d}"
+        ziel_dir = os.path.join(basis_dir, f"jahr={jahr_name}", f"monat={monat_name}")
+        os.makedirs(ziel_dir, exist_ok=True)
+
+        # Erst temporär schreiben, dann umbenennen - Leser sehen nur vollständige Dateien
+        ziel = os.path.join(ziel_dir, f"{quelle}@{import_nr:06d}.parquet")
+        teil.to_parquet(f"{ziel}.tmp", index=False)
+        os.replace(f"{ziel}.tmp", ziel)
+        geschrieben.append((jahr_name, monat_name))
+    return geschrieben
+
+
+def schreibe_ersetzungen(import_nr, lieferscheine, basis_dir=DATENSATZ_DIR):
+    """
+    Markiert Zeilen früherer Importe als ersetzt, ohne deren Partitionsdateien zu ändern.
+
+    Die Markierungen gelten nur für Importe vor `import_nr`; Datenstände, die diesen Import noch
+    nicht sehen (bis_import <= import_nr), lesen weiterhin die bisherigen Zeilen.
+
+    Args:
+        import_nr (int): Laufende Nummer des ersetzenden Imports.
+        lieferscheine (list): Lieferscheinnummern, deren bisherige Zeilen ersetzt werden.
+        basis_dir (str): Wurzelverzeichnis des Datensatzes.
+    """
+    if len(lieferscheine) == 0:
+        return
+    ersetzt = pd.DataFrame({SCHLUESSEL_SPALTE: pd.Series(list(lieferscheine), dtype="object")})
+    ziel_dir = os.path.join(basis_dir, ERSETZT_NAME)
+    os.makedirs(ziel_dir, exist_ok=True)
+    ziel = os.path.join(ziel_dir, f"{ERSETZT_NAME}@{import_nr:06d}.parquet")
+    ersetzt.to_parquet(f"{ziel}.tmp", index=False)
+    os.replace(f"{ziel}.tmp", ziel)
+
+
+def ersetzungen(basis_dir=DATENSATZ_DIR, bis_import=None):
+    """
+    Ersetzungsmarken aller Importe vor `bis_import` (None = alle).
+
+    Returns:
+        pd.DataFrame: Spalten "Lieferscheinnummer" und "Import".
+    """
+    ziel_dir = os.path.join(basis_dir, ERSETZT_NAME)
+    teile = []
+    if os.path.isdir(ziel_dir):
+        for datei in os.scandir(ziel_dir):
+            if not datei.name.endswith(".parquet"):
+                continue
+            import_nr = int(datei.name[:-len(".parquet")].rpartition("@")[2])
+            if bis_import is None or import_nr < bis_import:
+                teile.append(pd.read_parquet(datei.path).assign(Import=import_nr))
+    if not teile:
+        return pd.DataFrame(columns=[SCHLUESSEL_SPALTE, "Import"])
+    return pd.concat(teile, ignore_index=True)
+
+
+def loesche_datensatz(basis_dir=DATENSATZ_DIR):
+    """Entfernt alle Partitionen (z. B. vor einem vollständigen Neuaufbau)."""
+    shutil.rmtree(basis_dir, ignore_errors=True)
+
+
+def partitionen(basis_dir=DATENSATZ_DIR):
+    """
+    Listet alle Partitionsdateien anhand der Verzeichnisnamen auf, ohne Daten zu lesen.
+
+    Args:
+        basis_dir (str): Wurzelverzeichnis des Datensatzes.
+
+    Returns:
+        pd.DataFrame: Spalten "Jahr", "Monat", "Quelle", "Import" (laufende Nummer) und "Pfad".
+    """
+    eintraege = []
+    if os.path.isdir(basis_dir):
+        for jahr_dir in os.scandir(basis_dir):
+            if not jahr_dir.is_dir() or not jahr_dir.name.startswith("jahr="):
+                continue
+            for monat_dir in os.scandir(jahr_dir.path):
+                if not monat_dir.is_dir() or not monat_dir.name.startswith("monat="):
+                    continue
+                for datei in os.scandir(monat_dir.path):
+                    if not datei.name.endswith(".parquet"):
+                        continue
+                    quelle, _, import_nr = datei.name[:-len(".parquet")].rpartition("@")
+                    eintraege.append({
+                        "Jahr": jahr_dir.name.split("=", 1)[1],
+                        "Monat": monat_dir.name.split("=", 1)[1],
+                        "Quelle": quelle,
+                        "Import": int(import_nr) if import_nr.isdigit() else 0,
+                        "Pfad": datei.path,
+                    })
+    return pd.DataFrame(eintraege, columns=["Jahr", "Monat", "Quelle", "Import", "Pfad"])
+
+
+def _bis_import(teile, bis_import):
+    # Nur Dateien früherer Importe: ein Datenstand sieht keine Partitionen, die danach angehängt wurden
+    return teile if bis_import is None else teile[teile["Import"] < bis_import]
+
+
+def _lese_teil(pfad, import_nr, spalten, ersetzt):
+    # Zeilen verwerfen, deren Lieferscheinnummer ein späterer Import ersetzt hat
+    neuer = ersetzt.index[ersetzt.to_numpy() > import_nr]
+    if neuer.empty:
+        return pd.read_parquet(pfad, columns=spalten)
+    lesen = spalten if spalten is None or SCHLUESSEL_SPALTE in spalten else [*spalten, SCHLUESSEL_SPALTE]
+    df = pd.read_parquet(pfad, columns=lesen)
+    df = df[~df[SCHLUESSEL_SPALTE].isin(neuer)]
+    return df if lesen is spalten else df[spalten]
+
+
+def lese_lieferscheine(lieferscheine, importe, spalten=None, basis_dir=DATENSATZ_DIR):
+    """
+    Liest die Zeilen bestimmter Lieferscheinnummern aus den Partitionsdateien der angegebenen Importe.
+
+    Args:
+        lieferscheine (list): Gesuchte Lieferscheinnummern.
+        importe (list): Laufende Nummern der Importe, die die Zeilen geschrieben haben.
+        spalten (list): Zu lesende Spalten (None = alle).
+        basis_dir (str): Wurzelverzeichnis des Datensatzes.
+
+    Returns:
+        pd.DataFrame: Zeilen der Lieferscheine.
+    """
+    teile = partitionen(basis_dir)
+    teile = teile[teile["Import"].isin(importe)]
+    lesen = spalten if spalten is None or SCHLUESSEL_SPALTE in spalten else [*spalten, SCHLUESSEL_SPALTE]
+    zeilen = [pd.read_parquet(pfad, columns=lesen) for pfad in sorted(teile["Pfad"])]
+    if not zeilen:
+        return pd.DataFrame(columns=spalten)
+    df = pd.concat(zeilen, ignore_index=True)
+    df = df[df[SCHLUESSEL_SPALTE].isin(lieferscheine)].reset_index(drop=True)
+    return df if lesen is spalten else df[spalten]
+
+
+def verfuegbare_quellen(basis_dir=DATENSATZ_DIR, bis_import=None):
+    """Alle Quellen, die bis zum Import `bis_import` (ausschließlich, None = alle) Zeilen beigetragen haben."""
+    return sorted(_bis_import(partitionen(basis_dir), bis_import)["Quelle"].unique())
+
+
+def verfuegbare_jahre(quellen=None, basis_dir=DATENSATZ_DIR, bis_import=None):
+    """
+    Jahre, für die Partitionen vorhanden sind (ohne Daten zu lesen).
+
+    Args:
+        quellen (list): Nur Partitionen dieser Quellen berücksichtigen (None = alle).
+        basis_dir (str): Wurzelverzeichnis des Datensatzes.
+        bis_import (int): Nur Partitionen der Importe vor dieser Nummer (None = alle).
+
+    Returns:
+        list: Aufsteigend sortierte Jahre als int.
+    """
+    teile = _bis_import(partitionen(basis_dir), bis_import)
+    if quellen is not None:
+        teile = teile[teile["Quelle"].isin(quellen)]
+    return sorted(int(jahr) for jahr in teile["Jahr"].unique() if jahr != UNBEKANNT)
+
+
+def lese_datensatz(jahre=None, monate=None, quellen=None, spalten=None, basis_dir=DATENSATZ_DIR, bis_import=None):
+    """
+    Liest den Datensatz als eine Tabelle; nicht benötigte Partitionen werden vor dem Lesen ausgeschlossen.
+
+    Zeilen, die ein späterer Import des Datenstands ersetzt hat (siehe schreibe_ersetzungen()),
+    werden nicht geliefert.
+
+    Args:
+        jahre (list): Gewünschte Jahre (None = alle, inkl. Zeilen ohne Soll-Lieferdatum).
+        monate (list): Gewünschte Monate 1-12 (None = alle).
+        quellen (list): Gewünschte Quellen (None = alle).
+        spalten (list): Zu lesende Spalten (None = alle).
+        basis_dir (str): Wurzelverzeichnis des Datensatzes.
+        bis_import (int): Nur Partitionen der Importe vor dieser Nummer, d. h. ein fester Datenstand
+            (None = alle).
+
+    Returns:
+        pd.DataFrame: Zeilen der ausgewählten Partitionen.
+    """
+    teile = _bis_import(partitionen(basis_dir), bis_import)
+    if jahre is not None:
+        teile = teile[teile["Jahr"].isin([str(jahr) for jahr in jahre])]
+    if monate is not None:
+        teile = teile[teile["Monat"].isin([f"{monat:02d}" for monat in monate])]
+    if quellen is not None:
+        teile = teile[teile["Quelle"].isin(quellen)]
+
+    if teile.empty:
+        return pd.DataFrame(columns=spalten)
+    # Sortierte Reihenfolge, damit das Ergebnis unabhängig von der Dateisystem-Reihenfolge ist
+    teile = teile.sort_values(["Jahr", "Monat", "Pfad"])
+    # Je ersetzter Lieferscheinnummer der letzte ersetzende Import
+    ersetzt = ersetzungen(basis_dir, bis_import).groupby(SCHLUESSEL_SPALTE, dropna=False)["Import"].max()
+    return pd.concat(
+        (_lese_teil(pfad, import_nr, spalten, ersetzt) for pfad, import_nr in zip(teile["Pfad"], teile["Import"])),
+        ignore_index=True,
+    )
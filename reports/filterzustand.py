@@ -0,0 +1,118 @@
+import hashlib
+import json
+from dataclasses import asdict, dataclass, fields
+
+# Listen, deren Reihenfolge für das Ergebnis keine Rolle spielt
+_MENGEN = ("quellen", "laender", "monate", "liefertreue", "lieferanten")
+
+
+@dataclass(frozen=True)
+class Filterzustand:
+    """
+    Kanonische Form der Sidebar-Auswahl.
+
+    Gleiche Auswahl ergibt unabhängig von Reihenfolge und Sitzung die gleiche Kennung; sie dient
+    als Cache-Schlüssel für Ergebnisse, die sitzungsübergreifend geteilt werden, und als
+    URL-Parameter für teilbare Ansichten.
+
+    Attributes:
+        quellen (tuple): Datenquellen.
+        jahr (int): Jahr.
+        verspaetung (str): "Kalendertage" oder "Arbeitstage".
+        toleranz_frueh (int): Toleranz verfrüht in Tagen (None = unbegrenzt).
+        toleranz_spaet (int): Toleranz verspätet in Tagen.
+        toleranz_menge (int): Toleranz Mengenabweichung in Prozent.
+        laender (tuple): Länder.
+        monate (tuple): Monate (1-12).
+        liefertreue (tuple): "Alle" oder Auswahl aus "Ja"/"Nein".
+        abweichung (tuple): Mengenabweichung (min, max).
+        lieferanten (tuple): "Alle" oder Lieferantenbezeichnungen.
+        top_n (int): Länge der Top-Listen.
+        schaetzung (bool): Eindeutige Anzahlen schätzen.
+    """
+    quellen: tuple
+    jahr: int
+    verspaetung: str = "Kalendertage"
+    toleranz_frueh: int = None
+    toleranz_spaet: int = 0
+    toleranz_menge: int = 0
+    laender: tuple = ()
+    monate: tuple = tuple(range(1, 13))
+    liefertreue: tuple = ("Alle",)
+    abweichung: tuple = ()
+    lieferanten: tuple = ("Alle",)
+    top_n: int = 10
+    schaetzung: bool = False
+
+    def __post_init__(self):
+        for name in _MENGEN:
+            werte = tuple(sorted(set(getattr(self, name))))
+            # "Alle" überdeckt jede weitere Auswahl
+            if "Alle" in werte:
+                werte = ("Alle",)
+            object.__setattr__(self, name, werte)
+        object.__setattr__(self, "abweichung", tuple(int(wert) for wert in self.abweichung))
+
+    @property
+    def kennung(self):
+        """Stabile Kennung der Auswahl (SHA-256 der kanonischen JSON-Form, gekürzt)."""
+        text = json.dumps(asdict(self), sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def als_query_params(self):
+        """
+        URL-Parameter der Auswahl; Listen als wiederholte Parameter.
+
+        Returns:
+            dict: Name -> Liste von Zeichenketten.
+        """
+        parameter = {}
+        for feld in fields(self):
+            wert = getattr(self, feld.name)
+            if wert is None:
+                continue
+            if isinstance(wert, tuple):
+                parameter[feld.name] = [str(element) for element in wert]
+            elif isinstance(wert, bool):
+                parameter[feld.name] = [str(int(wert))]
+            else:
+                parameter[feld.name] = [str(wert)]
+        return parameter
+
+
+def _ganzzahlen(werte):
+    # Nicht ganzzahlige Einträge einer Liste werden übersprungen
+    return [int(wert) for wert in werte if wert.lstrip("-").isdigit()]
+
+
+def aus_query_params(parameter):
+    """
+    Liest eine Auswahl aus URL-Parametern; unbekannte oder ungültige Parameter werden ignoriert.
+
+    Args:
+        parameter (dict): Name -> Liste von Zeichenketten (z. B. aus st.query_params.get_all()).
+
+    Returns:
+        dict: Gültige Felder von Filterzustand (nur die vorhandenen); dienen als Vorgaben der Filter.
+    """
+    umwandlung = {
+        "quellen": list, "laender": list, "liefertreue": list, "lieferanten": list,
+        "monate": _ganzzahlen,
+        "abweichung": lambda werte: _ganzzahlen(werte)[:2],
+        "jahr": lambda werte: int(werte[0]),
+        "verspaetung": lambda werte: werte[0],
+        "toleranz_frueh": lambda werte: int(werte[0]),
+        "toleranz_spaet": lambda werte: int(werte[0]),
+        "toleranz_menge": lambda werte: int(werte[0]),
+        "top_n": lambda werte: int(werte[0]),
+        "schaetzung": lambda werte: werte[0] == "1",
+    }
+    vorgaben = {}
+    for name, werte in parameter.items():
+        if name not in umwandlung or not werte:
+            continue
+        try:
+            vorgaben[name] = umwandlung[name](werte)
+        except ValueError:
+            continue
+    return vorgaben
@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# 2^11 Register je Zelle: Standardfehler 1,04 / sqrt(2048) = 2,3 %
+PRAEZISION = 11
+# Bits des Hashwerts nach dem Registerindex, die für die führenden Nullen ausgewertet werden
+# (exakt als float64 darstellbar)
+_RANG_BITS = 52
+
+
+def hashwerte(werte):
+    """64-Bit-Hashwerte je Wert; Kategorien werden nur einmal je Ausprägung gehasht."""
+    werte = pd.Series(werte)
+    if isinstance(werte.dtype, pd.CategoricalDtype):
+        kategorien = pd.util.hash_array(werte.cat.categories.to_numpy(dtype=object))
+        return kategorien[werte.cat.codes.to_numpy()]
+    return pd.util.hash_array(werte.to_numpy(dtype=object))
+
+
+def standardfehler(praezision=PRAEZISION):
+    """Relativer Standardfehler der Schätzung."""
+    return 1.04 / np.sqrt(2 ** praezision)
+
+
+def schaetze(register):
+    """
+    HyperLogLog-Schätzung der Anzahl eindeutiger Werte aus den Registern einer Skizze.
+
+    Für kleine Anzahlen (bis 2,5 m und leere Register vorhanden) wird Linear Counting verwendet.
+    """
+    m = len(register)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    schaetzung = alpha * m * m / np.sum(np.ldexp(1.0, -register.astype("int64")))
+    leer = np.count_nonzero(register == 0)
+    if schaetzung <= 2.5 * m and leer:
+        schaetzung = m * np.log(m / leer)
+    return schaetzung
+
+
+@dataclass
+class Skizzen:
+    """
+    HyperLogLog-Skizzen je Schlüssel (z. B. Lieferant und Monat) und Spalte.
+
+    Skizzen sind vereinigbar: Die Anzahl eindeutiger Werte einer beliebigen Auswahl von Schlüsseln
+    ergibt sich aus dem Maximum der Register, ohne die Lieferungen erneut zu lesen. Die meisten
+    Schlüssel haben nur wenige Lieferungen, daher werden je Schlüssel nur die belegten Register
+    gespeichert (dünn besetzt, höchstens ein Eintrag je Lieferung).
+
+    Attributes:
+        schluessel (pd.DataFrame): Ausprägungen der Dimensionen.
+        register (dict): Spalte -> (Schlüsselzeile, Registerindex, Rang) der belegten Register.
+        praezision (int): Anzahl Indexbits.
+    """
+    schluessel: pd.DataFrame
+    register: dict
+    praezision: int = PRAEZISION
+
+    @property
+    def standardfehler(self):
+        return standardfehler(self.praezision)
+
+    def anzahl(self, spalte, auswahl=None):
+        """
+        Geschätzte Anzahl eindeutiger Werte einer Spalte.
+
+        Args:
+            spalte (str): Spalte, für die Skizzen erstellt wurden.
+            auswahl (np.ndarray): Optional boolesche Maske über die Zeilen von schluessel.
+
+        Returns:
+            float: Geschätzte Anzahl (0, wenn keine Schlüssel ausgewählt sind).
+        """
+        zeile, index, rang = self.register[spalte]
+        if auswahl is not None:
+            ausgewaehlt = np.asarray(auswahl)[zeile]
+            index, rang = index[ausgewaehlt], rang[ausgewaehlt]
+        if len(index) == 0:
+            return 0.0
+        register = np.zeros(2 ** self.praezision, dtype="uint8")
+        np.maximum.at(register, index, rang)
+        return schaetze(register)
+
+
+def erstelle_skizzen(fakten, spalten, dimensionen=("Lieferant-ID", "Monat"), praezision=PRAEZISION):
+    """
+    Erstellt je Schlüssel eine HyperLogLog-Skizze für jede der angegebenen Spalten.
+
+    Args:
+        fakten (pd.DataFrame): Lieferungen mit den Dimensionen und Spalten.
+        spalten (list): Spalten, deren eindeutige Werte gezählt werden sollen.
+        dimensionen (tuple): Schlüsselspalten; "Monat" wird aus dem Soll-Lieferdatum abgeleitet.
+        praezision (int): Anzahl Indexbits (2^praezision Register je Skizze).
+
+    Returns:
+        Skizzen: Belegte Register je Schlüssel und Spalte.
+    """
+    schluessel_spalten = {}
+    for dimension in dimensionen:
+        if dimension == "Monat" and "Monat" not in fakten:
+            schluessel_spalten[dimension] = pd.to_datetime(fakten["Lieferdatum (Soll)"]).dt.month.to_numpy()
+        else:
+            schluessel_spalten[dimension] = fakten[dimension].to_numpy()
+    gruppen = pd.DataFrame(schluessel_spalten).groupby(list(dimensionen), sort=True)
+    zeile = gruppen.ngroup().to_numpy().astype("int64")
+    schluessel = gruppen.size().index.to_frame(index=False)
+
+    m = 2 ** praezision
+    rang_bits = min(_RANG_BITS, 64 - praezision)
+    register = {}
+    for spalte in spalten:
+        h = hashwerte(fakten[spalte])
+        # Registerindex aus den oberen Bits, Rang = Position der ersten 1 in den folgenden Bits
+        index = (h >> np.uint64(64 - praezision)).astype("int64")
+        rest = (h >> np.uint64(64 - praezision - rang_bits)) & np.uint64((1 << rang_bits) - 1)
+        rang = (rang_bits - np.frexp(rest.astype("float64"))[1] + 1).astype("uint8")
+
+        # Je Schlüssel und Register nur den höchsten Rang behalten
+        zelle = zeile * m + index
+        reihenfolge = np.lexsort([rang, zelle])
+        letzte = np.r_[zelle[reihenfolge][1:] != zelle[reihenfolge][:-1], True]
+        behalten = reihenfolge[letzte]
+        register[spalte] = (
+            zeile[behalten].astype("int32"), index[behalten].astype("int16"), rang[behalten]
+        )
+    return Skizzen(schluessel=schluessel, register=register, praezision=praezision)
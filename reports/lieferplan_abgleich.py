@@ -0,0 +1,209 @@
+"""
+Abgleich von Wareneingängen mit den Einteilungen der Lieferpläne (EKET).
+
+Eine Lieferplanposition hat viele Einteilungen, Wareneingänge erfolgen oft in Teilmengen.
+Die Wareneingänge einer Position werden in zeitlicher Reihenfolge auf die Einteilungen
+verbraucht (FIFO über die kumulierten Mengen); je Einteilung entstehen Verspätung und
+Erfüllungsgrad.
+
+Aufruf aus dem Projektverzeichnis:
+    python reports/lieferplan_abgleich.py --jahr 2024 [--werk 054]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from sap_extrakt import DATENBANK_PFAD, PROJEKT_DIR, STANDARD_FILTER, sap_datum, sap_menge, verbinde
+
+SCHLUESSEL = ["Bestellnummer", "Position", "Materialnummer"]
+ZIEL_DIR = os.path.join(PROJEKT_DIR, "data", "interim")
+
+# Belegauswahl wie in sap_extrakt.LIEFERDATEN_SQL, aber ohne Jahr: Für den Mengenverbrauch
+# werden alle Einteilungen und Wareneingänge einer Position benötigt
+_BELEG_JOIN = """
+FROM EKKO
+JOIN EKPO ON EKKO.MANDT = EKPO.MANDT AND EKKO.EBELN = EKPO.EBELN
+{join}
+WHERE EKKO.BUKRS = :bukrs
+    AND EKPO.WERKS = :werk
+    AND EKKO.EBELN LIKE :belegpraefix || '%'
+    AND EKKO.BSTYP = :bstyp
+    AND EKKO.BSART LIKE :bsart
+"""
+EINTEILUNGEN_SQL = """
+SELECT
+    EKET.EBELN AS "Bestellnummer",
+    EKET.EBELP AS "Position",
+    EKPO.MATNR AS "Materialnummer",
+    EKET.ETENR AS "Einteilung",
+    EKET.EINDT AS "Lieferdatum (Soll)",
+    EKET.MENGE AS "Soll-Menge"
+""" + _BELEG_JOIN.format(
+    join="JOIN EKET ON EKPO.MANDT = EKET.MANDT AND EKPO.EBELN = EKET.EBELN AND EKPO.EBELP = EKET.EBELP"
+)
+# Bestellentwicklung (EKBE), nur Wareneingänge (Vorgangsart 1, ohne Rechnungen u. a.); Haben-Buchungen
+# (Rücklieferungen, Stornos) erhalten eine negative Menge und bleiben in der Zuordnung unberücksichtigt
+WARENEINGAENGE_SQL = """
+SELECT
+    EKBE.EBELN AS "Bestellnummer",
+    EKBE.EBELP AS "Position",
+    EKPO.MATNR AS "Materialnummer",
+    EKBE.BUDAT AS "Wareneingangsdatum (WE)",
+    CASE WHEN EKBE.SHKZG = 'H' THEN '-' || EKBE.MENGE ELSE EKBE.MENGE END AS "WE-Menge"
+""" + _BELEG_JOIN.format(
+    join="JOIN EKBE ON EKPO.MANDT = EKBE.MANDT AND EKPO.EBELN = EKBE.EBELN AND EKPO.EBELP = EKBE.EBELP"
+) + "    AND EKBE.VGABE = '1'\n"
+
+
+def _gruppen(einteilungen, wareneingaenge, schluessel):
+    # Ein Integer-Code je Position für beide Tabellen - schneller als mehrere Textspalten im as-of-Join
+    codes = np.zeros(len(einteilungen) + len(wareneingaenge), dtype="int64")
+    for spalte in schluessel:
+        werte, eindeutig = pd.factorize(pd.concat([einteilungen[spalte], wareneingaenge[spalte]], ignore_index=True))
+        codes = pd.factorize(codes * (len(eindeutig) + 1) + werte + 1)[0]
+    return codes[:len(einteilungen)], codes[len(einteilungen):]
+
+
+def _kumuliert(gruppe, menge):
+    # Kumulierte Menge je Gruppe; Eingaben sind nach Gruppe sortiert
+    summe = np.cumsum(menge, dtype="float64")
+    anfang = np.r_[True, gruppe[1:] != gruppe[:-1]]
+    vorher = np.r_[0.0, summe[:-1]][anfang]
+    return summe - np.repeat(vorher, np.diff(np.r_[np.flatnonzero(anfang), len(gruppe)]))
+
+
+def ordne_wareneingaenge_zu(einteilungen, wareneingaenge, schluessel=SCHLUESSEL):
+    """
+    Verteilt die Wareneingänge je Position in zeitlicher Reihenfolge auf die Einteilungen.
+
+    Einteilungen werden nach Soll-Lieferdatum bedient. Je Einteilung werden die kumulierten
+    Sollmengen (von/bis) mit den kumulierten Wareneingangsmengen verglichen: Zwei sortierte
+    as-of-Joins finden den ersten Wareneingang, der zur Einteilung beiträgt, und den, mit dem sie
+    vollständig erfüllt ist. Mehrlieferungen über die letzte Einteilung hinaus bleiben unberücksichtigt.
+
+    Args:
+        einteilungen (pd.DataFrame): Schlüsselspalten, "Lieferdatum (Soll)", "Soll-Menge"
+            und optional "Einteilung" (Reihenfolge bei gleichem Datum).
+        wareneingaenge (pd.DataFrame): Schlüsselspalten, "Wareneingangsdatum (WE)" und "WE-Menge".
+        schluessel (list): Spalten, die eine Position identifizieren.
+
+    Returns:
+        pd.DataFrame: Einteilungen (gleicher Index) mit "WE-Menge" (zugeordnet), "Offene Menge",
+        "Erfüllungsgrad", "Erster WE", "Wareneingangsdatum (WE)" (vollständig erfüllt am),
+        "Verspätung (Tage)" und "Liefertreue (Ja/Nein)"; noch nicht vollständig erfüllte Einteilungen
+        haben kein Datum und keine Verspätung, ihre Liefertreue ist "offen".
+    """
+    wareneingaenge = wareneingaenge[wareneingaenge["WE-Menge"] > 0]
+    gruppe_e, gruppe_w = _gruppen(einteilungen, wareneingaenge, schluessel)
+    soll = einteilungen["Soll-Menge"].to_numpy(dtype="float64")
+
+    # Einteilungen je Position nach Soll-Lieferdatum (und Einteilungsnummer) ordnen
+    sortierung = [einteilungen["Lieferdatum (Soll)"].to_numpy(), gruppe_e]
+    if "Einteilung" in einteilungen:
+        sortierung.insert(0, pd.factorize(einteilungen["Einteilung"], sort=True)[0])
+    reihenfolge_e = np.lexsort(sortierung)
+    bis = np.empty(len(einteilungen))
+    bis[reihenfolge_e] = _kumuliert(gruppe_e[reihenfolge_e], soll[reihenfolge_e])
+    e = pd.DataFrame({"_gruppe": gruppe_e, "_bis": bis, "_ab": bis - soll})
+
+    datum_w = wareneingaenge["Wareneingangsdatum (WE)"].to_numpy()
+    reihenfolge_w = np.lexsort([datum_w, gruppe_w])
+    w = pd.DataFrame({
+        "_gruppe": gruppe_w[reihenfolge_w],
+        "_kumuliert": _kumuliert(gruppe_w[reihenfolge_w], wareneingaenge["WE-Menge"].to_numpy()[reihenfolge_w]),
+        "_datum": datum_w[reihenfolge_w],
+    }).sort_values("_kumuliert", kind="stable")
+    geliefert = np.bincount(gruppe_w, weights=wareneingaenge["WE-Menge"].to_numpy(), minlength=gruppe_e.max(initial=-1) + 1)
+
+    def as_of(spalte, exakt):
+        links = e[["_gruppe", spalte]].sort_values(spalte, kind="stable")
+        treffer = pd.merge_asof(links, w, left_on=spalte, right_on="_kumuliert", by="_gruppe",
+                                direction="forward", allow_exact_matches=exakt)
+        datum = np.empty(len(e), dtype=treffer["_datum"].dtype)
+        datum[links.index.to_numpy()] = treffer["_datum"].to_numpy()
+        return datum
+
+    # Erster Wareneingang, dessen kumulierte Menge die Einteilung vollständig deckt
+    erfuellt_am = as_of("_bis", True)
+    # Erster Wareneingang, der über die vorherigen Einteilungen hinaus Menge liefert
+    erster_we = as_of("_ab", False)
+    gesamt = geliefert[gruppe_e] if len(geliefert) else np.zeros(len(e))
+    zugeordnet = np.clip(gesamt - e["_ab"].to_numpy(), 0, soll)
+
+    ergebnis = einteilungen.copy()
+    ergebnis["WE-Menge"] = zugeordnet
+    ergebnis["Offene Menge"] = soll - zugeordnet
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ergebnis["Erfüllungsgrad"] = np.where(soll > 0, zugeordnet / soll, np.nan)
+    ergebnis["Erster WE"] = erster_we
+    ergebnis["Wareneingangsdatum (WE)"] = erfuellt_am
+    ergebnis["Verspätung (Tage)"] = (ergebnis["Wareneingangsdatum (WE)"] - ergebnis["Lieferdatum (Soll)"]).dt.days
+    ergebnis["Liefertreue (Ja/Nein)"] = np.select(
+        [ergebnis["Verspätung (Tage)"].isnull(), ergebnis["Verspätung (Tage)"] <= 0], ["offen", "Ja"], "Nein"
+    )
+    return ergebnis
+
+
+def lade_positionen(verbindung, **filter):
+    """
+    Liest Einteilungen und Wareneingänge aller ausgewählten Lieferplanpositionen.
+
+    Args:
+        verbindung (sqlite3.Connection): Datenbank aus sap_extrakt.py (mit EKET und EKBE).
+        **filter: Abweichungen von STANDARD_FILTER.
+
+    Returns:
+        tuple: (Einteilungen, Wareneingänge)
+    """
+    parameter = {**STANDARD_FILTER, **filter}
+    einteilungen = pd.read_sql_query(EINTEILUNGEN_SQL, verbindung, params=parameter)
+    einteilungen["Lieferdatum (Soll)"] = sap_datum(einteilungen["Lieferdatum (Soll)"])
+    einteilungen["Soll-Menge"] = sap_menge(einteilungen["Soll-Menge"])
+
+    wareneingaenge = pd.read_sql_query(WARENEINGAENGE_SQL, verbindung, params=parameter)
+    wareneingaenge["Wareneingangsdatum (WE)"] = sap_datum(wareneingaenge["Wareneingangsdatum (WE)"])
+    wareneingaenge["WE-Menge"] = sap_menge(wareneingaenge["WE-Menge"])
+    return einteilungen, wareneingaenge
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wareneingänge den Lieferplaneinteilungen zuordnen")
+    parser.add_argument("--jahr", type=int, required=True, help="Jahr des Soll-Lieferdatums")
+    parser.add_argument("--datenbank", default=DATENBANK_PFAD, help="SQLite-Datenbank aus sap_extrakt.py")
+    parser.add_argument("--ziel", default=None, help="Zieldatei (Standard: data/interim/einteilungen_<jahr>.parquet)")
+    for name, wert in STANDARD_FILTER.items():
+        parser.add_argument(f"--{name}", default=wert)
+    argumente = parser.parse_args()
+
+    start = time.perf_counter()
+    verbindung = verbinde(argumente.datenbank)
+    try:
+        einteilungen, wareneingaenge = lade_positionen(
+            verbindung, **{name: getattr(argumente, name) for name in STANDARD_FILTER}
+        )
+    finally:
+        verbindung.close()
+    geladen = time.perf_counter()
+
+    ergebnis = ordne_wareneingaenge_zu(einteilungen, wareneingaenge)
+    ergebnis = ergebnis[ergebnis["Lieferdatum (Soll)"].dt.year == argumente.jahr]
+    zugeordnet = time.perf_counter()
+
+    ziel = argumente.ziel or os.path.join(ZIEL_DIR, f"einteilungen_{argumente.jahr}.parquet")
+    ergebnis.to_parquet(f"{ziel}.tmp", index=False)
+    os.replace(f"{ziel}.tmp", ziel)
+
+    print(f"{len(ergebnis)} Einteilungen, {len(wareneingaenge)} Wareneingänge -> {ziel}")
+    # Liefertreue nur über erfüllte Einteilungen - offene haben noch kein Ergebnis
+    liefertreue = ergebnis["Liefertreue (Ja/Nein)"]
+    erfuellt = liefertreue != "offen"
+    print(f"Erfüllungsgrad (Menge): {ergebnis['WE-Menge'].sum() / max(ergebnis['Soll-Menge'].sum(), 1):.1%}, "
+          f"liefertreu: {(liefertreue[erfuellt] == 'Ja').mean():.1%} ({(~erfuellt).sum()} offen)")
+    print(f"Dauer: laden {geladen - start:.2f} s, zuordnen {zugeordnet - geladen:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Konvertiert alle Excel-Arbeitsmappen unter data/raw, data/raw/archiv und data/processed
+parallel in typisierte Parquet-Dateien (data/interim/parquet).
+
+Aufruf aus dem Projektverzeichnis:
+    python reports/parquet_konvertierung.py [--prozesse 4] [--erzwingen]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+PROJEKT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUELL_DIRS = [
+    os.path.join(PROJEKT_DIR, "data", "raw"),
+    os.path.join(PROJEKT_DIR, "data", "raw", "archiv"),
+    os.path.join(PROJEKT_DIR, "data", "processed"),
+]
+PARQUET_DIR = os.path.join(PROJEKT_DIR, "data", "interim", "parquet")
+MANIFEST_PFAD = os.path.join(PARQUET_DIR, "manifest.json")
+
+# Erwartete Spalten und Zieltypen (Rohdaten und die Datensätze aus notebooks/final-analysis.ipynb)
+SPALTENTYPEN = {
+    # Rohdaten
+    "Lieferscheinnummer": "text",
+    "Lieferantennummer": "text",
+    "Lieferantenbezeichnung": "text",
+    "Materialnummer": "text",
+    "Materialbezeichnung": "text",
+    "Land": "text",
+    "Bestelldatum": "datum",
+    "Lieferdatum (Soll)": "datum",
+    "Wareneingangsdatum (WE)": "datum",
+    "Soll-Menge": "ganzzahl",
+    "WE-Menge": "ganzzahl",
+    # Bereinigte Datensätze (umbenannte Spalten und Kennzahlen)
+    "lieferscheinnummer": "text",
+    "lieferantennummer": "text",
+    "lieferantenbezeichnung": "text",
+    "materialnummer": "text",
+    "materialbezeichnung": "text",
+    "land": "text",
+    "bestelldatum": "datum",
+    "lieferdatum_soll": "datum",
+    "wareneingangsdatum_we": "datum",
+    "soll_menge": "ganzzahl",
+    "we_menge": "ganzzahl",
+    "verspätungstage": "ganzzahl",
+    "liefertreue": "text",
+    "termintreue": "text",
+    "mengenabweichung_anteil": "dezimal",
+    "mengenabweichung": "ganzzahl",
+    "jahreszeit": "text",
+    "liefermonat": "ganzzahl",
+}
+
+
+def datei_hash(pfad):
+    """SHA-256 des Dateiinhalts (unabhängig vom Änderungszeitpunkt)."""
+    sha = hashlib.sha256()
+    with open(pfad, "rb") as datei:
+        for block in iter(lambda: datei.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _dateistempel(pfad):
+    stat = os.stat(pfad)
+    return {"groesse": stat.st_size, "geaendert": stat.st_mtime}
+
+
+def ausgabe_pfad(pfad):
+    """Zielpfad der Parquet-Datei, z. B. data/raw/archiv/x.xlsx -> data/interim/parquet/raw/archiv/x.parquet."""
+    relativ = os.path.relpath(pfad, os.path.join(PROJEKT_DIR, "data"))
+    return os.path.join(PARQUET_DIR, os.path.splitext(relativ)[0] + ".parquet")
+
+
+def typisiere(df, quelle=""):
+    """
+    Wandelt alle Spalten in ihre Zieltypen um und prüft dabei das Schema.
+
+    Args:
+        df (pd.DataFrame): Eingelesene Arbeitsmappe.
+        quelle (str): Dateiname für Fehlermeldungen.
+
+    Returns:
+        pd.DataFrame: Typisierte Daten.
+
+    Raises:
+        ValueError: Bei unbekannten Spalten oder Werten, die nicht zum Zieltyp passen.
+    """
+    unbekannt = [spalte for spalte in df.columns if spalte not in SPALTENTYPEN]
+    if unbekannt:
+        raise ValueError(f"{quelle}: unbekannte Spalten {unbekannt}")
+
+    ergebnis = {}
+    for spalte in df.columns:
+        serie = df[spalte]
+        typ = SPALTENTYPEN[spalte]
+        try:
+            if typ == "text":
+                ergebnis[spalte] = serie.where(serie.isnull(), serie.astype(str))
+            elif typ == "datum":
+                ergebnis[spalte] = pd.to_datetime(serie, errors="raise")
+            elif typ == "ganzzahl":
+                zahlen = pd.to_numeric(serie, errors="raise")
+                if not (zahlen.dropna() % 1 == 0).all():
+                    raise ValueError("Nachkommastellen in Ganzzahlspalte")
+                ergebnis[spalte] = zahlen.astype("Int64" if zahlen.isnull().any() else "int64")
+            else:
+                ergebnis[spalte] = pd.to_numeric(serie, errors="raise").astype("float64")
+        except (ValueError, TypeError) as fehler:
+            raise ValueError(f"{quelle}: Spalte '{spalte}' ist nicht vom Typ {typ} ({fehler})") from fehler
+    return pd.DataFrame(ergebnis, index=df.index)
+
+
+def _pruefe_ausgabe(ziel, df):
+    # Geschriebene Datei gegen Spalten und Zeilenzahl der Quelle prüfen
+    metadaten = pq.ParquetFile(ziel).metadata
+    if metadaten.num_rows != len(df) or pq.read_schema(ziel).names != list(df.columns):
+        raise ValueError(f"{ziel}: Parquet-Datei entspricht nicht der Quelle")
+
+
+def konvertiere_datei(pfad, sha):
+    """
+    Konvertiert eine Arbeitsmappe (läuft in einem eigenen Prozess).
+
+    Args:
+        pfad (str): Excel-Datei.
+        sha (str): Bereits berechneter Hash des Dateiinhalts.
+
+    Returns:
+        dict: Manifest-Eintrag der Datei.
+    """
+    start = time.perf_counter()
+    df = typisiere(pd.read_excel(pfad), os.path.basename(pfad))
+    ziel = ausgabe_pfad(pfad)
+    os.makedirs(os.path.dirname(ziel), exist_ok=True)
+
+    # Erst temporär schreiben, dann umbenennen - Leser sehen nur vollständige Dateien
+    df.to_parquet(f"{ziel}.tmp", index=False)
+    _pruefe_ausgabe(f"{ziel}.tmp", df)
+    os.replace(f"{ziel}.tmp", ziel)
+
+    return {
+        "sha256": sha,
+        "ausgabe": os.path.relpath(ziel, PROJEKT_DIR),
+        "zeilen": len(df),
+        "spalten": {spalte: str(typ) for spalte, typ in df.dtypes.items()},
+        "dauer_s": round(time.perf_counter() - start, 3),
+        **_dateistempel(pfad),
+    }
+
+
+def lade_manifest(pfad=MANIFEST_PFAD):
+    """Quelldatei (relativ zum Projektverzeichnis) -> Manifest-Eintrag."""
+    if not os.path.exists(pfad):
+        return {}
+    with open(pfad, encoding="utf-8") as datei:
+        return json.load(datei)
+
+
+def _speichere_manifest(manifest, pfad=MANIFEST_PFAD):
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    with open(f"{pfad}.tmp", "w", encoding="utf-8") as datei:
+        json.dump(manifest, datei, indent=2, ensure_ascii=False)
+    os.replace(f"{pfad}.tmp", pfad)
+
+
+def excel_dateien(quell_dirs=QUELL_DIRS):
+    """Alle Arbeitsmappen der Quellordner (ohne Excel-Sperrdateien)."""
+    return sorted(
+        pfad
+        for quell_dir in quell_dirs
+        for pfad in glob.glob(os.path.join(quell_dir, "*.xlsx"))
+        if not os.path.basename(pfad).startswith("~$")
+    )
+
+
+def konvertiere_alle(quell_dirs=QUELL_DIRS, prozesse=None, erzwingen=False):
+    """
+    Konvertiert alle neuen oder geänderten Arbeitsmappen parallel in einem Prozess-Pool.
+
+    Dateien, deren Inhalt (SHA-256) dem Manifest entspricht und deren Ausgabe vorhanden ist,
+    werden übersprungen.
+
+    Args:
+        quell_dirs (list): Ordner mit Excel-Dateien.
+        prozesse (int): Anzahl Prozesse (Standard: wie ProcessPoolExecutor).
+        erzwingen (bool): Alle Dateien unabhängig vom Manifest neu konvertieren.
+
+    Returns:
+        dict: Quelldatei -> "konvertiert", "unverändert" oder Fehlermeldung.
+    """
+    manifest = lade_manifest()
+    status = {}
+    auftraege = {}
+
+    for pfad in excel_dateien(quell_dirs):
+        name = os.path.relpath(pfad, PROJEKT_DIR)
+        eintrag = manifest.get(name)
+        sha = datei_hash(pfad)
+        if (not erzwingen and eintrag and eintrag["sha256"] == sha
+                and os.path.exists(os.path.join(PROJEKT_DIR, eintrag["ausgabe"]))):
+            # Nur der Zeitstempel hat sich ggf. geändert
+            eintrag.update(_dateistempel(pfad))
+            status[name] = "unverändert"
+        else:
+            auftraege[name] = (pfad, sha)
+
+    if auftraege:
+        with ProcessPoolExecutor(max_workers=prozesse) as pool:
+            laufend = {pool.submit(konvertiere_datei, pfad, sha): name for name, (pfad, sha) in auftraege.items()}
+            for future in as_completed(laufend):
+                name = laufend[future]
+                try:
+                    manifest[name] = future.result()
+                    status[name] = "konvertiert"
+                except Exception as fehler:
+                    manifest.pop(name, None)
+                    status[name] = f"Fehler: {fehler}"
+
+    _speichere_manifest(manifest)
+    return status
+
+
+def lade_tabelle(pfad, spalten=None):
+    """
+    Lädt eine Arbeitsmappe aus ihrer Parquet-Kopie, falls diese aktuell ist, sonst aus Excel.
+
+    Die Aktualität wird nur über Größe und Änderungszeitpunkt aus dem Manifest geprüft,
+    die Excel-Datei wird dafür nicht gelesen. Parquet-Dateien werden direkt gelesen.
+
+    Args:
+        pfad (str): Pfad der Excel- oder Parquet-Datei.
+        spalten (list): Zu lesende Spalten (None = alle).
+
+    Returns:
+        pd.DataFrame: Inhalt der Arbeitsmappe.
+    """
+    if pfad.endswith(".parquet"):
+        return pd.read_parquet(pfad, columns=spalten)
+    eintrag = lade_manifest().get(os.path.relpath(os.path.abspath(pfad), PROJEKT_DIR))
+    if eintrag and {k: eintrag[k] for k in ("groesse", "geaendert")} == _dateistempel(pfad):
+        ziel = os.path.join(PROJEKT_DIR, eintrag["ausgabe"])
+        if os.path.exists(ziel):
+            return pd.read_parquet(ziel, columns=spalten)
+    df = pd.read_excel(pfad)
+    return df if spalten is None else df[spalten]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Excel-Arbeitsmappen parallel in Parquet konvertieren")
+    parser.add_argument("--prozesse", type=int, default=None, help="Anzahl paralleler Prozesse")
+    parser.add_argument("--erzwingen", action="store_true", help="Auch unveränderte Dateien neu konvertieren")
+    argumente = parser.parse_args()
+
+    start = time.perf_counter()
+    status = konvertiere_alle(prozesse=argumente.prozesse, erzwingen=argumente.erzwingen)
+    for name, ergebnis in sorted(status.items()):
+        print(f"{name}: {ergebnis}")
+    print(f"Dauer: {time.perf_counter() - start:.2f} s")
+    if any(ergebnis.startswith("Fehler") for ergebnis in status.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Relative Genauigkeit der Quantile; ganzzahlige Werte bis 1 / (2 * GENAUIGKEIT) = 50 bleiben exakt
+GENAUIGKEIT = 0.01
+# Beträge unterhalb dieser Grenze zählen als 0
+_MIN_BETRAG = 1e-9
+
+
+def _gamma(genauigkeit):
+    return (1 + genauigkeit) / (1 - genauigkeit)
+
+
+def _versatz(genauigkeit):
+    # Verschiebung der logarithmischen Buckets, damit alle Beträge ab _MIN_BETRAG positive Nummern haben
+    return int(np.ceil(-np.log(_MIN_BETRAG) / np.log(_gamma(genauigkeit)))) + 1
+
+
+def bucket(werte, genauigkeit=GENAUIGKEIT):
+    """
+    Logarithmischer Bucket je Wert, monoton im Wert (negative Werte < 0 < positive Werte).
+
+    Alle Werte eines Buckets liegen innerhalb der relativen Genauigkeit um seinen Repräsentanten.
+    """
+    werte = np.asarray(werte, dtype="float64")
+    betrag = np.abs(werte)
+    with np.errstate(divide="ignore"):
+        nummer = np.ceil(np.log(np.maximum(betrag, _MIN_BETRAG)) / np.log(_gamma(genauigkeit))).astype("int64")
+    nummer += _versatz(genauigkeit)
+    return np.where(betrag < _MIN_BETRAG, 0, np.sign(werte).astype("int64") * nummer)
+
+
+def repraesentant(buckets, genauigkeit=GENAUIGKEIT):
+    """Repräsentativer Wert je Bucket (Umkehrung von bucket())."""
+    buckets = np.asarray(buckets, dtype="int64")
+    gamma = _gamma(genauigkeit)
+    nummer = np.abs(buckets) - _versatz(genauigkeit)
+    return np.where(buckets == 0, 0.0, np.sign(buckets) * 2 * gamma ** nummer.astype("float64") / (gamma + 1))
+
+
+@dataclass
+class Quantilskizzen:
+    """
+    Vereinigbare Quantilskizzen (logarithmische Histogramme) je Schlüssel und Spalte.
+
+    Je Schlüssel (z. B. Lieferant und Monat) wird gezählt, wie viele Werte in jeden logarithmischen
+    Bucket fallen. Skizzen einer beliebigen Auswahl von Schlüsseln werden durch Addition der
+    Zähler vereinigt; Quantile haben danach eine relative Abweichung von höchstens `genauigkeit`.
+
+    Attributes:
+        schluessel (pd.DataFrame): Ausprägungen der Dimensionen.
+        zellen (dict): Spalte -> (Schlüsselzeile, Bucket, Anzahl) der belegten Buckets.
+        ganzzahlig (dict): Spalte -> True, wenn die Werte ganzzahlig sind (Quantile werden gerundet).
+        genauigkeit (float): Relative Genauigkeit.
+    """
+    schluessel: pd.DataFrame
+    zellen: dict
+    ganzzahlig: dict
+    genauigkeit: float = GENAUIGKEIT
+
+    def verteilung(self, spalte, auswahl=None):
+        """
+        Vereinigte Skizze einer Auswahl von Schlüsseln.
+
+        Returns:
+            tuple: (Buckets aufsteigend, Anzahl je Bucket)
+        """
+        zeile, buckets, anzahl = self.zellen[spalte]
+        if auswahl is not None:
+            ausgewaehlt = np.asarray(auswahl)[zeile]
+            buckets, anzahl = buckets[ausgewaehlt], anzahl[ausgewaehlt]
+        eindeutig, position = np.unique(buckets, return_inverse=True)
+        return eindeutig, np.bincount(position, anzahl, len(eindeutig))
+
+    def quantile(self, spalte, anteile, auswahl=None):
+        """
+        Quantile einer Spalte für eine Auswahl von Schlüsseln.
+
+        Args:
+            spalte (str): Spalte, für die Skizzen erstellt wurden.
+            anteile (list): Quantile zwischen 0 und 1 (z. B. [0.5, 0.9, 0.99]).
+            auswahl (np.ndarray): Optional boolesche Maske über die Zeilen von schluessel.
+
+        Returns:
+            np.ndarray: Quantile in der Reihenfolge von anteile; NaN ohne Werte.
+        """
+        buckets, anzahl = self.verteilung(spalte, auswahl)
+        anteile = np.atleast_1d(np.asarray(anteile, dtype="float64"))
+        if anzahl.sum() == 0:
+            return np.full(len(anteile), np.nan)
+        kumuliert = np.cumsum(anzahl)
+        # Rang wie bei np.quantile(..., method="lower"): Wert an Position floor(q * (n - 1))
+        rang = np.floor(anteile * (kumuliert[-1] - 1))
+        werte = repraesentant(buckets[np.searchsorted(kumuliert, rang, side="right")], self.genauigkeit)
+        return np.round(werte) if self.ganzzahlig[spalte] else werte
+
+    def boxplot(self, spalte, auswahl=None):
+        """
+        Kennwerte eines Boxplots (Quartile, Whisker nach 1,5 x IQR, Minimum und Maximum).
+
+        Returns:
+            dict: "q1", "median", "q3", "lowerfence", "upperfence", "min", "max".
+        """
+        q = self.quantile(spalte, [0.0, 0.25, 0.5, 0.75, 1.0], auswahl)
+        iqr = q[3] - q[1]
+        buckets, anzahl = self.verteilung(spalte, auswahl)
+        werte = repraesentant(buckets[anzahl > 0], self.genauigkeit)
+        if self.ganzzahlig[spalte]:
+            werte = np.round(werte)
+        # Whisker enden am äußersten Wert innerhalb von 1,5 x IQR
+        innen = werte[(werte >= q[1] - 1.5 * iqr) & (werte <= q[3] + 1.5 * iqr)]
+        return {
+            "q1": q[1], "median": q[2], "q3": q[3],
+            "lowerfence": innen.min() if len(innen) else np.nan,
+            "upperfence": innen.max() if len(innen) else np.nan,
+            "min": q[0], "max": q[4],
+        }
+
+
+def erstelle_quantilskizzen(fakten, spalten, dimensionen=("Lieferant-ID", "Monat"), genauigkeit=GENAUIGKEIT):
+    """
+    Erstellt je Schlüssel eine Quantilskizze für jede der angegebenen Spalten.
+
+    Args:
+        fakten (pd.DataFrame): Lieferungen mit den Dimensionen und Spalten.
+        spalten (list): Numerische Spalten; fehlende Werte bleiben unberücksichtigt.
+        dimensionen (tuple): Schlüsselspalten; "Monat" wird aus dem Soll-Lieferdatum abgeleitet.
+        genauigkeit (float): Relative Genauigkeit der Quantile.
+
+    Returns:
+        Quantilskizzen: Belegte Buckets je Schlüssel und Spalte.
+    """
+    schluessel_spalten = {}
+    for dimension in dimensionen:
+        if dimension == "Monat" and "Monat" not in fakten:
+            schluessel_spalten[dimension] = pd.to_datetime(fakten["Lieferdatum (Soll)"]).dt.month.to_numpy()
+        else:
+            schluessel_spalten[dimension] = fakten[dimension].to_numpy()
+    gruppen = pd.DataFrame(schluessel_spalten).groupby(list(dimensionen), sort=True)
+    zeile = gruppen.ngroup().to_numpy().astype("int64")
+    schluessel = gruppen.size().index.to_frame(index=False)
+
+    zellen, ganzzahlig = {}, {}
+    for spalte in spalten:
+        werte = pd.to_numeric(fakten[spalte]).to_numpy(dtype="float64")
+        vorhanden = ~np.isnan(werte)
+        ganzzahlig[spalte] = bool(np.all(werte[vorhanden] == np.round(werte[vorhanden])))
+        tabelle = pd.DataFrame({"zeile": zeile[vorhanden], "bucket": bucket(werte[vorhanden], genauigkeit)})
+        zaehler = tabelle.groupby(["zeile", "bucket"], sort=True).size()
+        zellen[spalte] = (
+            zaehler.index.get_level_values("zeile").to_numpy().astype("int32"),
+            zaehler.index.get_level_values("bucket").to_numpy().astype("int32"),
+            zaehler.to_numpy().astype("int64"),
+        )
+    return Quantilskizzen(schluessel=schluessel, zellen=zellen, ganzzahlig=ganzzahlig, genauigkeit=genauigkeit)
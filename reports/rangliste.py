@@ -0,0 +1,85 @@
+import heapq
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+class Rangliste:
+    """
+    Top-N-Rangliste über einer Kennzahl je Schlüssel (z. B. Lieferant oder Material).
+
+    Die Einträge liegen in einem Heap. Ändern sich Daten oder Filter, werden nur die geänderten
+    Schlüssel neu eingefügt; veraltete Heap-Einträge werden beim Abfragen übersprungen und bei
+    Bedarf verworfen. Die Abfrage der besten N kostet O(N log S) statt einer vollständigen
+    Sortierung aller S Schlüssel.
+
+    Bei gleichem Wert entscheidet der Schlüssel (aufsteigend), damit die Reihenfolge stabil bleibt.
+    """
+
+    def __init__(self, absteigend=True):
+        self.absteigend = absteigend
+        self.werte = pd.Series(dtype="float64")
+        self._heap = []
+        self._version = {}
+        self._zaehler = itertools.count()
+
+    def _eintrag(self, schluessel, wert):
+        version = next(self._zaehler)
+        self._version[schluessel] = version
+        return (-wert if self.absteigend else wert, schluessel, version)
+
+    def setze(self, werte):
+        """
+        Übernimmt den aktuellen Stand der Kennzahl; nur Abweichungen zum bisherigen Stand werden eingefügt.
+
+        Args:
+            werte (pd.Series): Kennzahl je Schlüssel; fehlende Schlüssel werden aus der Rangliste entfernt.
+
+        Returns:
+            int: Anzahl geänderter (eingefügter, geänderter oder entfernter) Schlüssel.
+        """
+        werte = werte[werte.notna()].astype("float64")
+        if not werte.index.is_unique:
+            raise ValueError("Rangliste: Schlüssel müssen eindeutig sein")
+
+        bisher = self.werte.reindex(werte.index)
+        geaendert = werte[bisher.isna() | (bisher != werte)]
+        entfernt = self.werte.index.difference(werte.index)
+        for schluessel in entfernt:
+            del self._version[schluessel]
+
+        eintraege = [self._eintrag(schluessel, wert) for schluessel, wert in geaendert.items()]
+        if len(self._heap) + len(eintraege) > 2 * len(werte) + 64:
+            # Zu viele veraltete Einträge: Heap aus dem aktuellen Stand neu aufbauen (O(S))
+            self._version.clear()
+            self._heap = [self._eintrag(schluessel, wert) for schluessel, wert in werte.items()]
+            heapq.heapify(self._heap)
+        else:
+            for eintrag in eintraege:
+                heapq.heappush(self._heap, eintrag)
+
+        self.werte = werte
+        return len(geaendert) + len(entfernt)
+
+    def top(self, n):
+        """
+        Die n besten Schlüssel mit ihrem Wert.
+
+        Returns:
+            pd.Series: Kennzahl der besten n Schlüssel in Rangfolge.
+        """
+        beste = []
+        while self._heap and len(beste) < n:
+            eintrag = heapq.heappop(self._heap)
+            if self._version.get(eintrag[1]) == eintrag[2]:
+                beste.append(eintrag)
+        for eintrag in beste:
+            heapq.heappush(self._heap, eintrag)
+
+        schluessel = [eintrag[1] for eintrag in beste]
+        werte = np.array([eintrag[0] for eintrag in beste], dtype="float64")
+        index = pd.MultiIndex.from_tuples(schluessel, names=self.werte.index.names) if isinstance(
+            self.werte.index, pd.MultiIndex
+        ) else pd.Index(schluessel, name=self.werte.index.name)
+        return pd.Series(-werte if self.absteigend else werte, index=index, name=self.werte.name)
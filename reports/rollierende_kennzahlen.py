@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Monatszaehler:
+    """
+    Lieferungen und pünktliche Lieferungen je Lieferant und Monat als kumulierte Summen.
+
+    Die Zähler liegen als Präfixsummen über die Monate vor (erste Spalte 0). Die Summe eines
+    beliebigen Zeitfensters ist damit eine Differenz zweier Spalten - rollierende Kennzahlen für
+    alle Lieferanten und Monate kosten O(Lieferanten x Monate), unabhängig von der Fensterlänge.
+
+    Attributes:
+        lieferanten (pd.Index): Lieferanten (Zeilen der Zähler), benannt nach der Schlüsselspalte.
+        monate (pd.PeriodIndex): lückenlose Monate vom ersten bis zum letzten Monat mit Lieferungen.
+        lieferungen (np.ndarray): kumulierte Anzahl Lieferungen, Form (Lieferanten, Monate + 1).
+        puenktlich (np.ndarray): kumulierte Anzahl pünktlicher Lieferungen, Form wie lieferungen.
+    """
+    lieferanten: pd.Index
+    monate: pd.PeriodIndex
+    lieferungen: np.ndarray
+    puenktlich: np.ndarray
+
+    def summen(self, fenster):
+        """
+        Rollierende Summen über die letzten `fenster` Monate (einschließlich des jeweiligen Monats).
+
+        Returns:
+            tuple: (Lieferungen, pünktliche Lieferungen), jeweils Form (Lieferanten, Monate).
+        """
+        ende = np.arange(1, len(self.monate) + 1)
+        anfang = np.maximum(ende - fenster, 0)
+        return (
+            self.lieferungen[:, ende] - self.lieferungen[:, anfang],
+            self.puenktlich[:, ende] - self.puenktlich[:, anfang],
+        )
+
+    def zuverlaessigkeit(self, fenster=1):
+        """
+        Rollierende Zuverlässigkeit (Anteil pünktlicher Lieferungen in %) je Lieferant und Monat.
+
+        Args:
+            fenster (int): Fensterlänge in Monaten.
+
+        Returns:
+            pd.DataFrame: Index lieferanten, Spalten Monate; NaN ohne Lieferungen im Fenster.
+        """
+        lieferungen, puenktlich = self.summen(fenster)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            anteil = np.where(lieferungen > 0, puenktlich / lieferungen * 100, np.nan)
+        return pd.DataFrame(anteil, index=self.lieferanten, columns=self.monate)
+
+    def fenster_bis(self, fenster, ende=None):
+        """
+        Lieferungen und pünktliche Lieferungen je Lieferant in einem Fenster (O(Lieferanten)).
+
+        Args:
+            fenster (int): Fensterlänge in Monaten.
+            ende (pd.Period): Letzter Monat des Fensters (Standard: letzter Monat mit Lieferungen).
+
+        Returns:
+            pd.DataFrame: Spalten "Lieferungen" und "Pünktlich", Index lieferanten.
+        """
+        bis = len(self.monate)
+        if ende is not None and len(self.monate):
+            bis = int(np.clip(pd.Period(ende, freq="M").ordinal - self.monate[0].ordinal + 1, 0, bis))
+        von = max(bis - fenster, 0)
+        return pd.DataFrame({
+            "Lieferungen": self.lieferungen[:, bis] - self.lieferungen[:, von],
+            "Pünktlich": self.puenktlich[:, bis] - self.puenktlich[:, von],
+        }, index=self.lieferanten)
+
+
+def erstelle_monatszaehler(
+    fakten, schluessel="Lieferant-ID", datum_spalte="Lieferdatum (Soll)", puenktlich_spalte="Liefertreu"
+):
+    """
+    Zählt Lieferungen je Lieferant und Monat in einem Durchlauf (bincount) und kumuliert sie.
+
+    Args:
+        fakten (pd.DataFrame): Lieferungen mit Schlüssel, Datum und boolescher Liefertreue.
+        schluessel (str): Spalte, nach der gezählt wird (z. B. "Lieferant-ID" oder "Lieferantenbezeichnung").
+        datum_spalte (str): Datum, nach dem die Lieferungen den Monaten zugeordnet werden.
+        puenktlich_spalte (str): Boolesche Spalte "pünktlich".
+
+    Returns:
+        Monatszaehler: Kumulierte Zähler; ohne Lieferungen mit leeren Achsen.
+    """
+    datum = pd.to_datetime(fakten[datum_spalte])
+    monat = (datum.dt.year * 12 + datum.dt.month - 1).to_numpy()
+    lieferant_codes, lieferanten = pd.factorize(fakten[schluessel], sort=True)
+    lieferanten = pd.Index(lieferanten, name=schluessel)
+    if len(monat) == 0:
+        leer = np.zeros((0, 1), dtype="int64")
+        return Monatszaehler(lieferanten, pd.PeriodIndex([], freq="M"), leer, leer)
+
+    erster, anzahl_monate = monat.min(), monat.max() - monat.min() + 1
+    zelle = lieferant_codes * anzahl_monate + (monat - erster)
+    form = (len(lieferanten), anzahl_monate)
+    groesse = form[0] * form[1]
+    lieferungen = np.bincount(zelle, minlength=groesse).reshape(form)
+    puenktlich = np.bincount(zelle, weights=fakten[puenktlich_spalte].to_numpy(), minlength=groesse).reshape(form)
+
+    def kumuliert(zaehler):
+        return np.concatenate([np.zeros((form[0], 1), dtype="int64"), np.cumsum(zaehler, axis=1, dtype="int64")], axis=1)
+
+    monate = pd.period_range(pd.Period(year=erster // 12, month=erster % 12 + 1, freq="M"), periods=anzahl_monate, freq="M")
+    return Monatszaehler(lieferanten, monate, kumuliert(lieferungen), kumuliert(puenktlich))
@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+from sternschema import LIEFERANT_ID, MATERIAL_ID
+
+# Hierarchie für Drill-down und ROLLUP (von grob nach fein)
+HIERARCHIE = ["Land", "Lieferantenbezeichnung", "Materialnummer"]
+KENNZAHLEN = [
+    "Lieferungen", "Pünktlich", "Verspätungen", "Mengenabweichungen", "Soll-Menge", "WE-Menge", "Mengenabweichung",
+]
+
+
+@dataclass
+class Rollup:
+    """
+    Additive Kennzahlen auf allen Ebenen der Hierarchie Land -> Lieferant -> Material.
+
+    Die Lieferungen werden einmal je Lieferant-ID und Material-ID verdichtet (basis). Alle
+    weiteren Gruppierungen (wie GROUPING SETS bzw. ROLLUP) entstehen aus diesem kleinen
+    Zwischenergebnis, ohne die Lieferungen erneut zu lesen.
+
+    Attributes:
+        basis (pd.DataFrame): Kennzahlen je Lieferant-ID und Material-ID mit IDs und Stammdaten.
+        ebenen (dict): Anzahl Hierarchiestufen -> Kennzahlen je Präfix von HIERARCHIE (0 = Gesamt).
+    """
+    basis: pd.DataFrame
+    ebenen: dict
+
+    def summe(self, nach):
+        """
+        Kennzahlen je Gruppierung; Präfixe der Hierarchie sind vorberechnet.
+
+        Args:
+            nach (list): Gruppierungsspalten aus der Basis, z. B. ["Land"] oder ["Lieferantenbezeichnung"].
+
+        Returns:
+            pd.DataFrame: Eine Zeile je Gruppe, nach den Gruppierungsspalten sortiert.
+        """
+        if list(nach) == HIERARCHIE[:len(nach)]:
+            return self.ebenen[len(nach)]
+        return _verdichte(self.basis, nach)
+
+    def drill(self, pfad):
+        """
+        Unterelemente eines Knotens der Hierarchie, z. B. die Lieferanten eines Landes.
+
+        Args:
+            pfad (list): Gewählte Werte der oberen Ebenen, z. B. [] (Länder), ["DE"] (Lieferanten in DE).
+
+        Returns:
+            pd.DataFrame: Kennzahlen der nächsten Ebene unterhalb des Pfads.
+        """
+        ebene = self.ebenen[len(pfad) + 1]
+        auswahl = pd.Series(True, index=ebene.index)
+        for spalte, wert in zip(HIERARCHIE, pfad):
+            auswahl &= ebene[spalte] == wert
+        return ebene[auswahl].reset_index(drop=True)
+
+
+def _verdichte(basis, nach):
+    if not nach:
+        return basis[KENNZAHLEN].sum().to_frame().T
+    return basis.groupby(list(nach), observed=True, sort=True)[KENNZAHLEN].sum().reset_index()
+
+
+def erstelle_rollup(stern, fakten):
+    """
+    Verdichtet die (gefilterten) Lieferungen in einem Durchlauf und bildet alle Hierarchieebenen.
+
+    Args:
+        stern (Sternschema): Sternschema mit den Stammdaten.
+        fakten (pd.DataFrame): Faktentabelle mit "Liefertreu", Mengen und Mengenabweichung.
+
+    Returns:
+        Rollup: Basis und Ebenen Gesamt, Land, Land/Lieferant, Land/Lieferant/Material.
+    """
+    verdichtet = (
+        pd.DataFrame({
+            LIEFERANT_ID: fakten[LIEFERANT_ID],
+            MATERIAL_ID: fakten[MATERIAL_ID],
+            "Lieferungen": 1,
+            "Pünktlich": fakten["Liefertreu"].astype("int64"),
+            "Verspätungen": (~fakten["Liefertreu"]).astype("int64"),
+            "Mengenabweichungen": (fakten["Mengenabweichung"] != 0).astype("int64"),
+            "Soll-Menge": fakten["Soll-Menge"].astype("int64"),
+            "WE-Menge": fakten["WE-Menge"].astype("int64"),
+            "Mengenabweichung": fakten["Mengenabweichung"].astype("int64"),
+        })
+        .groupby([LIEFERANT_ID, MATERIAL_ID], sort=True)
+        .sum()
+        .reset_index()
+    )
+    basis = pd.concat([verdichtet[[LIEFERANT_ID, MATERIAL_ID]], stern.mit_namen(verdichtet)], axis=1)
+    # ROLLUP: jede Ebene aus der nächstfeineren
+    ebenen = {len(HIERARCHIE): _verdichte(basis, HIERARCHIE)}
+    for stufe in range(len(HIERARCHIE) - 1, -1, -1):
+        ebenen[stufe] = _verdichte(ebenen[stufe + 1], HIERARCHIE[:stufe])
+    return Rollup(basis=basis, ebenen=ebenen)
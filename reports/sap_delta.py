@@ -0,0 +1,310 @@
+"""
+Delta-Abzug aus den SAP-Einkaufstabellen über Wasserzeichen je Quelltabelle.
+
+Statt vollständiger Tabellenabzüge werden nur Bestellungen gezogen, die seit dem letzten Lauf
+neu sind oder sich geändert haben, und je Beleg in die lokale Datenbank aus sap_extrakt.py
+übernommen (Upsert: alte Zeilen des Belegs löschen, aktuelle einfügen). Anschließend wird der
+Lieferdatensatz in data/raw nur für die betroffenen Bestellungen aktualisiert. Der Import
+(datenimport.py) vergleicht die Datei je Lieferscheinnummer mit dem Bestand und ersetzt nur
+geänderte oder entfallene Lieferscheine, es entstehen keine doppelten Zeilen.
+
+Grenze: EKET führt kein Änderungsdatum. Neue oder geänderte Einteilungen einer bestehenden
+Bestellung bzw. eines Lieferplans werden nur erkannt, wenn sich das Änderungsdatum (AEDAT) in
+EKKO/EKPO ändert oder ein Wareneingang gebucht wird (EKEK.LWEDT). Für einen vollständigen
+Abgleich die Wasserzeichen löschen (nächster Lauf lädt alles) oder sap_extrakt.py verwenden.
+
+Als Quelle dient jede DB-API-Verbindung mit den SAP-Tabellen, lokal z. B. eine SQLite-Datei.
+
+Aufruf aus dem Projektverzeichnis:
+    python reports/sap_delta.py --quelle data/external/sap/sap_quelle.sqlite --jahr 2024
+"""
+import argparse
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from sap_extrakt import (
+    PROJEKT_DIR,
+    ROHDATEN_DIR,
+    STANDARD_FILTER,
+    erstelle_indizes,
+    lieferdaten,
+    verbinde,
+)
+
+QUELL_PFAD = os.path.join(PROJEKT_DIR, "data", "external", "sap", "sap_quelle.sqlite")
+
+# Wasserzeichen je Belegtabelle: Änderungsdatum, wo die Tabelle eines führt; bei EKEK das Datum des
+# letzten Wareneingangs (neue Wareneingänge auf bestehenden Lieferplänen), sonst die Belegnummer
+# (erkennt bei EKET nur neue Belege, siehe Grenze oben)
+WASSERZEICHEN = {
+    "EKKO": "AEDAT",
+    "EKPO": "AEDAT",
+    "EKET": "EBELN",
+    "EKEK": "LWEDT",
+}
+# Stammdaten ohne Änderungsdatum - klein genug, um bei jedem Lauf vollständig übernommen zu werden
+STAMMDATEN = ["LFA1", "MAKT"]
+# Belegnummern je Abfrage an die Quelle (Grenze für Parameterlisten)
+BELEGE_JE_ABFRAGE = 500
+ABRUFGROESSE = 50_000
+
+
+@dataclass
+class DeltaLauf:
+    """
+    Ergebnis eines Delta-Abzugs.
+
+    Attributes:
+        belege (set): Geänderte oder neue Bestellungen als (Mandant, Bestellnummer).
+        zeilen (dict): Tabelle -> Anzahl übernommener Zeilen.
+        vollstaendig (list): Tabellen, die mangels Wasserzeichen vollständig geladen wurden.
+        dauer (dict): Schritt -> Laufzeit in Sekunden.
+    """
+    belege: set = field(default_factory=set)
+    zeilen: dict = field(default_factory=dict)
+    vollstaendig: list = field(default_factory=list)
+    dauer: dict = field(default_factory=dict)
+
+
+def _spalten(verbindung, tabelle):
+    return [zeile[1] for zeile in verbindung.execute(f'PRAGMA table_info("{tabelle}")')]
+
+
+def _quell_spalten(quelle, tabelle):
+    cursor = quelle.execute(f'SELECT * FROM "{tabelle}" WHERE 1 = 0')
+    return [beschreibung[0] for beschreibung in cursor.description]
+
+
+def lese_wasserzeichen(verbindung):
+    """Tabelle -> (Spalte, Wert) des letzten Delta-Abzugs."""
+    return {tabelle: (spalte, wert) for tabelle, spalte, wert in verbindung.execute("SELECT * FROM _wasserzeichen")}
+
+
+def _kopiere(quelle, verbindung, tabelle, sql, parameter=()):
+    # Zeilen blockweise aus der Quelle lesen und einfügen, ohne die ganze Tabelle im Speicher zu halten
+    cursor = quelle.execute(sql, parameter)
+    platzhalter = ", ".join("?" * len(cursor.description))
+    zeilen = 0
+    while True:
+        block = cursor.fetchmany(ABRUFGROESSE)
+        if not block:
+            return zeilen
+        verbindung.executemany(f'INSERT INTO "{tabelle}" VALUES ({platzhalter})', block)
+        zeilen += len(block)
+
+
+def lade_vollstaendig(quelle, verbindung, tabelle):
+    """
+    Übernimmt eine Tabelle vollständig aus der Quelle (erster Lauf oder Stammdaten).
+
+    Args:
+        quelle: DB-API-Verbindung zum Quellsystem.
+        verbindung (sqlite3.Connection): Lokale Datenbank.
+        tabelle (str): SAP-Tabellenname.
+
+    Returns:
+        int: Anzahl übernommener Zeilen.
+    """
+    spalten = _quell_spalten(quelle, tabelle)
+    verbindung.execute(f'DROP TABLE IF EXISTS "{tabelle}"')
+    definition = ", ".join(f'"{spalte}" TEXT' for spalte in spalten)
+    verbindung.execute(f'CREATE TABLE "{tabelle}" ({definition})')
+    zeilen = _kopiere(quelle, verbindung, tabelle, f'SELECT * FROM "{tabelle}"')
+    erstelle_indizes(verbindung, tabelle)
+    return zeilen
+
+
+def geaenderte_belege(quelle, tabelle, spalte, wert):
+    """
+    Bestellungen mit Zeilen ab dem Wasserzeichen.
+
+    Änderungsdaten werden mit >= verglichen, damit am Stichtag später geänderte Belege nicht
+    verloren gehen; doppelt gezogene Belege sind unschädlich, da sie je Beleg ersetzt werden.
+    Belegnummern werden fortlaufend vergeben, dort genügt >.
+
+    Args:
+        quelle: DB-API-Verbindung zum Quellsystem.
+        tabelle (str): SAP-Tabellenname.
+        spalte (str): Wasserzeichen-Spalte (Änderungsdatum oder Belegnummer).
+        wert (str): Stand des letzten Laufs.
+
+    Returns:
+        set: (Mandant, Bestellnummer) der betroffenen Belege.
+    """
+    vergleich = ">" if spalte == "EBELN" else ">="
+    sql = f'SELECT DISTINCT MANDT, EBELN FROM "{tabelle}" WHERE "{spalte}" {vergleich} ?'
+    return set(quelle.execute(sql, (wert,)).fetchall())
+
+
+def ersetze_belege(quelle, verbindung, tabelle, belege):
+    """
+    Upsert je Beleg: löscht die lokalen Zeilen der Belege und übernimmt deren aktuellen Stand.
+
+    So werden auch in der Quelle gelöschte Positionen oder Einteilungen entfernt.
+
+    Args:
+        quelle: DB-API-Verbindung zum Quellsystem.
+        verbindung (sqlite3.Connection): Lokale Datenbank.
+        tabelle (str): SAP-Tabellenname.
+        belege (set): (Mandant, Bestellnummer) der zu ersetzenden Belege.
+
+    Returns:
+        int: Anzahl übernommener Zeilen.
+    """
+    spalten = ", ".join(f'"{spalte}"' for spalte in _spalten(verbindung, tabelle))
+    verbindung.execute("CREATE TEMP TABLE IF NOT EXISTS _delta (MANDT TEXT, EBELN TEXT, PRIMARY KEY (MANDT, EBELN))")
+    verbindung.execute("DELETE FROM temp._delta")
+    verbindung.executemany("INSERT INTO temp._delta VALUES (?, ?)", belege)
+    verbindung.execute(f'DELETE FROM "{tabelle}" WHERE (MANDT, EBELN) IN (SELECT MANDT, EBELN FROM temp._delta)')
+
+    zeilen = 0
+    nach_mandant = {}
+    for mandant, beleg in belege:
+        nach_mandant.setdefault(mandant, []).append(beleg)
+    for mandant, nummern in nach_mandant.items():
+        nummern.sort()
+        for start in range(0, len(nummern), BELEGE_JE_ABFRAGE):
+            teil = nummern[start:start + BELEGE_JE_ABFRAGE]
+            sql = f'SELECT {spalten} FROM "{tabelle}" WHERE MANDT = ? AND EBELN IN ({", ".join("?" * len(teil))})'
+            zeilen += _kopiere(quelle, verbindung, tabelle, sql, (mandant, *teil))
+    return zeilen
+
+
+def aktualisiere_delta(quelle, verbindung):
+    """
+    Zieht alle seit dem letzten Lauf neuen oder geänderten Bestellungen in die lokale Datenbank.
+
+    Tabellen ohne Wasserzeichen (erster Lauf oder nach einem Vollabzug aus sap_extrakt.py)
+    werden vollständig geladen. Die neuen Wasserzeichen werden vor dem Abruf ermittelt und
+    erst zusammen mit den Daten festgeschrieben - ein abgebrochener Lauf wird wiederholt.
+
+    Args:
+        quelle: DB-API-Verbindung zum Quellsystem.
+        verbindung (sqlite3.Connection): Lokale Datenbank (sap_extrakt.verbinde()).
+
+    Returns:
+        DeltaLauf: Betroffene Belege, Zeilenzahlen und Laufzeiten.
+    """
+    lauf = DeltaLauf()
+    wasserzeichen = lese_wasserzeichen(verbindung)
+    vorhanden = {name for (name,) in verbindung.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    start = time.perf_counter()
+    neue_wasserzeichen = {}
+    for tabelle, spalte in WASSERZEICHEN.items():
+        (neue_wasserzeichen[tabelle],) = quelle.execute(f'SELECT MAX("{spalte}") FROM "{tabelle}"').fetchone()
+        if tabelle in vorhanden and wasserzeichen.get(tabelle, (None, None))[0] == spalte:
+            lauf.belege |= geaenderte_belege(quelle, tabelle, spalte, wasserzeichen[tabelle][1])
+        else:
+            lauf.vollstaendig.append(tabelle)
+    lauf.dauer["erkennen"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for tabelle in WASSERZEICHEN:
+        if tabelle in lauf.vollstaendig:
+            lauf.zeilen[tabelle] = lade_vollstaendig(quelle, verbindung, tabelle)
+        elif lauf.belege:
+            lauf.zeilen[tabelle] = ersetze_belege(quelle, verbindung, tabelle, lauf.belege)
+    for tabelle in STAMMDATEN:
+        lauf.zeilen[tabelle] = lade_vollstaendig(quelle, verbindung, tabelle)
+    for tabelle, wert in neue_wasserzeichen.items():
+        if wert is not None:
+            verbindung.execute(
+                "INSERT OR REPLACE INTO _wasserzeichen VALUES (?, ?, ?)", (tabelle, WASSERZEICHEN[tabelle], wert)
+            )
+    verbindung.commit()
+    lauf.dauer["übernehmen"] = time.perf_counter() - start
+    return lauf
+
+
+def _gleiche_zeilen(alt, neu):
+    # Reihenfolgeunabhängiger Vergleich; gemeinsam verketten, damit beide Seiten dieselben Datentypen haben
+    if len(alt) != len(neu):
+        return False
+    hashes = pd.util.hash_pandas_object(pd.concat([alt, neu], ignore_index=True), index=False).to_numpy()
+    return (np.sort(hashes[:len(alt)]) == np.sort(hashes[len(alt):])).all()
+
+
+def aktualisiere_lieferdatensatz(verbindung, lauf, jahr, ziel=None, **filter):
+    """
+    Schreibt den Lieferdatensatz eines Jahres nur für die Belege des Delta-Laufs neu.
+
+    Zeilen der betroffenen Bestellungen werden ersetzt, alle übrigen aus der vorhandenen Datei
+    übernommen. Ohne vorhandene Datei oder nach einem Volllauf wird der Datensatz vollständig erstellt.
+    Sind die Zeilen der Belege unverändert, bleibt die Datei unberührt.
+    Die Datei liegt in den Quellordnern des Imports; dieser übernimmt nur die geänderten
+    Lieferscheine und entfernt die Zeilen entfallener (siehe datenimport.importiere_neue_dateien()).
+
+    Args:
+        verbindung (sqlite3.Connection): Lokale Datenbank.
+        lauf (DeltaLauf): Ergebnis von aktualisiere_delta().
+        jahr (int): Jahr des Soll-Lieferdatums.
+        ziel (str): Zieldatei (Standard: data/raw/liefertreue_sap_<jahr>.parquet).
+        **filter: Abweichungen von STANDARD_FILTER.
+
+    Returns:
+        tuple: (Zieldatei, Anzahl Zeilen, Anzahl neu abgefragter Zeilen)
+    """
+    ziel = ziel or os.path.join(ROHDATEN_DIR, f"liefertreue_sap_{jahr}.parquet")
+    vorhanden = os.path.exists(ziel)
+    if vorhanden and not lauf.vollstaendig and not lauf.belege:
+        # Nichts geändert - Datei unverändert lassen, damit der Import sie nicht erneut liest
+        return ziel, pq.ParquetFile(ziel).metadata.num_rows, 0
+
+    if not vorhanden or lauf.vollstaendig:
+        df = neu = lieferdaten(verbindung, jahr, **filter)
+    else:
+        nummern = {beleg for _, beleg in lauf.belege}
+        bestand = pd.read_parquet(ziel)
+        neu = lieferdaten(verbindung, jahr, belege=nummern, **filter)
+        betroffen = bestand["Bestellnummer"].isin(nummern)
+        if _gleiche_zeilen(bestand[betroffen], neu):
+            # Erneut gezogene, aber unveränderte Belege (Wasserzeichen mit >=) - Datei nicht anfassen
+            return ziel, len(bestand), len(neu)
+        bestand = bestand[~betroffen]
+        df = neu if bestand.empty else pd.concat([bestand, neu], ignore_index=True)
+
+    # Erst temporär schreiben, dann umbenennen - der Import sieht nur vollständige Dateien
+    df.to_parquet(f"{ziel}.tmp", index=False)
+    os.replace(f"{ziel}.tmp", ziel)
+    return ziel, len(df), len(neu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-Abzug der SAP-Einkaufsbelege")
+    parser.add_argument("--quelle", default=QUELL_PFAD, help="SQLite-Datei mit den SAP-Tabellen")
+    parser.add_argument("--jahr", type=int, required=True, help="Jahr des Soll-Lieferdatums")
+    parser.add_argument("--ziel", default=None, help="Zieldatei (.parquet)")
+    for name, wert in STANDARD_FILTER.items():
+        parser.add_argument(f"--{name}", default=wert)
+    argumente = parser.parse_args()
+
+    quelle = sqlite3.connect(f"file:{argumente.quelle}?mode=ro", uri=True)
+    verbindung = verbinde()
+    try:
+        lauf = aktualisiere_delta(quelle, verbindung)
+        start = time.perf_counter()
+        ziel, zeilen, neu = aktualisiere_lieferdatensatz(
+            verbindung, lauf, argumente.jahr, argumente.ziel,
+            **{name: getattr(argumente, name) for name in STANDARD_FILTER},
+        )
+        lauf.dauer["datensatz"] = time.perf_counter() - start
+    finally:
+        quelle.close()
+        verbindung.close()
+
+    if lauf.vollstaendig:
+        print(f"Vollständig geladen: {', '.join(lauf.vollstaendig)}")
+    print(f"{len(lauf.belege)} geänderte Bestellungen, übernommene Zeilen: {lauf.zeilen}")
+    print(f"{zeilen} Lieferungen in {ziel} ({neu} neu abgefragt)")
+    print("Dauer: " + ", ".join(f"{schritt} {dauer:.2f} s" for schritt, dauer in lauf.dauer.items()))
+
+
+if __name__ == "__main__":
+    main()
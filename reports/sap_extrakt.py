@@ -0,0 +1,350 @@
+"""
+Lokale SQL-Engine (SQLite) für die SAP-Abzüge aus "notebooks/SQL Statements.ipynb".
+
+Flache Tabellenabzüge (z. B. EKKO.csv, EKPO.parquet) unter data/external/sap werden in eine
+SQLite-Datenbank geladen, mit Indizes auf den Belegschlüsseln versehen und über die dokumentierten
+Joins zu einem Lieferdatensatz mit den Spalten der Rohdaten verbunden.
+
+Aufruf aus dem Projektverzeichnis:
+    python reports/sap_extrakt.py --jahr 2024 --werk 054
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+PROJEKT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXTRAKT_DIR = os.path.join(PROJEKT_DIR, "data", "external", "sap")
+DATENBANK_PFAD = os.path.join(PROJEKT_DIR, "data", "interim", "sap_extrakt.sqlite")
+ROHDATEN_DIR = os.path.join(PROJEKT_DIR, "data", "raw")
+BLOCKGROESSE = 200_000
+
+# Spalten je SAP-Tabelle (siehe Tabellenbeschreibungen im SQL-Notebook)
+TABELLEN = {
+    "EKKO": ["MANDT", "EBELN", "BEDAT", "BUKRS", "BSTYP", "BSART", "LIFNR"],
+    "EKPO": ["MANDT", "EBELN", "EBELP", "MENGE", "WERKS", "MATNR"],
+    "EKET": ["MANDT", "EBELN", "EBELP", "ETENR", "EINDT", "MENGE", "AMENG", "WEMNG"],
+    "EKES": ["MANDT", "EBELN", "EBELP", "ORMNG", "MENGE", "EINDT", "VBELN", "VBELP"],
+    "EKEK": ["MANDT", "EBELN", "LFNKD", "LWEDT", "LWEMG"],
+    "EKBE": ["MANDT", "EBELN", "EBELP", "VGABE", "BELNR", "BUZEI", "BUDAT", "SHKZG", "MENGE", "EINDT", "VBELN", "VBELP"],
+    "MSEG": ["MANDT", "EBELN", "EBELP", "MBLNR", "MJAHR", "ZEILE", "MATNR", "MENGE"],
+    "MKPF": ["MANDT", "MBLNR", "MJAHR", "BUDAT", "BLDAT", "VGART", "LE_VBELN"],
+    "LIKP": ["MANDT", "VBELN", "WADAT", "LFDAT", "IMWRK", "LIFEX"],
+    "LIPS": ["MANDT", "VBELN", "POSNR", "WERKS", "MATNR", "LFIMG", "LGMNG", "MTART", "BWART"],
+    "MARA": ["MANDT", "MATNR", "MTART"],
+    "MARC": ["MANDT", "MATNR", "WERKS", "CC_DELMTHD"],
+    "MAKT": ["MANDT", "MATNR", "SPRAS", "MAKTX"],
+    "LFA1": ["MANDT", "LIFNR", "NAME1", "LAND1"],
+}
+
+# Indizes auf den Join-Schlüsseln (Belegnummer/-position bzw. Stammdatenschlüssel).
+# Bei EKET und EKEK enthalten sie zusätzlich die Spalten aus LIEFERDATEN_SQL, damit der Join
+# nur den Index liest (covering index) und keine Tabellenzeilen nachschlagen muss.
+INDIZES = {
+    "EKKO": [("MANDT", "EBELN")],
+    "EKPO": [("MANDT", "EBELN", "EBELP"), ("MANDT", "MATNR")],
+    "EKET": [("MANDT", "EBELN", "EBELP", "EINDT", "MENGE")],
+    "EKES": [("MANDT", "EBELN", "EBELP")],
+    "EKEK": [("MANDT", "EBELN", "LFNKD", "LWEDT", "LWEMG")],
+    "EKBE": [("MANDT", "EBELN", "EBELP")],
+    "MSEG": [("MANDT", "EBELN", "EBELP"), ("MANDT", "MBLNR", "MJAHR")],
+    "MKPF": [("MANDT", "MBLNR", "MJAHR")],
+    "LIKP": [("MANDT", "VBELN")],
+    "LIPS": [("MANDT", "VBELN", "POSNR")],
+    "MARA": [("MANDT", "MATNR")],
+    "MARC": [("MANDT", "MATNR", "WERKS")],
+    "MAKT": [("MANDT", "MATNR", "SPRAS")],
+    "LFA1": [("MANDT", "LIFNR")],
+}
+
+# Join "Bestellpositionen & Lieferpläne" aus dem SQL-Notebook, ergänzt um Lieferanten- und Materialtexte
+LIEFERDATEN_SQL = """
+SELECT
+    EKEK.LFNKD AS "Lieferscheinnummer",
+    EKKO.LIFNR AS "Lieferantennummer",
+    LFA1.NAME1 AS "Lieferantenbezeichnung",
+    EKPO.MATNR AS "Materialnummer",
+    MAKT.MAKTX AS "Materialbezeichnung",
+    LFA1.LAND1 AS "Land",
+    EKKO.BEDAT AS "Bestelldatum",
+    EKET.EINDT AS "Lieferdatum (Soll)",
+    EKEK.LWEDT AS "Wareneingangsdatum (WE)",
+    EKET.MENGE AS "Soll-Menge",
+    EKEK.LWEMG AS "WE-Menge",
+    EKKO.EBELN AS "Bestellnummer"
+FROM EKKO
+JOIN EKPO ON EKKO.MANDT = EKPO.MANDT AND EKKO.EBELN = EKPO.EBELN
+JOIN EKET ON EKPO.MANDT = EKET.MANDT AND EKPO.EBELN = EKET.EBELN AND EKPO.EBELP = EKET.EBELP
+LEFT JOIN EKEK ON EKKO.MANDT = EKEK.MANDT AND EKKO.EBELN = EKEK.EBELN
+LEFT JOIN LFA1 ON EKKO.MANDT = LFA1.MANDT AND EKKO.LIFNR = LFA1.LIFNR
+LEFT JOIN MAKT ON EKPO.MANDT = MAKT.MANDT AND EKPO.MATNR = MAKT.MATNR AND MAKT.SPRAS = :sprache
+WHERE EKKO.BUKRS = :bukrs
+    AND EKPO.WERKS = :werk
+    AND EKET.EINDT LIKE :jahr || '%'
+    AND EKKO.EBELN LIKE :belegpraefix || '%'
+    AND EKKO.BSTYP = :bstyp
+    AND EKKO.BSART LIKE :bsart
+"""
+LIEFERDATEN_TABELLEN = ["EKKO", "EKPO", "EKET", "EKEK", "LFA1", "MAKT"]
+
+# Auswahl wie im SQL-Notebook (Werk Rastatt, Lieferpläne der 55er Belege)
+STANDARD_FILTER = {
+    "bukrs": "0010",
+    "werk": "054",
+    "belegpraefix": "55",
+    "bstyp": "L",
+    "bsart": "LPA",
+    "sprache": "D",
+}
+
+
+def verbinde(pfad=DATENBANK_PFAD):
+    """Öffnet die Datenbank; Schreibschutzmechanismen sind aus, da sie jederzeit neu aufgebaut werden kann."""
+    os.makedirs(os.path.dirname(pfad), exist_ok=True)
+    verbindung = sqlite3.connect(pfad)
+    verbindung.execute("PRAGMA journal_mode = OFF")
+    verbindung.execute("PRAGMA synchronous = OFF")
+    verbindung.execute("PRAGMA temp_store = MEMORY")
+    verbindung.execute(
+        "CREATE TABLE IF NOT EXISTS _extrakte (tabelle TEXT PRIMARY KEY, datei TEXT, groesse INTEGER, geaendert REAL)"
+    )
+    # Stand der Delta-Abzüge je Tabelle (siehe sap_delta.py)
+    verbindung.execute("CREATE TABLE IF NOT EXISTS _wasserzeichen (tabelle TEXT PRIMARY KEY, spalte TEXT, wert TEXT)")
+    return verbindung
+
+
+def extrakt_dateien(extrakt_dir=EXTRAKT_DIR):
+    """Tabellenname -> Abzugsdatei (.csv, .parquet oder .xlsx, Dateiname = Tabellenname)."""
+    dateien = {}
+    for pfad in sorted(glob.glob(os.path.join(extrakt_dir, "*"))):
+        name, endung = os.path.splitext(os.path.basename(pfad))
+        if name.upper() in TABELLEN and endung.lower() in (".csv", ".parquet", ".xlsx"):
+            dateien[name.upper()] = pfad
+    return dateien
+
+
+def _lese_bloecke(pfad, trennzeichen):
+    # Alle Felder als Text: SAP-Schlüssel wie Werk "054" oder Position "00010" behalten ihre Nullen
+    endung = os.path.splitext(pfad)[1].lower()
+    if endung == ".csv":
+        yield from pd.read_csv(pfad, sep=trennzeichen, dtype=str, keep_default_na=False, chunksize=BLOCKGROESSE)
+    elif endung == ".parquet":
+        yield pd.read_parquet(pfad).astype("string").fillna("").astype(object)
+    else:
+        yield pd.read_excel(pfad, dtype=str).fillna("")
+
+
+def lade_abzug(verbindung, tabelle, pfad, trennzeichen=";"):
+    """
+    Lädt einen Tabellenabzug blockweise in die Datenbank und legt die Indizes an.
+
+    Args:
+        verbindung (sqlite3.Connection): Geöffnete Datenbank.
+        tabelle (str): SAP-Tabellenname, z. B. "EKPO".
+        pfad (str): Abzugsdatei.
+        trennzeichen (str): Spaltentrenner bei CSV-Dateien.
+
+    Returns:
+        int: Anzahl geladener Zeilen.
+
+    Raises:
+        ValueError: Wenn Spalten aus TABELLEN im Abzug fehlen.
+    """
+    verbindung.execute(f'DROP TABLE IF EXISTS "{tabelle}"')
+    zeilen = 0
+    for block in _lese_bloecke(pfad, trennzeichen):
+        block.columns = [spalte.strip().upper() for spalte in block.columns]
+        fehlend = [spalte for spalte in TABELLEN[tabelle] if spalte not in block.columns]
+        if fehlend:
+            raise ValueError(f"{os.path.basename(pfad)}: Spalten {fehlend} fehlen")
+        if zeilen == 0:
+            spalten = ", ".join(f'"{spalte}" TEXT' for spalte in block.columns)
+            verbindung.execute(f'CREATE TABLE "{tabelle}" ({spalten})')
+        platzhalter = ", ".join("?" * len(block.columns))
+        verbindung.executemany(f'INSERT INTO "{tabelle}" VALUES ({platzhalter})', block.itertuples(index=False, name=None))
+        zeilen += len(block)
+
+    erstelle_indizes(verbindung, tabelle)
+
+    stat = os.stat(pfad)
+    verbindung.execute(
+        "INSERT OR REPLACE INTO _extrakte VALUES (?, ?, ?, ?)",
+        (tabelle, os.path.relpath(pfad, PROJEKT_DIR), stat.st_size, stat.st_mtime),
+    )
+    # Ein Vollabzug ersetzt den Delta-Stand - der nächste Delta-Lauf beginnt neu
+    verbindung.execute("DELETE FROM _wasserzeichen WHERE tabelle = ?", (tabelle,))
+    verbindung.commit()
+    return zeilen
+
+
+def erstelle_indizes(verbindung, tabelle):
+    """Legt die Indizes aus INDIZES an (erst nach dem Laden - schneller als bei jedem Insert zu pflegen)."""
+    for schluessel in INDIZES.get(tabelle, []):
+        name = f"idx_{tabelle}_{'_'.join(schluessel)}"
+        verbindung.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{tabelle}" ({", ".join(schluessel)})')
+    verbindung.execute(f'ANALYZE "{tabelle}"')
+
+
+def aktualisiere_datenbank(verbindung, extrakt_dir=EXTRAKT_DIR, trennzeichen=";"):
+    """
+    Lädt nur Abzüge, die neu sind oder sich seit dem letzten Laden geändert haben.
+
+    Args:
+        verbindung (sqlite3.Connection): Geöffnete Datenbank.
+        extrakt_dir (str): Ordner mit den Tabellenabzügen.
+        trennzeichen (str): Spaltentrenner bei CSV-Dateien.
+
+    Returns:
+        dict: Tabelle -> Anzahl geladener Zeilen (nur neu geladene Tabellen).
+    """
+    geladen = {
+        tabelle: (groesse, geaendert)
+        for tabelle, groesse, geaendert in verbindung.execute("SELECT tabelle, groesse, geaendert FROM _extrakte")
+    }
+    ergebnis = {}
+    for tabelle, pfad in extrakt_dateien(extrakt_dir).items():
+        stat = os.stat(pfad)
+        if geladen.get(tabelle) != (stat.st_size, stat.st_mtime):
+            ergebnis[tabelle] = lade_abzug(verbindung, tabelle, pfad, trennzeichen)
+    return ergebnis
+
+
+def _je_wert(serie, umwandlung):
+    # Datums- und Mengenfelder wiederholen sich stark - jeden Wert nur einmal umwandeln
+    codes, werte = pd.factorize(serie)
+    umgewandelt = pd.Series(umwandlung(pd.Series(werte, dtype="string")).to_numpy())
+    ergebnis = umgewandelt.take(codes.clip(min=0)).set_axis(serie.index)
+    return ergebnis.where(codes >= 0)
+
+
+def sap_datum(serie):
+    """SAP-Datum (JJJJMMTT, in manchen Abzügen JJJJ-MM-TT) als datetime; 00000000 = kein Datum (NaT)."""
+    return _je_wert(
+        serie,
+        lambda werte: pd.to_datetime(werte.str.replace("-", "", regex=False), format="%Y%m%d", errors="coerce"),
+    )
+
+
+def sap_menge(serie):
+    """SAP-Menge als Zahl (auch mit Dezimalkomma und Tausenderpunkt); int64, wenn alle Werte ganzzahlig sind."""
+    def umwandlung(werte):
+        werte = werte.str.strip()
+        deutsch = werte.str.contains(",", regex=False)
+        werte = werte.where(~deutsch, werte.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        return pd.to_numeric(werte, errors="coerce")
+
+    menge = _je_wert(serie, umwandlung)
+    return menge.astype("int64") if menge.notnull().all() and (menge % 1 == 0).all() else menge
+
+
+def lieferdaten(verbindung, jahr, materialnummern=None, belege=None, materialbereich=None, **filter):
+    """
+    Führt den dokumentierten Join aus und liefert den Datensatz im Format der Rohdaten.
+
+    Args:
+        verbindung (sqlite3.Connection): Datenbank mit den geladenen Abzügen.
+        jahr (int): Jahr des Soll-Lieferdatums (EKET.EINDT).
+        materialnummern (list): Optional nur diese Materialnummern (EKPO.MATNR).
+        belege (list): Optional nur diese Bestellnummern (EKKO.EBELN), z. B. aus einem Delta-Abzug.
+        materialbereich (tuple): Optional (von, bis) der Materialnummern, "bis" ausschließlich; None = offen.
+        **filter: Abweichungen von STANDARD_FILTER (bukrs, werk, belegpraefix, bstyp, bsart, sprache).
+
+    Returns:
+        pd.DataFrame: Spalten wie data/raw/liefertreue_dataset_2024.xlsx, zusätzlich "Bestellnummer".
+
+    Raises:
+        ValueError: Wenn benötigte Tabellen nicht geladen sind.
+    """
+    vorhanden = {name for (name,) in verbindung.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    fehlend = [tabelle for tabelle in LIEFERDATEN_TABELLEN if tabelle not in vorhanden]
+    if fehlend:
+        raise ValueError(f"Tabellenabzüge fehlen: {fehlend}")
+
+    parameter = {**STANDARD_FILTER, **filter, "jahr": str(jahr)}
+    sql = LIEFERDATEN_SQL
+    if materialnummern:
+        platzhalter = ", ".join(f":matnr{i}" for i in range(len(materialnummern)))
+        sql += f"    AND EKPO.MATNR IN ({platzhalter})\n"
+        parameter.update({f"matnr{i}": matnr for i, matnr in enumerate(materialnummern)})
+    if materialbereich is not None:
+        von, bis = materialbereich
+        if von is not None:
+            sql += "    AND EKPO.MATNR >= :matnr_von\n"
+            parameter["matnr_von"] = von
+        if bis is not None:
+            sql += "    AND EKPO.MATNR < :matnr_bis\n"
+            parameter["matnr_bis"] = bis
+    if belege is not None:
+        # Beliebig viele Belegnummern über eine temporäre Tabelle statt einer Parameterliste
+        verbindung.execute("CREATE TEMP TABLE IF NOT EXISTS _belege (EBELN TEXT PRIMARY KEY)")
+        verbindung.execute("DELETE FROM temp._belege")
+        verbindung.executemany("INSERT OR IGNORE INTO temp._belege VALUES (?)", ((beleg,) for beleg in belege))
+        sql += "    AND EKKO.EBELN IN (SELECT EBELN FROM temp._belege)\n"
+
+    df = pd.read_sql_query(sql, verbindung, params=parameter)
+    for spalte in ["Bestelldatum", "Lieferdatum (Soll)", "Wareneingangsdatum (WE)"]:
+        df[spalte] = sap_datum(df[spalte])
+    for spalte in ["Soll-Menge", "WE-Menge"]:
+        df[spalte] = sap_menge(df[spalte])
+    return df
+
+
+def erstelle_lieferdatensatz(jahr, extrakt_dir=EXTRAKT_DIR, ziel=None, materialnummern=None, trennzeichen=";", **filter):
+    """
+    Aktualisiert die Datenbank aus den Abzügen und schreibt den Lieferdatensatz nach data/raw.
+
+    Die Datei wird anschließend vom Append-Import (datenimport.py) wie eine neue Excel-Datei übernommen.
+
+    Args:
+        jahr (int): Jahr des Soll-Lieferdatums.
+        extrakt_dir (str): Ordner mit den Tabellenabzügen.
+        ziel (str): Zieldatei (Standard: data/raw/liefertreue_sap_<jahr>.parquet).
+        materialnummern (list): Optional nur diese Materialnummern.
+        trennzeichen (str): Spaltentrenner bei CSV-Dateien.
+        **filter: Abweichungen von STANDARD_FILTER.
+
+    Returns:
+        tuple: (Zieldatei, Anzahl Zeilen)
+    """
+    ziel = ziel or os.path.join(ROHDATEN_DIR, f"liefertreue_sap_{jahr}.parquet")
+    verbindung = verbinde()
+    try:
+        aktualisiere_datenbank(verbindung, extrakt_dir, trennzeichen)
+        df = lieferdaten(verbindung, jahr, materialnummern, **filter)
+    finally:
+        verbindung.close()
+
+    # Erst temporär schreiben, dann umbenennen - der Import sieht nur vollständige Dateien
+    df.to_parquet(f"{ziel}.tmp", index=False)
+    os.replace(f"{ziel}.tmp", ziel)
+    return ziel, len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lieferdatensatz aus SAP-Tabellenabzügen erstellen")
+    parser.add_argument("--jahr", type=int, required=True, help="Jahr des Soll-Lieferdatums")
+    parser.add_argument("--extrakte", default=EXTRAKT_DIR, help="Ordner mit den Tabellenabzügen")
+    parser.add_argument("--ziel", default=None, help="Zieldatei (.parquet)")
+    parser.add_argument("--material", nargs="*", default=None, help="Nur diese Materialnummern")
+    parser.add_argument("--trennzeichen", default=";", help="Spaltentrenner der CSV-Abzüge")
+    for name, wert in STANDARD_FILTER.items():
+        parser.add_argument(f"--{name}", default=wert)
+    argumente = parser.parse_args()
+
+    start = time.perf_counter()
+    ziel, zeilen = erstelle_lieferdatensatz(
+        argumente.jahr,
+        extrakt_dir=argumente.extrakte,
+        ziel=argumente.ziel,
+        materialnummern=argumente.material,
+        trennzeichen=argumente.trennzeichen,
+        **{name: getattr(argumente, name) for name in STANDARD_FILTER},
+    )
+    print(f"{zeilen} Lieferungen nach {ziel} geschrieben ({time.perf_counter() - start:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Paralleler Abzug der Lieferdaten, aufgeteilt nach Werk und Materialnummernbereich.
+
+Jede Partition (Werk x Materialbereich) wird über eine Verbindung aus einem begrenzten Pool
+abgefragt und sofort als eigene Parquet-Datei geschrieben - der Speicherbedarf hängt von der
+Partitionsgröße ab, nicht vom gesamten Abzug. Fehlgeschlagene Partitionen werden mit
+wachsender Wartezeit wiederholt.
+
+Ergebnis: data/interim/sap_lieferungen/jahr=2024/werk=054/teil=000.parquet
+
+Aufruf aus dem Projektverzeichnis:
+    python reports/sap_parallel.py --jahr 2024 [--werke 054 055] [--bereiche 8] [--verbindungen 4]
+"""
+import argparse
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from sap_extrakt import DATENBANK_PFAD, PROJEKT_DIR, STANDARD_FILTER, lieferdaten
+
+ZIEL_DIR = os.path.join(PROJEKT_DIR, "data", "interim", "sap_lieferungen")
+VERSUCHE = 3
+WARTEZEIT_S = 1.0
+# Vorübergehende Fehler (gesperrte Datenbank, abgebrochene Verbindung); bei anderen Treibern ergänzen
+WIEDERHOLBARE_FEHLER = (sqlite3.OperationalError, sqlite3.InterfaceError)
+
+
+def verbinde_lesend(pfad=DATENBANK_PFAD):
+    """Nur-Lese-Verbindung, die von wechselnden Threads des Pools genutzt werden darf."""
+    return sqlite3.connect(f"file:{pfad}?mode=ro", uri=True, check_same_thread=False)
+
+
+class Verbindungspool:
+    """
+    Begrenzte Anzahl wiederverwendbarer Datenbankverbindungen (threadsicher).
+
+    Verbindungen werden erst bei Bedarf geöffnet. Eine Verbindung, bei deren Nutzung ein
+    Fehler auftritt, wird geschlossen statt zurückgegeben.
+
+    Args:
+        verbinde (callable): Öffnet eine neue DB-API-Verbindung.
+        groesse (int): Höchstzahl gleichzeitig geöffneter Verbindungen.
+    """
+
+    def __init__(self, verbinde, groesse):
+        self._verbinde = verbinde
+        self._frei = queue.LifoQueue()
+        self._plaetze = threading.BoundedSemaphore(groesse)
+
+    @contextmanager
+    def verbindung(self):
+        """Leiht eine Verbindung aus; wartet, solange alle Verbindungen belegt sind."""
+        with self._plaetze:
+            try:
+                verbindung = self._frei.get_nowait()
+            except queue.Empty:
+                verbindung = self._verbinde()
+            try:
+                yield verbindung
+            except Exception:
+                verbindung.close()
+                raise
+            self._frei.put(verbindung)
+
+    def schliesse(self):
+        """Schließt alle freien Verbindungen."""
+        while True:
+            try:
+                self._frei.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+@dataclass(frozen=True)
+class Partition:
+    """
+    Teil des Abzugs: ein Werk und ein Bereich von Materialnummern.
+
+    Attributes:
+        werk (str): Werk (EKPO.WERKS).
+        nummer (int): Laufende Nummer des Materialbereichs innerhalb des Werks.
+        von (str): Erste Materialnummer (None = offen).
+        bis (str): Erste Materialnummer des nächsten Bereichs, ausschließlich (None = offen).
+    """
+    werk: str
+    nummer: int
+    von: str = None
+    bis: str = None
+
+    def pfad(self, jahr_dir):
+        return os.path.join(jahr_dir, f"werk={self.werk}", f"teil={self.nummer:03d}.parquet")
+
+
+@dataclass
+class PartitionsErgebnis:
+    """
+    Ergebnis des Abzugs einer Partition.
+
+    Attributes:
+        partition (Partition): Abgefragte Partition.
+        zeilen (int): Anzahl Lieferungen.
+        dauer_s (float): Laufzeit inkl. Wiederholungen.
+        versuche (int): Anzahl Versuche.
+        fehler (str): Fehlermeldung des letzten Versuchs, falls alle Versuche scheiterten.
+    """
+    partition: Partition
+    zeilen: int = 0
+    dauer_s: float = 0.0
+    versuche: int = 0
+    fehler: str = None
+
+
+def werke(verbindung):
+    """Alle Werke mit Bestellpositionen."""
+    return [werk for (werk,) in verbindung.execute("SELECT DISTINCT WERKS FROM EKPO ORDER BY WERKS")]
+
+
+def partitionen(verbindung, werke, bereiche):
+    """
+    Teilt jedes Werk in bis zu `bereiche` Materialnummernbereiche mit etwa gleich vielen Positionen.
+
+    Der erste und letzte Bereich sind offen, damit zwischenzeitlich angelegte Materialien
+    nicht verloren gehen.
+
+    Args:
+        verbindung: DB-API-Verbindung mit der Tabelle EKPO.
+        werke (list): Werke.
+        bereiche (int): Gewünschte Anzahl Bereiche je Werk.
+
+    Returns:
+        list: Partitionen.
+    """
+    ergebnis = []
+    for werk in werke:
+        anzahl = pd.DataFrame(
+            verbindung.execute(
+                "SELECT MATNR, COUNT(*) FROM EKPO WHERE WERKS = ? GROUP BY MATNR ORDER BY MATNR", (werk,)
+            ).fetchall(),
+            columns=["MATNR", "Positionen"],
+        )
+        if anzahl.empty:
+            continue
+        # Schnitte an den Quantilen der kumulierten Positionen
+        kumuliert = anzahl["Positionen"].cumsum().to_numpy()
+        ziele = kumuliert[-1] * np.arange(1, bereiche) / bereiche
+        schnitte = np.unique(np.searchsorted(kumuliert, ziele, side="right"))
+        schnitte = schnitte[(schnitte > 0) & (schnitte < len(anzahl))]
+        grenzen = [None, *anzahl["MATNR"].iloc[schnitte], None]
+        ergebnis += [Partition(werk, nummer, von, bis) for nummer, (von, bis) in enumerate(zip(grenzen, grenzen[1:]))]
+    return ergebnis
+
+
+def extrahiere_partition(pool, partition, jahr, jahr_dir, versuche=VERSUCHE, **filter):
+    """
+    Fragt eine Partition ab und schreibt sie als Parquet-Datei.
+
+    Args:
+        pool (Verbindungspool): Verbindungen zur Datenbank.
+        partition (Partition): Werk und Materialbereich.
+        jahr (int): Jahr des Soll-Lieferdatums.
+        jahr_dir (str): Verzeichnis des Jahres im Ergebnis.
+        versuche (int): Höchstzahl Versuche bei vorübergehenden Fehlern.
+        **filter: Abweichungen von STANDARD_FILTER (außer werk).
+
+    Returns:
+        PartitionsErgebnis: Zeilen, Laufzeit und Versuche.
+    """
+    ergebnis = PartitionsErgebnis(partition)
+    start = time.perf_counter()
+    while True:
+        ergebnis.versuche += 1
+        try:
+            with pool.verbindung() as verbindung:
+                df = lieferdaten(
+                    verbindung, jahr, materialbereich=(partition.von, partition.bis), **{**filter, "werk": partition.werk}
+                )
+            break
+        except WIEDERHOLBARE_FEHLER as fehler:
+            if ergebnis.versuche >= versuche:
+                ergebnis.fehler = str(fehler)
+                ergebnis.dauer_s = time.perf_counter() - start
+                return ergebnis
+            time.sleep(WARTEZEIT_S * 2 ** (ergebnis.versuche - 1))
+
+    if not df.empty:
+        ziel = partition.pfad(jahr_dir)
+        os.makedirs(os.path.dirname(ziel), exist_ok=True)
+        df.to_parquet(ziel, index=False)
+    ergebnis.zeilen = len(df)
+    ergebnis.dauer_s = time.perf_counter() - start
+    return ergebnis
+
+
+def extrahiere(jahr, verbinde=verbinde_lesend, werke_auswahl=None, bereiche=8, verbindungen=4,
+               basis_dir=ZIEL_DIR, versuche=VERSUCHE, fortschritt=None, **filter):
+    """
+    Zieht die Lieferdaten eines Jahres parallel über alle Partitionen.
+
+    Die Dateien entstehen zunächst in einem versteckten Verzeichnis und ersetzen das Jahr
+    erst, wenn alle Partitionen erfolgreich waren - Leser sehen nie einen halben Abzug.
+    Auch nicht wiederholbare Fehler einer Partition werden in deren Ergebnis vermerkt.
+
+    Args:
+        jahr (int): Jahr des Soll-Lieferdatums.
+        verbinde (callable): Öffnet eine Verbindung zur Datenbank (Standard: lokale SQLite-Datenbank).
+        werke_auswahl (list): Werke (None = alle Werke aus EKPO).
+        bereiche (int): Materialbereiche je Werk.
+        verbindungen (int): Größe des Verbindungspools und Anzahl paralleler Abfragen.
+        basis_dir (str): Wurzelverzeichnis des Ergebnisses.
+        versuche (int): Höchstzahl Versuche je Partition.
+        fortschritt (callable): Wird mit jedem PartitionsErgebnis aufgerufen, sobald es vorliegt.
+        **filter: Abweichungen von STANDARD_FILTER (außer werk).
+
+    Returns:
+        list: PartitionsErgebnis je Partition.
+    """
+    pool = Verbindungspool(verbinde, verbindungen)
+    temp_dir = os.path.join(basis_dir, f".jahr={jahr}.tmp")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    try:
+        with pool.verbindung() as verbindung:
+            teile = partitionen(verbindung, werke_auswahl or werke(verbindung), bereiche)
+
+        ergebnisse = []
+        with ThreadPoolExecutor(max_workers=verbindungen) as ausfuehrung:
+            laufend = {
+                ausfuehrung.submit(extrahiere_partition, pool, teil, jahr, temp_dir, versuche, **filter): teil
+                for teil in teile
+            }
+            for future in as_completed(laufend):
+                try:
+                    ergebnisse.append(future.result())
+                except Exception as fehler:
+                    # Nicht wiederholbarer Fehler: Partition gilt als gescheitert, der Abzug wird verworfen
+                    ergebnisse.append(PartitionsErgebnis(laufend[future], fehler=f"{type(fehler).__name__}: {fehler}"))
+                if fortschritt:
+                    fortschritt(ergebnisse[-1])
+    finally:
+        pool.schliesse()
+
+    if any(ergebnis.fehler for ergebnis in ergebnisse):
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    else:
+        # Jahr in einem Schritt ersetzen (Partitionen eines früheren Abzugs können wegfallen)
+        ziel_dir = os.path.join(basis_dir, f"jahr={jahr}")
+        alt_dir = os.path.join(basis_dir, f".jahr={jahr}.alt")
+        # Rest eines abgebrochenen Laufs, sonst schlägt das Umbenennen fehl
+        shutil.rmtree(alt_dir, ignore_errors=True)
+        if os.path.isdir(ziel_dir):
+            os.replace(ziel_dir, alt_dir)
+        os.makedirs(temp_dir, exist_ok=True)
+        os.replace(temp_dir, ziel_dir)
+        shutil.rmtree(alt_dir, ignore_errors=True)
+    return sorted(ergebnisse, key=lambda ergebnis: (ergebnis.partition.werk, ergebnis.partition.nummer))
+
+
+def lese_lieferungen(jahr, werke_auswahl=None, spalten=None, basis_dir=ZIEL_DIR):
+    """
+    Liest den partitionierten Abzug eines Jahres; nicht benötigte Werke werden nicht gelesen.
+
+    Args:
+        jahr (int): Jahr des Soll-Lieferdatums.
+        werke_auswahl (list): Werke (None = alle).
+        spalten (list): Zu lesende Spalten (None = alle).
+        basis_dir (str): Wurzelverzeichnis des Abzugs.
+
+    Returns:
+        pd.DataFrame: Lieferungen mit zusätzlicher Spalte "Werk".
+    """
+    jahr_dir = os.path.join(basis_dir, f"jahr={jahr}")
+    teile = []
+    if os.path.isdir(jahr_dir):
+        for werk_dir in sorted(os.scandir(jahr_dir), key=lambda eintrag: eintrag.name):
+            werk = werk_dir.name.split("=", 1)[1]
+            if werke_auswahl is not None and werk not in werke_auswahl:
+                continue
+            for datei in sorted(os.listdir(werk_dir.path)):
+                teile.append(pd.read_parquet(os.path.join(werk_dir.path, datei), columns=spalten).assign(Werk=werk))
+    if not teile:
+        return pd.DataFrame(columns=spalten)
+    return pd.concat(teile, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lieferdaten parallel je Werk und Materialbereich abziehen")
+    parser.add_argument("--jahr", type=int, required=True, help="Jahr des Soll-Lieferdatums")
+    parser.add_argument("--datenbank", default=DATENBANK_PFAD, help="SQLite-Datenbank mit den SAP-Tabellen")
+    parser.add_argument("--werke", nargs="*", default=None, help="Werke (Standard: alle)")
+    parser.add_argument("--bereiche", type=int, default=8, help="Materialbereiche je Werk")
+    parser.add_argument("--verbindungen", type=int, default=4, help="Parallele Verbindungen")
+    parser.add_argument("--versuche", type=int, default=VERSUCHE, help="Versuche je Partition")
+    parser.add_argument("--ziel", default=ZIEL_DIR, help="Zielverzeichnis")
+    for name, wert in STANDARD_FILTER.items():
+        if name != "werk":
+            parser.add_argument(f"--{name}", default=wert)
+    argumente = parser.parse_args()
+
+    def fortschritt(ergebnis):
+        teil = ergebnis.partition
+        status = f"Fehler: {ergebnis.fehler}" if ergebnis.fehler else f"{ergebnis.zeilen} Zeilen"
+        print(f"Werk {teil.werk} Teil {teil.nummer:03d} [{teil.von or ''} .. {teil.bis or ''}): "
+              f"{status}, {ergebnis.dauer_s:.2f} s, {ergebnis.versuche} Versuch(e)")
+
+    start = time.perf_counter()
+    ergebnisse = extrahiere(
+        argumente.jahr,
+        verbinde=partial(verbinde_lesend, argumente.datenbank),
+        werke_auswahl=argumente.werke,
+        bereiche=argumente.bereiche,
+        verbindungen=argumente.verbindungen,
+        basis_dir=argumente.ziel,
+        versuche=argumente.versuche,
+        fortschritt=fortschritt,
+        **{name: getattr(argumente, name) for name in STANDARD_FILTER if name != "werk"},
+    )
+    print(f"{sum(ergebnis.zeilen for ergebnis in ergebnisse)} Lieferungen in {len(ergebnisse)} Partitionen, "
+          f"Dauer: {time.perf_counter() - start:.2f} s")
+    if any(ergebnis.fehler for ergebnis in ergebnisse):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import dataclasses
+
+import numpy as np
+import pandas as pd
+
+# Dimensionen mit wenigen Ausprägungen - als Kategorien gespeichert (ein Code je Zeile statt eines Strings)
+KATEGORIE_SPALTEN = [
+    "Land",
+    "Lieferantennummer",
+    "Lieferantenbezeichnung",
+    "Materialnummer",
+    "Materialbezeichnung",
+    "Datenqualität",
+]
+# Nahezu eindeutige Schlüssel - Arrow-Strings statt Python-Objekten
+TEXT_SPALTEN = ["Lieferscheinnummer"]
+GANZZAHL_SPALTEN = ["Soll-Menge", "WE-Menge", "Verspätung (Tage)", "Mengenabweichung"]
+LIEFERTREUE_SPALTE = "Liefertreue (Ja/Nein)"
+LIEFERTREU_SPALTE = "Liefertreu"
+
+
+def wende_schema_an(df):
+    """
+    Bringt die bereinigten Lieferdaten in ein kompaktes, typisiertes Schema.
+
+    Dimensionen werden zu Kategorien, der Lieferschein zu einem Arrow-String und die
+    Mengen auf den kleinsten passenden Ganzzahltyp reduziert. Zusätzlich entsteht die
+    boolesche Spalte "Liefertreu"; "Liefertreue (Ja/Nein)" bleibt als Kategorie für
+    Beschriftungen erhalten.
+
+    Args:
+        df (pd.DataFrame): Bereinigte Lieferdaten (z. B. aus lese_datensatz()).
+
+    Returns:
+        pd.DataFrame: Typisierte Kopie.
+    """
+    df = df.copy()
+    for spalte in KATEGORIE_SPALTEN:
+        if spalte in df:
+            df[spalte] = df[spalte].astype("category")
+    for spalte in TEXT_SPALTEN:
+        if spalte in df:
+            df[spalte] = df[spalte].astype("string[pyarrow]")
+    for spalte in GANZZAHL_SPALTEN:
+        # Nur ohne fehlende Werte verkleinern, sonst bliebe float
+        if spalte in df and not df[spalte].isnull().any():
+            df[spalte] = pd.to_numeric(df[spalte], downcast="integer")
+    if LIEFERTREUE_SPALTE in df:
+        df[LIEFERTREU_SPALTE] = (df[LIEFERTREUE_SPALTE] == "Ja").astype(bool)
+        df[LIEFERTREUE_SPALTE] = pd.Categorical(df[LIEFERTREUE_SPALTE], categories=["Ja", "Nein"])
+    return df
+
+
+def speicherbedarf(objekt):
+    """
+    Schätzt den Speicherbedarf eines Objekts in Bytes (inkl. Inhalt von Strings).
+
+    Args:
+        objekt: DataFrame, Series, Array, Dataclass, dict, list oder tuple.
+
+    Returns:
+        int: Speicherbedarf in Bytes (andere Objekte zählen mit 0).
+    """
+    if isinstance(objekt, pd.DataFrame):
+        return int(objekt.memory_usage(index=True, deep=True).sum())
+    if isinstance(objekt, (pd.Series, pd.Index)):
+        return int(objekt.memory_usage(deep=True))
+    if isinstance(objekt, np.ndarray):
+        return int(objekt.nbytes)
+    if dataclasses.is_dataclass(objekt) and not isinstance(objekt, type):
+        return sum(speicherbedarf(getattr(objekt, feld.name)) for feld in dataclasses.fields(objekt))
+    if isinstance(objekt, dict):
+        return sum(speicherbedarf(wert) for wert in objekt.values())
+    if isinstance(objekt, (list, tuple)):
+        return sum(speicherbedarf(wert) for wert in objekt)
+    return 0
+
+
+def formatiere_bytes(anzahl):
+    """Gibt eine Byte-Anzahl lesbar aus, z. B. "12.3 MB"."""
+    for einheit in ["B", "KB", "MB"]:
+        if anzahl < 1024:
+            return f"{anzahl:.1f} {einheit}"
+        anzahl /= 1024
+    return f"{anzahl:.1f} GB"
@@ -0,0 +1,122 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+# Stammdaten aus LFA1 (Lieferant) und MAKT (Material), die in jeder Lieferzeile wiederholt werden
+LIEFERANT_ID = "Lieferant-ID"
+MATERIAL_ID = "Material-ID"
+LIEFERANT_SPALTEN = ["Lieferantennummer", "Lieferantenbezeichnung", "Land"]
+MATERIAL_SPALTEN = ["Materialnummer", "Materialbezeichnung"]
+
+
+@dataclass
+class Sternschema:
+    """
+    Lieferungen als kompakte Faktentabelle mit Integer-Schlüsseln und kleinen Dimensionstabellen.
+
+    Attributes:
+        fakten (pd.DataFrame): Lieferungen mit "Lieferant-ID" und "Material-ID" statt Stammdaten.
+        lieferanten (pd.DataFrame): Lieferantennummer, -bezeichnung und Land; Index = Lieferant-ID.
+        materialien (pd.DataFrame): Materialnummer und -bezeichnung; Index = Material-ID.
+        spalten (list): Spaltenreihenfolge der ursprünglichen (breiten) Tabelle.
+    """
+    fakten: pd.DataFrame
+    lieferanten: pd.DataFrame
+    materialien: pd.DataFrame
+    spalten: list
+
+    def ids(self, dimension, spalte, werte):
+        """
+        Schlüssel aller Dimensionszeilen, deren Spalte einen der Werte enthält.
+
+        Args:
+            dimension (str): "lieferanten" oder "materialien".
+            spalte (str): Spalte der Dimensionstabelle, z. B. "Land".
+            werte (list): Gesuchte Werte.
+
+        Returns:
+            pd.Index: Passende IDs (für ein isin() auf der Faktentabelle).
+        """
+        tabelle = getattr(self, dimension)
+        return tabelle.index[tabelle[spalte].isin(werte)]
+
+    def mit_namen(self, df):
+        """
+        Ergänzt die Stammdaten zu den Schlüsseln - nur für Anzeige und kleine Ergebnisse gedacht.
+
+        Args:
+            df (pd.DataFrame): Fakten oder Aggregat mit "Lieferant-ID" und/oder "Material-ID".
+
+        Returns:
+            pd.DataFrame: Kopie ohne ID-Spalten, mit Stammdaten in der ursprünglichen Spaltenreihenfolge.
+        """
+        teile = {}
+        for schluessel, dimension in ((LIEFERANT_ID, self.lieferanten), (MATERIAL_ID, self.materialien)):
+            if schluessel in df:
+                # Die IDs sind Positionen in der Dimensionstabelle - Zugriff ohne Join über take
+                stammdaten = dimension.take(df[schluessel].to_numpy())
+                stammdaten.index = df.index
+                teile.update({spalte: stammdaten[spalte] for spalte in dimension.columns})
+        teile.update({spalte: df[spalte] for spalte in df.columns if spalte not in (LIEFERANT_ID, MATERIAL_ID)})
+
+        reihenfolge = [spalte for spalte in self.spalten if spalte in teile]
+        reihenfolge += [spalte for spalte in teile if spalte not in reihenfolge]
+        return pd.DataFrame({spalte: teile[spalte] for spalte in reihenfolge}, index=df.index)
+
+    def breit(self, df=None):
+        """Fakten (Standard: alle) in der ursprünglichen breiten Form, z. B. für Export und Tabellen."""
+        return self.mit_namen(self.fakten if df is None else df)
+
+    def summiere(self, df, nach, werte):
+        """
+        Summiert Kennzahlen je Stammdaten- und/oder Faktenspalte.
+
+        Zuerst wird über die Integer-Schlüssel verdichtet, die Namen werden nur an das kleine
+        Zwischenergebnis angefügt und abschließend zusammengefasst.
+
+        Args:
+            df (pd.DataFrame): Faktentabelle (gefiltert).
+            nach (list): Gruppierungsspalten, z. B. ["Lieferantenbezeichnung"] oder ["Monat", "Land"].
+            werte (list): Zu summierende Faktenspalten.
+
+        Returns:
+            pd.DataFrame: Eine Zeile je Gruppe, nach den Gruppierungsspalten sortiert.
+        """
+        schluessel = []
+        if any(spalte in LIEFERANT_SPALTEN for spalte in nach):
+            schluessel.append(LIEFERANT_ID)
+        if any(spalte in MATERIAL_SPALTEN for spalte in nach):
+            schluessel.append(MATERIAL_ID)
+        schluessel += [spalte for spalte in nach if spalte not in LIEFERANT_SPALTEN + MATERIAL_SPALTEN]
+
+        verdichtet = df.groupby(schluessel, observed=True)[werte].sum().reset_index()
+        return self.mit_namen(verdichtet).groupby(nach, observed=True)[werte].sum().reset_index()
+
+
+def _dimension(df, spalten, name):
+    codes, werte = pd.MultiIndex.from_frame(df[spalten]).factorize(sort=True)
+    tabelle = werte.to_frame(index=False, name=spalten)
+    tabelle.index.name = name
+    return pd.to_numeric(pd.Series(codes, index=df.index), downcast="integer"), tabelle
+
+
+def erstelle_sternschema(df):
+    """
+    Zerlegt die bereinigten Lieferungen in Faktentabelle und Dimensionen.
+
+    Ein Lieferant ist die Kombination aus Nummer, Bezeichnung und Land (einzelne Lieferanten
+    liefern aus mehreren Ländern), ein Material die Kombination aus Nummer und Bezeichnung.
+
+    Args:
+        df (pd.DataFrame): Bereinigte Lieferungen (z. B. nach wende_schema_an()).
+
+    Returns:
+        Sternschema: Fakten und Dimensionen.
+    """
+    lieferant_ids, lieferanten = _dimension(df, LIEFERANT_SPALTEN, LIEFERANT_ID)
+    material_ids, materialien = _dimension(df, MATERIAL_SPALTEN, MATERIAL_ID)
+
+    fakten = df.drop(columns=LIEFERANT_SPALTEN + MATERIAL_SPALTEN)
+    fakten.insert(0, MATERIAL_ID, material_ids)
+    fakten.insert(0, LIEFERANT_ID, lieferant_ids)
+    return Sternschema(fakten=fakten, lieferanten=lieferanten, materialien=materialien, spalten=list(df.columns))
@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Einstellbereich der Toleranzen; Werte außerhalb werden im Histogramm am Rand zusammengefasst
+MAX_TAGE = 30
+MAX_PROZENT = 20
+
+
+@dataclass(frozen=True)
+class Toleranz:
+    """
+    Toleranzfenster für OTD und OTIF.
+
+    Attributes:
+        frueh (int): Erlaubte Tage zu früh (None = beliebig früh).
+        spaet (int): Erlaubte Tage zu spät.
+        menge_prozent (int): Erlaubte Mengenabweichung in Prozent der Soll-Menge.
+    """
+    frueh: int = None
+    spaet: int = 0
+    menge_prozent: int = 0
+
+
+def abweichung_prozent(soll_menge, mengenabweichung):
+    """
+    Betrag der Mengenabweichung in ganzen Prozent der Soll-Menge (aufgerundet).
+
+    Aufgerundet, damit "Abweichung <= Toleranz" für ganzzahlige Toleranzen exakt bleibt.
+    Abweichungen bei einer Soll-Menge von 0 zählen als unendlich.
+    """
+    soll = np.asarray(soll_menge, dtype="float64")
+    abweichung = np.abs(np.asarray(mengenabweichung, dtype="float64"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prozent = np.where(abweichung == 0, 0.0, np.ceil(abweichung * 100 / soll))
+    return np.where(np.isnan(prozent) | (soll <= 0) & (abweichung > 0), np.inf, prozent)
+
+
+def ist_puenktlich(verspaetung, toleranz):
+    """Lieferung innerhalb des Toleranzfensters (fehlende Verspätung = nicht pünktlich)."""
+    maske = verspaetung <= toleranz.spaet
+    if toleranz.frueh is not None:
+        maske &= verspaetung >= -toleranz.frueh
+    return maske.fillna(False).astype(bool) if isinstance(maske, pd.Series) else maske
+
+
+@dataclass
+class Toleranzhistogramm:
+    """
+    Anzahl Lieferungen und Soll-Menge je Schlüssel, Verspätung und Mengenabweichung.
+
+    OTD und OTIF für beliebige Toleranzen werden aus den (nicht leeren) Zellen berechnet,
+    ohne die Lieferungen erneut zu lesen - der Aufwand hängt von der Anzahl Zellen ab,
+    nicht von der Anzahl Lieferungen. Die Soll-Menge ist je Zelle vorsummiert, die
+    mengengewichteten Raten kosten daher nicht mehr als die gezählten.
+
+    Attributes:
+        schluessel (pd.DataFrame): Ausprägungen der Dimensionen, z. B. Lieferant-ID und Monat.
+        zelle_schluessel (np.ndarray): Zeile in schluessel je Zelle.
+        verspaetung (np.ndarray): Verspätung je Zelle, begrenzt auf ±(MAX_TAGE + 1).
+        abweichung (np.ndarray): Mengenabweichung in % je Zelle, begrenzt auf MAX_PROZENT + 1.
+        anzahl (np.ndarray): Lieferungen je Zelle.
+        menge (np.ndarray): Summe der Soll-Menge je Zelle.
+    """
+    schluessel: pd.DataFrame
+    zelle_schluessel: np.ndarray
+    verspaetung: np.ndarray
+    abweichung: np.ndarray
+    anzahl: np.ndarray
+    menge: np.ndarray
+
+    def kennzahlen(self, toleranz, auswahl=None):
+        """
+        Lieferungen und Soll-Menge, jeweils gesamt, pünktlich sowie pünktlich und vollständig, je Schlüssel.
+
+        Args:
+            toleranz (Toleranz): Toleranzfenster.
+            auswahl (np.ndarray): Optional boolesche Maske über die Zeilen von schluessel.
+
+        Returns:
+            pd.DataFrame: Spalten "Lieferungen", "Pünktlich", "Pünktlich und vollständig" sowie
+            "Menge", "Menge pünktlich", "Menge pünktlich und vollständig"; Index wie schluessel.
+        """
+        anzahl, menge = self.anzahl, self.menge
+        if auswahl is not None:
+            ausgewaehlt = np.asarray(auswahl)[self.zelle_schluessel]
+            anzahl, menge = np.where(ausgewaehlt, anzahl, 0), np.where(ausgewaehlt, menge, 0)
+        puenktlich = ist_puenktlich(self.verspaetung, toleranz)
+        vollstaendig = puenktlich & (self.abweichung <= toleranz.menge_prozent)
+
+        def summe(gewicht):
+            return np.bincount(self.zelle_schluessel, gewicht, len(self.schluessel))
+
+        return pd.DataFrame({
+            "Lieferungen": summe(anzahl),
+            "Pünktlich": summe(anzahl * puenktlich),
+            "Pünktlich und vollständig": summe(anzahl * vollstaendig),
+            "Menge": summe(menge),
+            "Menge pünktlich": summe(menge * puenktlich),
+            "Menge pünktlich und vollständig": summe(menge * vollstaendig),
+        }, index=self.schluessel.index).astype("int64")
+
+    def raten(self, toleranz, auswahl=None, gewichtet=False):
+        """
+        OTD- und OTIF-Rate in Prozent.
+
+        Args:
+            toleranz (Toleranz): Toleranzfenster.
+            auswahl (np.ndarray): Optional boolesche Maske über die Zeilen von schluessel.
+            gewichtet (bool): Nach Soll-Menge statt nach Anzahl Lieferungen gewichten.
+
+        Returns:
+            tuple: (OTD-Rate, OTIF-Rate); NaN, wenn keine Lieferungen ausgewählt sind.
+        """
+        summe = self.kennzahlen(toleranz, auswahl).sum()
+        gesamt, puenktlich, vollstaendig = (
+            ["Menge", "Menge pünktlich", "Menge pünktlich und vollständig"] if gewichtet
+            else ["Lieferungen", "Pünktlich", "Pünktlich und vollständig"]
+        )
+        if summe[gesamt] == 0:
+            return np.nan, np.nan
+        return summe[puenktlich] / summe[gesamt] * 100, summe[vollstaendig] / summe[gesamt] * 100
+
+
+def erstelle_histogramm(fakten, verspaetung_spalte="Verspätung (Tage)", dimensionen=("Lieferant-ID", "Monat")):
+    """
+    Verdichtet die Lieferungen zu einem Toleranzhistogramm (Anzahl und Soll-Menge je Zelle).
+
+    Args:
+        fakten (pd.DataFrame): Lieferungen mit Verspätung, "Soll-Menge" und "Mengenabweichung".
+        verspaetung_spalte (str): Spalte mit der Verspätung (Kalender- oder Arbeitstage).
+        dimensionen (tuple): Schlüsselspalten; "Monat" wird aus dem Soll-Lieferdatum abgeleitet.
+
+    Returns:
+        Toleranzhistogramm: Zellen je Schlüssel, Verspätung und Mengenabweichung.
+    """
+    spalten = {}
+    for dimension in dimensionen:
+        if dimension == "Monat" and "Monat" not in fakten:
+            spalten[dimension] = pd.to_datetime(fakten["Lieferdatum (Soll)"]).dt.month.to_numpy()
+        else:
+            spalten[dimension] = fakten[dimension].to_numpy()
+
+    # Verspätungen außerhalb des Einstellbereichs am Rand sammeln, fehlende gelten als verspätet
+    verspaetung = pd.to_numeric(fakten[verspaetung_spalte]).fillna(MAX_TAGE + 1)
+    spalten["_verspaetung"] = verspaetung.clip(-MAX_TAGE - 1, MAX_TAGE + 1).to_numpy().astype("int16")
+    prozent = abweichung_prozent(fakten["Soll-Menge"], fakten["Mengenabweichung"])
+    spalten["_abweichung"] = np.minimum(prozent, MAX_PROZENT + 1).astype("int16")
+
+    gruppen = pd.DataFrame({**spalten, "_menge": fakten["Soll-Menge"].to_numpy()}).groupby(list(spalten), sort=True)
+    zellen = gruppen["_menge"].agg(["size", "sum"]).reset_index()
+    schluessel_codes = zellen.groupby(list(dimensionen), sort=True).ngroup().to_numpy()
+    schluessel = zellen[list(dimensionen)].drop_duplicates().reset_index(drop=True)
+    return Toleranzhistogramm(
+        schluessel=schluessel,
+        zelle_schluessel=schluessel_codes,
+        verspaetung=zellen["_verspaetung"].to_numpy(),
+        abweichung=zellen["_abweichung"].to_numpy(),
+        anzahl=zellen["size"].to_numpy().astype("int64"),
+        menge=zellen["sum"].to_numpy().astype("int64"),
+    )
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from datenimport import INTERIM_DIR
+
+# Nutzungshäufigkeit der Filterauswahlen (Kennung -> URL-Parameter und Anzahl)
+NUTZUNG_PFAD = os.path.join(INTERIM_DIR, "filterzustaende.json")
+# Anzahl der häufigsten Filterauswahlen, die zusätzlich zur Standardansicht vorberechnet werden
+ANZAHL_HAEUFIGSTE = 5
+# Höchstzahl gespeicherter Filterauswahlen (seltene werden verworfen)
+MAX_EINTRAEGE = 200
+
+_sperre = threading.Lock()
+
+
+@dataclass
+class Vorwaermbericht:
+    """
+    Ergebnis des Vorwärmens für einen Datenstand.
+
+    Attributes:
+        kennung (str): Kennung des Datenstands.
+        schritte (list): (Ansicht, Dauer in Sekunden) je vorberechneter Ansicht.
+        fehler (list): (Ansicht, Fehlermeldung) je fehlgeschlagener Ansicht.
+    """
+    kennung: str
+    schritte: list = field(default_factory=list)
+    fehler: list = field(default_factory=list)
+
+    @property
+    def dauer(self):
+        """Gesamtdauer in Sekunden."""
+        return sum(dauer for _, dauer in self.schritte)
+
+
+def lade_nutzung(pfad=NUTZUNG_PFAD):
+    """
+    Lädt die gezählten Filterauswahlen.
+
+    Returns:
+        dict: Kennung -> {"parameter": URL-Parameter, "anzahl": Anzahl Aufrufe}.
+    """
+    if not os.path.exists(pfad):
+        return {}
+    with open(pfad, encoding="utf-8") as datei:
+        return json.load(datei)
+
+
+def zaehle_nutzung(zustand, pfad=NUTZUNG_PFAD):
+    """
+    Zählt einen Aufruf der Filterauswahl (threadsicher, atomar gespeichert).
+
+    Args:
+        zustand (Filterzustand): Gewählte Filter.
+    """
+    with _sperre:
+        nutzung = lade_nutzung(pfad)
+        eintrag = nutzung.setdefault(zustand.kennung, {"parameter": zustand.als_query_params(), "anzahl": 0})
+        eintrag["anzahl"] += 1
+        if len(nutzung) > MAX_EINTRAEGE:
+            nutzung = dict(sorted(nutzung.items(), key=lambda e: e[1]["anzahl"], reverse=True)[:MAX_EINTRAEGE])
+        os.makedirs(os.path.dirname(pfad), exist_ok=True)
+        # Erst in eine temporäre Datei schreiben, dann ersetzen - Leser sehen nie eine halbe Datei
+        temp_pfad = f"{pfad}.tmp"
+        with open(temp_pfad, "w", encoding="utf-8") as datei:
+            json.dump(nutzung, datei, ensure_ascii=False)
+        os.replace(temp_pfad, pfad)
+
+
+def haeufigste_zustaende(anzahl=ANZAHL_HAEUFIGSTE, pfad=NUTZUNG_PFAD):
+    """
+    Die am häufigsten genutzten Filterauswahlen.
+
+    Returns:
+        list: URL-Parameter (siehe Filterzustand.als_query_params()), häufigste zuerst.
+    """
+    nutzung = sorted(lade_nutzung(pfad).values(), key=lambda eintrag: eintrag["anzahl"], reverse=True)
+    return [eintrag["parameter"] for eintrag in nutzung[:anzahl]]
+
+
+def waerme_vor(kennung, ansichten, berechne):
+    """
+    Berechnet die Ansichten nacheinander vor und protokolliert die Dauer je Ansicht.
+
+    Fehler einzelner Ansichten werden protokolliert und brechen das Vorwärmen nicht ab.
+
+    Args:
+        kennung (str): Kennung des Datenstands.
+        ansichten (list): (Bezeichnung, URL-Parameter) je Ansicht.
+        berechne (callable): Berechnet eine Ansicht aus ihren URL-Parametern (füllt die Caches).
+
+    Returns:
+        Vorwaermbericht: Dauer je Ansicht und Fehler.
+    """
+    bericht = Vorwaermbericht(kennung=kennung)
+    for bezeichnung, parameter in ansichten:
+        start = time.perf_counter()
+        try:
+            berechne(parameter)
+        except Exception as fehler:
+            bericht.fehler.append((bezeichnung, str(fehler)))
+            continue
+        bericht.schritte.append((bezeichnung, time.perf_counter() - start))
+    return bericht
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Höchstzahl der Punkte je Zeitreihe im Diagramm
+MAX_PUNKTE = 400
+# Zeitauflösungen von fein nach grob (Name, Resample-Regel)
+AUFLOESUNGEN = [("Tag", None), ("Woche", "W-MON"), ("Monat", "MS")]
+
+
+def zaehle_je_tag(datum, kategorie):
+    """
+    Tägliche Anzahl je Kategorie in einem Durchlauf (bincount über Tag und Kategoriecode).
+
+    Args:
+        datum (pd.Series): Datum je Zeile.
+        kategorie (pd.Series): Kategoriale Spalte (z. B. "Liefertreue (Ja/Nein)").
+
+    Returns:
+        pd.DataFrame: Lückenloser Tagesindex vom ersten bis zum letzten Datum, eine Spalte je Kategorie.
+    """
+    kategorie = kategorie.astype("category")
+    tage = pd.to_datetime(datum).to_numpy().astype("datetime64[D]").astype("int64")
+    codes = kategorie.cat.codes.to_numpy().astype("int64")
+    gueltig = (codes >= 0) & (tage != np.iinfo("int64").min)
+    tage, codes = tage[gueltig], codes[gueltig]
+    kategorien = kategorie.cat.categories
+    if len(tage) == 0:
+        return pd.DataFrame(columns=kategorien, index=pd.DatetimeIndex([]), dtype="int64")
+
+    erster, anzahl_tage = tage.min(), tage.max() - tage.min() + 1
+    zaehler = np.bincount((tage - erster) * len(kategorien) + codes, minlength=anzahl_tage * len(kategorien))
+    index = pd.date_range(np.datetime64(int(erster), "D"), periods=anzahl_tage, freq="D")
+    return pd.DataFrame(zaehler.reshape(anzahl_tage, len(kategorien)), index=index, columns=kategorien)
+
+
+def lttb(x, y, punkte):
+    """
+    Largest-Triangle-Three-Buckets: wählt `punkte` Indizes, die die Form der Reihe erhalten.
+
+    Erster und letzter Punkt bleiben erhalten; aus jedem der übrigen Buckets wird der Punkt gewählt,
+    der mit dem zuvor gewählten Punkt und dem Mittel des nächsten Buckets das größte Dreieck bildet.
+
+    Args:
+        x (np.ndarray): Aufsteigende x-Werte.
+        y (np.ndarray): y-Werte.
+        punkte (int): Anzahl gewählter Punkte (mindestens 3).
+
+    Returns:
+        np.ndarray: Aufsteigende Indizes der gewählten Punkte.
+    """
+    x, y = np.asarray(x, dtype="float64"), np.asarray(y, dtype="float64")
+    if punkte >= len(x):
+        return np.arange(len(x))
+
+    grenzen = np.linspace(1, len(x) - 1, punkte - 1).astype("int64")
+    gewaehlt = [0]
+    for i in range(punkte - 2):
+        anfang, ende = grenzen[i], grenzen[i + 1]
+        if i + 2 < len(grenzen):
+            naechster = slice(grenzen[i + 1], grenzen[i + 2])
+            mittel_x, mittel_y = x[naechster].mean(), y[naechster].mean()
+        else:
+            mittel_x, mittel_y = x[-1], y[-1]
+        a = gewaehlt[-1]
+        flaeche = np.abs(
+            (x[a] - mittel_x) * (y[anfang:ende] - y[a]) - (x[a] - x[anfang:ende]) * (mittel_y - y[a])
+        )
+        gewaehlt.append(anfang + int(np.argmax(flaeche)))
+    gewaehlt.append(len(x) - 1)
+    return np.array(gewaehlt)
+
+
+def verdichte(tageswerte, max_punkte=MAX_PUNKTE):
+    """
+    Wählt die feinste Zeitauflösung mit höchstens max_punkte belegten Zeitpunkten.
+
+    Tage, Wochen und Monate werden aus der Tagesreihe summiert. Reicht auch die monatliche
+    Auflösung nicht, wird sie mit LTTB (auf der Summe aller Spalten) auf max_punkte ausgedünnt.
+
+    Args:
+        tageswerte (pd.DataFrame): Ergebnis von zaehle_je_tag().
+        max_punkte (int): Höchstzahl der Zeitpunkte.
+
+    Returns:
+        tuple: (verdichtete Werte ohne leere Zeitpunkte, Name der Auflösung)
+    """
+    for name, regel in AUFLOESUNGEN:
+        werte = tageswerte if regel is None else tageswerte.resample(regel, label="left", closed="left").sum()
+        werte = werte[werte.sum(axis=1) > 0]
+        if len(werte) <= max_punkte:
+            return werte, name
+
+    gesamt = werte.sum(axis=1).to_numpy()
+    return werte.iloc[lttb(np.arange(len(werte)), gesamt, max_punkte)], name
@@ -0,0 +1,75 @@
+"""
+Gemeinsame Fixtures: SQLite-Nachbildung des SAP-Quellsystems für sap_extrakt.py, sap_delta.py
+und sap_parallel.py (alle Felder als Text wie in den Abzügen, leere Felder als '').
+"""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports"))
+
+from sap_extrakt import TABELLEN  # noqa: E402
+
+# Das Quellsystem führt in EKKO/EKPO zusätzlich das Änderungsdatum (Wasserzeichen in sap_delta.py)
+QUELL_SPALTEN = {**TABELLEN, "EKKO": [*TABELLEN["EKKO"], "AEDAT"], "EKPO": [*TABELLEN["EKPO"], "AEDAT"]}
+MANDANT = "100"
+
+
+def fuege_ein(verbindung, tabelle, **werte):
+    """Fügt eine Zeile ein; nicht angegebene Spalten bleiben leer ('')."""
+    spalten = QUELL_SPALTEN[tabelle]
+    verbindung.execute(
+        f'INSERT INTO "{tabelle}" VALUES ({", ".join("?" * len(spalten))})',
+        [werte.get(spalte, MANDANT if spalte == "MANDT" else "") for spalte in spalten],
+    )
+
+
+def lege_bestellung_an(verbindung, ebeln, aedat, positionen, lieferscheine=(), lifnr="L1", werk="054"):
+    """
+    Legt einen Lieferplan (Standardfilter aus sap_extrakt.STANDARD_FILTER) mit Einteilungen an.
+
+    Args:
+        verbindung (sqlite3.Connection): Quellsystem.
+        ebeln (str): Bestellnummer.
+        aedat (str): Änderungsdatum (JJJJMMTT) in EKKO und EKPO.
+        positionen (dict): EBELP -> (Materialnummer, [(ETENR, EINDT, MENGE), ...]).
+        lieferscheine (list): (LFNKD, LWEDT, LWEMG) je Wareneingang (EKEK).
+        lifnr (str): Lieferantennummer.
+        werk (str): Werk der Positionen.
+    """
+    fuege_ein(verbindung, "EKKO", EBELN=ebeln, BEDAT="20240102", BUKRS="0010", BSTYP="L", BSART="LPA",
+              LIFNR=lifnr, AEDAT=aedat)
+    for ebelp, (matnr, einteilungen) in positionen.items():
+        menge = str(sum(int(einteilung[2]) for einteilung in einteilungen))
+        fuege_ein(verbindung, "EKPO", EBELN=ebeln, EBELP=ebelp, MENGE=menge, WERKS=werk, MATNR=matnr, AEDAT=aedat)
+        for etenr, eindt, menge in einteilungen:
+            fuege_ein(verbindung, "EKET", EBELN=ebeln, EBELP=ebelp, ETENR=etenr, EINDT=eindt, MENGE=menge)
+    for lfnkd, lwedt, lwemg in lieferscheine:
+        fuege_ein(verbindung, "EKEK", EBELN=ebeln, LFNKD=lfnkd, LWEDT=lwedt, LWEMG=lwemg)
+
+
+@pytest.fixture
+def sap_quelle(tmp_path):
+    """Quellsystem mit zwei Lieferplänen, Lieferanten- und Materialstamm."""
+    verbindung = sqlite3.connect(tmp_path / "sap_quelle.sqlite", check_same_thread=False)
+    for tabelle, spalten in QUELL_SPALTEN.items():
+        verbindung.execute(f'CREATE TABLE "{tabelle}" ({", ".join(f"{spalte} TEXT" for spalte in spalten)})')
+    fuege_ein(verbindung, "LFA1", LIFNR="L1", NAME1="Lieferant Eins", LAND1="DE")
+    fuege_ein(verbindung, "LFA1", LIFNR="L2", NAME1="Lieferant Zwei", LAND1="AT")
+    for matnr in ("M1", "M2", "M3"):
+        fuege_ein(verbindung, "MAKT", MATNR=matnr, SPRAS="D", MAKTX=f"Material {matnr}")
+    lege_bestellung_an(
+        verbindung, "5500000001", "20240105",
+        {"00010": ("M1", [("0001", "20240110", "10"), ("0002", "20240210", "20")])},
+        [("LS-1", "20240111", "10")],
+    )
+    lege_bestellung_an(
+        verbindung, "5500000002", "20240106",
+        {"00010": ("M2", [("0001", "20240115", "5")])},
+        [("LS-2", "20240114", "5")], lifnr="L2",
+    )
+    verbindung.commit()
+    yield verbindung
+    verbindung.close()
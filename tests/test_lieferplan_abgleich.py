@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+from conftest import fuege_ein
+from lieferplan_abgleich import lade_positionen, ordne_wareneingaenge_zu
+
+
+def _fifo_referenz(einteilungen, wareneingaenge):
+    # Zeilenweise Zuordnung: Wareneingänge je Position nach Datum auf die Einteilungen verbrauchen
+    ergebnis = {}
+    for position, teil in einteilungen.groupby("Position"):
+        teil = teil.sort_values(["Lieferdatum (Soll)", "Einteilung"])
+        offen = dict(zip(teil.index, teil["Soll-Menge"].astype(float)))
+        zugeordnet = dict.fromkeys(teil.index, 0.0)
+        erster, erfuellt = {}, {}
+        reihenfolge = list(teil.index)
+        eingaenge = wareneingaenge[(wareneingaenge["Position"] == position) & (wareneingaenge["WE-Menge"] > 0)]
+        for datum, menge in eingaenge.sort_values("Wareneingangsdatum (WE)", kind="stable")[
+            ["Wareneingangsdatum (WE)", "WE-Menge"]
+        ].itertuples(index=False):
+            while menge > 0 and reihenfolge:
+                zeile = reihenfolge[0]
+                anteil = min(menge, offen[zeile])
+                erster.setdefault(zeile, datum)
+                offen[zeile] -= anteil
+                zugeordnet[zeile] += anteil
+                menge -= anteil
+                if offen[zeile] == 0:
+                    erfuellt[zeile] = datum
+                    reihenfolge.pop(0)
+        for zeile in teil.index:
+            ergebnis[zeile] = (zugeordnet[zeile], erster.get(zeile, pd.NaT), erfuellt.get(zeile, pd.NaT))
+    return pd.DataFrame.from_dict(ergebnis, orient="index", columns=["WE-Menge", "Erster WE", "Wareneingangsdatum (WE)"])
+
+
+def _zufallsdaten(zufall, positionen=40):
+    tage = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(120), unit="D")
+    einteilungen, wareneingaenge = [], []
+    for position in range(positionen):
+        anzahl = zufall.integers(1, 6)
+        einteilungen.append(pd.DataFrame({
+            "Position": position,
+            "Einteilung": np.arange(anzahl),
+            "Lieferdatum (Soll)": zufall.choice(tage, anzahl),
+            "Soll-Menge": zufall.integers(1, 50, anzahl),
+        }))
+        anzahl = zufall.integers(0, 8)
+        wareneingaenge.append(pd.DataFrame({
+            "Position": position,
+            "Wareneingangsdatum (WE)": zufall.choice(tage, anzahl),
+            "WE-Menge": zufall.integers(-5, 60, anzahl),
+        }))
+    einteilungen = pd.concat(einteilungen, ignore_index=True).sample(frac=1, random_state=1)
+    wareneingaenge = pd.concat(wareneingaenge, ignore_index=True).sample(frac=1, random_state=2)
+    return einteilungen.assign(Materialnummer="M1"), wareneingaenge.assign(Materialnummer="M1")
+
+
+def test_zuordnung_entspricht_zeilenweisem_fifo():
+    einteilungen, wareneingaenge = _zufallsdaten(np.random.default_rng(36))
+    schluessel = ["Position", "Materialnummer"]
+
+    ergebnis = ordne_wareneingaenge_zu(einteilungen, wareneingaenge, schluessel)
+    referenz = _fifo_referenz(einteilungen, wareneingaenge).loc[ergebnis.index]
+
+    np.testing.assert_allclose(ergebnis["WE-Menge"], referenz["WE-Menge"])
+    for spalte in ["Erster WE", "Wareneingangsdatum (WE)"]:
+        pd.testing.assert_series_equal(
+            pd.to_datetime(ergebnis[spalte]), pd.to_datetime(referenz[spalte]), check_names=False, check_freq=False
+        )
+
+
+def test_offene_einteilungen_haben_keine_liefertreue():
+    einteilungen = pd.DataFrame({
+        "Position": [1, 1, 1],
+        "Materialnummer": "M1",
+        "Einteilung": [1, 2, 3],
+        "Lieferdatum (Soll)": pd.to_datetime(["2024-01-10", "2024-02-10", "2024-03-10"]),
+        "Soll-Menge": [10, 10, 10],
+    })
+    wareneingaenge = pd.DataFrame({
+        "Position": [1, 1],
+        "Materialnummer": "M1",
+        "Wareneingangsdatum (WE)": pd.to_datetime(["2024-01-09", "2024-02-20"]),
+        "WE-Menge": [10, 5],
+    })
+
+    ergebnis = ordne_wareneingaenge_zu(einteilungen, wareneingaenge, ["Position", "Materialnummer"])
+
+    assert list(ergebnis["Liefertreue (Ja/Nein)"]) == ["Ja", "offen", "offen"]
+    assert ergebnis["Verspätung (Tage)"].isnull().tolist() == [False, True, True]
+    assert list(ergebnis["Offene Menge"]) == [0, 5, 10]
+
+
+def test_nur_wareneingaenge_aus_der_bestellentwicklung(sap_quelle):
+    buchungen = [
+        ("1", "S", "20240111", "10"),  # Wareneingang
+        ("2", "S", "20240115", "10"),  # Rechnung
+        ("1", "H", "20240120", "4"),   # Rücklieferung
+        ("1", "S", "20240212", "20"),  # Wareneingang
+    ]
+    for nummer, (vgabe, shkzg, budat, menge) in enumerate(buchungen, start=1):
+        fuege_ein(sap_quelle, "EKBE", EBELN="5500000001", EBELP="00010", VGABE=vgabe, BELNR=f"50000000{nummer}",
+                  BUDAT=budat, SHKZG=shkzg, MENGE=menge)
+
+    einteilungen, wareneingaenge = lade_positionen(sap_quelle)
+    ergebnis = ordne_wareneingaenge_zu(einteilungen, wareneingaenge)
+
+    assert sorted(wareneingaenge["WE-Menge"]) == [-4, 10, 20]
+    erste = ergebnis[ergebnis["Bestellnummer"] == "5500000001"].sort_values("Einteilung")
+    assert list(erste["Wareneingangsdatum (WE)"]) == list(pd.to_datetime(["2024-01-11", "2024-02-12"]))
+    assert list(ergebnis.loc[ergebnis["Bestellnummer"] == "5500000002", "Liefertreue (Ja/Nein)"]) == ["offen"]
@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+
+from conftest import MANDANT, fuege_ein
+from sap_delta import WASSERZEICHEN, aktualisiere_delta, aktualisiere_lieferdatensatz, lese_wasserzeichen
+from sap_extrakt import lieferdaten, verbinde
+
+
+def _lauf(sap_quelle, pfad, ziel):
+    verbindung = verbinde(pfad)
+    try:
+        lauf = aktualisiere_delta(sap_quelle, verbindung)
+        aktualisiere_lieferdatensatz(verbindung, lauf, 2024, ziel=ziel)
+    finally:
+        verbindung.close()
+    return lauf
+
+
+def test_erster_lauf_laedt_vollstaendig(sap_quelle, tmp_path):
+    ziel = tmp_path / "liefertreue_sap_2024.parquet"
+    lauf = _lauf(sap_quelle, tmp_path / "lokal.sqlite", str(ziel))
+
+    assert sorted(lauf.vollstaendig) == sorted(WASSERZEICHEN)
+    df = pd.read_parquet(ziel)
+    assert sorted(df["Lieferscheinnummer"]) == ["LS-1", "LS-1", "LS-2"]
+    assert df["Soll-Menge"].sum() == 35
+
+
+def test_delta_entfernt_geloeschte_einteilung(sap_quelle, tmp_path):
+    ziel = str(tmp_path / "liefertreue_sap_2024.parquet")
+    _lauf(sap_quelle, tmp_path / "lokal.sqlite", ziel)
+
+    sap_quelle.execute("DELETE FROM EKET WHERE EBELN = '5500000001' AND ETENR = '0002'")
+    sap_quelle.execute("UPDATE EKKO SET AEDAT = '20240201' WHERE EBELN = '5500000001'")
+    sap_quelle.commit()
+    lauf = _lauf(sap_quelle, tmp_path / "lokal.sqlite", ziel)
+
+    assert lauf.vollstaendig == []
+    assert (MANDANT, "5500000001") in lauf.belege
+    verbindung = verbinde(tmp_path / "lokal.sqlite")
+    assert verbindung.execute("SELECT ETENR FROM EKET WHERE EBELN = '5500000001'").fetchall() == [("0001",)]
+    erwartet = lieferdaten(verbindung, 2024)
+    verbindung.close()
+    df = pd.read_parquet(ziel)
+    assert len(df) == len(erwartet) == 2
+    assert sorted(df["Lieferdatum (Soll)"]) == sorted(erwartet["Lieferdatum (Soll)"])
+
+
+def test_wasserzeichen_bleiben_erhalten(sap_quelle, tmp_path):
+    ziel = str(tmp_path / "liefertreue_sap_2024.parquet")
+    _lauf(sap_quelle, tmp_path / "lokal.sqlite", ziel)
+
+    verbindung = verbinde(tmp_path / "lokal.sqlite")
+    assert lese_wasserzeichen(verbindung) == {
+        "EKKO": ("AEDAT", "20240106"),
+        "EKPO": ("AEDAT", "20240106"),
+        "EKET": ("EBELN", "5500000002"),
+        "EKEK": ("LWEDT", "20240114"),
+    }
+    verbindung.close()
+
+    # Neuer Wareneingang auf dem ersten Lieferplan: nur dieser Beleg wird gezogen
+    fuege_ein(sap_quelle, "EKEK", EBELN="5500000001", LFNKD="LS-3", LWEDT="20240212", LWEMG="20")
+    sap_quelle.commit()
+    lauf = _lauf(sap_quelle, tmp_path / "lokal.sqlite", ziel)
+    assert lauf.vollstaendig == []
+    assert (MANDANT, "5500000001") in lauf.belege
+    assert "LS-3" in set(pd.read_parquet(ziel)["Lieferscheinnummer"])
+
+
+def test_unveraenderte_datei_bleibt_unberuehrt(sap_quelle, tmp_path):
+    ziel = str(tmp_path / "liefertreue_sap_2024.parquet")
+    _lauf(sap_quelle, tmp_path / "lokal.sqlite", ziel)
+    vorher = os.stat(ziel).st_mtime_ns
+    inhalt = pd.read_parquet(ziel)
+
+    lauf = _lauf(sap_quelle, tmp_path / "lokal.sqlite", ziel)
+
+    # Die Belege am Wasserzeichen werden erneut gezogen (>=), ohne sich zu ändern
+    assert lauf.belege
+    assert os.stat(ziel).st_mtime_ns == vorher
+    pd.testing.assert_frame_equal(pd.read_parquet(ziel), inhalt)
@@ -0,0 +1,95 @@
+import os
+import sqlite3
+from functools import partial
+
+import pandas as pd
+import pytest
+
+import sap_parallel
+from conftest import lege_bestellung_an
+from sap_extrakt import lieferdaten
+from sap_parallel import extrahiere, lese_lieferungen, partitionen, verbinde_lesend
+
+SPALTEN = ["Lieferscheinnummer", "Materialnummer", "Lieferdatum (Soll)", "Soll-Menge", "WE-Menge"]
+
+
+@pytest.fixture
+def quelle(sap_quelle, tmp_path):
+    # Weitere Materialien in zwei Werken, damit jedes Werk mehrere Bereiche bekommt
+    for nummer, matnr in enumerate(["M3", "M4", "M5", "M6"], start=3):
+        lege_bestellung_an(
+            sap_quelle, f"55000000{nummer:02d}", "20240107",
+            {"00010": (matnr, [("0001", f"202403{nummer:02d}", str(nummer))])},
+            [(f"LS-{nummer}", f"202403{nummer:02d}", str(nummer))],
+        )
+    lege_bestellung_an(
+        sap_quelle, "5500000010", "20240108",
+        {"00010": ("M2", [("0001", "20240401", "7")]), "00020": ("M7", [("0001", "20240402", "8")])},
+        [("LS-10", "20240403", "15")], werk="055",
+    )
+    sap_quelle.commit()
+    return partial(verbinde_lesend, str(tmp_path / "sap_quelle.sqlite"))
+
+
+def _sortiert(df):
+    return df[SPALTEN].sort_values(SPALTEN).reset_index(drop=True)
+
+
+def test_bereiche_sind_lueckenlos_und_am_rand_offen(sap_quelle, quelle):
+    teile = partitionen(sap_quelle, ["054", "055"], 3)
+    for werk in ("054", "055"):
+        bereiche = [(teil.von, teil.bis) for teil in teile if teil.werk == werk]
+        assert bereiche[0][0] is None and bereiche[-1][1] is None
+        assert all(bis == von for (_, bis), (von, _) in zip(bereiche, bereiche[1:]))
+    assert len([teil for teil in teile if teil.werk == "054"]) == 3
+
+
+def test_partitionen_ergeben_den_ungeteilten_join(sap_quelle, quelle, tmp_path):
+    ergebnisse = extrahiere(2024, verbinde=quelle, bereiche=3, verbindungen=2, basis_dir=tmp_path / "abzug")
+
+    assert not any(ergebnis.fehler for ergebnis in ergebnisse)
+    erwartet = pd.concat([lieferdaten(sap_quelle, 2024, werk=werk) for werk in ("054", "055")], ignore_index=True)
+    gelesen = lese_lieferungen(2024, basis_dir=tmp_path / "abzug")
+    assert len(gelesen) == len(erwartet) == 9
+    pd.testing.assert_frame_equal(_sortiert(gelesen), _sortiert(erwartet))
+
+
+def test_voruebergehende_fehler_werden_wiederholt(quelle, tmp_path, monkeypatch):
+    aufrufe = {}
+
+    def einmal_gesperrt(verbindung, jahr, materialbereich=None, **filter):
+        schluessel = (filter["werk"], materialbereich)
+        aufrufe[schluessel] = aufrufe.get(schluessel, 0) + 1
+        if aufrufe[schluessel] == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return lieferdaten(verbindung, jahr, materialbereich=materialbereich, **filter)
+
+    monkeypatch.setattr(sap_parallel, "lieferdaten", einmal_gesperrt)
+    monkeypatch.setattr(sap_parallel, "WARTEZEIT_S", 0)
+    ergebnisse = extrahiere(2024, verbinde=quelle, bereiche=3, verbindungen=2, basis_dir=tmp_path / "abzug")
+
+    assert all(ergebnis.versuche == 2 and ergebnis.fehler is None for ergebnis in ergebnisse)
+    assert len(lese_lieferungen(2024, basis_dir=tmp_path / "abzug")) == 9
+
+
+def test_fehler_verwerfen_den_abzug(quelle, tmp_path, monkeypatch):
+    basis = tmp_path / "abzug"
+    extrahiere(2024, verbinde=quelle, bereiche=3, basis_dir=basis)
+    # Rest eines abgebrochenen Laufs
+    os.makedirs(basis / ".jahr=2024.alt" / "werk=054")
+
+    def defekt(verbindung, jahr, materialbereich=None, **filter):
+        if materialbereich[0] is None and filter["werk"] == "054":
+            raise KeyError("MATNR")
+        return lieferdaten(verbindung, jahr, materialbereich=materialbereich, **filter)
+
+    monkeypatch.setattr(sap_parallel, "lieferdaten", defekt)
+    ergebnisse = extrahiere(2024, verbinde=quelle, bereiche=3, basis_dir=basis)
+    assert [ergebnis.partition.nummer for ergebnis in ergebnisse if ergebnis.fehler] == [0]
+    assert not os.path.exists(basis / ".jahr=2024.tmp")
+    assert len(lese_lieferungen(2024, basis_dir=basis)) == 9
+
+    monkeypatch.setattr(sap_parallel, "lieferdaten", lieferdaten)
+    ergebnisse = extrahiere(2024, verbinde=quelle, bereiche=3, basis_dir=basis)
+    assert not any(ergebnis.fehler for ergebnis in ergebnisse)
+    assert sorted(os.listdir(basis)) == ["jahr=2024"]